@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (arena.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Arena mode of Classic Snake HD, many snakes on one board.
+
+All snakes share one occupancy grid holding the number of the snake in every
+cell, so a head running into any body is a single lookup, and heads moving
+into the same cell are found through the cells claimed this tick. A tick is
+a constant amount of work per snake, whatever the number of snakes, instead
+of comparing every head with every other snake.
+
+Bots are steered by a policy from bots.py. Each snake looks enough like a
+SnakeEngine for a policy to steer it, with the apple it is heading for as
+its apple. Dead bots come back after a while, the game is over when the
+player dies. Snakes can also be added and steered from outside, which is
+how server.py gives every client a snake of its own.
+"""
+
+import random
+from array import array
+from collections import deque
+
+from bots import greedy_policy
+from engine import DIRECTIONS, OPPOSITE
+
+
+class ArenaSnake:
+    """ A single snake in an arena, seen by policies as a SnakeEngine """
+
+    def __init__(self, arena, number):
+        """ Create a snake, placed by Arena.spawn.
+
+        Args:
+            arena (Arena): Arena the snake lives in
+            number (int): Number of the snake in the occupancy grid, from 1
+        """
+        self.number = number
+        self.cell_width = arena.cell_width
+        self.cell_height = arena.cell_height
+        self.occupied = arena.occupied
+        self.body = deque()
+        self.head_x = self.head_y = 0
+        self.direction = 'up'
+        self.alive = False
+        self.eaten = 0
+        self.cause = None
+        self.respawn_tick = 0
+        self.apple_cell = None
+
+        # Steered by the policy, or through step()
+        self.bot = True
+
+    @property
+    def apple(self):
+        """ tuple: x/y coordinates of the apple headed for, or None """
+        if self.apple_cell is None:
+            return None
+        y, x = divmod(self.apple_cell, self.cell_width)
+        return x, y
+
+    def turn(self, direction):
+        """ Change heading, unless it reverses the snake onto itself.
+
+        Args:
+            direction (str): 'up', 'down', 'left' or 'right'
+        """
+        if direction in DIRECTIONS and direction != OPPOSITE[self.direction]:
+            self.direction = direction
+
+
+class ArenaBoard:
+    """ What an arena and a copy of one share, see netplay.ArenaMirror.
+
+    Subclasses hold the board in occupied, apple_grid, apple_cells and
+    apple_pos, the snakes in snakes, the tick in ticks, and what changed
+    in cleared, killed and deaths.
+    """
+
+    # Drawn by SnakeGame.draw_arena
+    endless = False
+    arena = True
+
+    # Number of the snake SnakeGame renders as the player
+    player_number = 1
+
+    # No walls but the edges
+    level = None
+
+    def remove_apple(self, cell):
+        """ Take an eaten apple off the board.
+
+        Args:
+            cell (int): Cell index of the apple
+        """
+        self.apple_grid[cell] = 0
+        idx = self.apple_pos.pop(cell)
+        last = self.apple_cells.pop()
+        if last != cell:
+            self.apple_cells[idx] = last
+            self.apple_pos[last] = idx
+
+    def kill(self, snake, cause):
+        """ End a snake and free its cells.
+
+        Args:
+            snake (ArenaSnake): Snake to end
+            cause (str): 'wall', 'self', 'snake', 'head' or 'left'
+        """
+        snake.alive = False
+        snake.cause = cause
+        snake.respawn_tick = self.ticks + self.respawn_ticks
+        self.deaths[cause] = self.deaths.get(cause, 0) + 1
+        self.killed.append((snake.number, cause))
+        occupied = self.occupied
+        for cell in snake.body:
+            if occupied[cell] == snake.number:
+                occupied[cell] = 0
+                self.cleared.append(cell)
+        snake.body.clear()
+
+    def to_cell(self, coordinates):
+        """ Pack x/y coordinates into a cell index, as in SnakeEngine. """
+        return coordinates[1] * self.cell_width + coordinates[0]
+
+    def to_coordinates(self, cell):
+        """ Unpack a cell index into x/y coordinates, as in SnakeEngine. """
+        y, x = divmod(cell, self.cell_width)
+        return x, y
+
+    def is_apple(self, cell):
+        """ Check if an apple is in a cell, as in SnakeEngine. """
+        return bool(self.apple_grid[cell])
+
+    def is_snake(self, cell):
+        """ Check if any snake is in a cell, as in SnakeEngine. """
+        return bool(self.occupied[cell])
+
+    def snake_cells(self):
+        """ Get every cell of every living snake.
+
+        Returns:
+            list: x/y coordinates
+        """
+        width = self.cell_width
+        return [(cell % width, cell // width)
+                for snake in self.snakes if snake.alive
+                for cell in snake.body]
+
+    @property
+    def alive(self):
+        """ int: Number of living snakes """
+        return sum(snake.alive for snake in self.snakes)
+
+    # The player, as the engine SnakeGame renders and steers
+
+    @property
+    def player_snake(self):
+        """ ArenaSnake: Snake SnakeGame renders as the player """
+        return self.snakes[self.player_number - 1]
+
+    @property
+    def direction(self):
+        """ str: Heading of the player """
+        return self.player_snake.direction
+
+    @property
+    def head_x(self):
+        """ int: Column of the player's head """
+        return self.player_snake.head_x
+
+    @property
+    def head_y(self):
+        """ int: Row of the player's head """
+        return self.player_snake.head_y
+
+    @property
+    def head(self):
+        """ tuple: x/y coordinates of the player's head """
+        snake = self.player_snake
+        return snake.head_x, snake.head_y
+
+    @property
+    def apples(self):
+        """ int: Number of apples the player has eaten this game """
+        return self.player_snake.eaten
+
+    @property
+    def score(self):
+        """ int: Score of the player, apples times snake speed """
+        return self.apples * self.speed
+
+    @property
+    def cause(self):
+        """ str: What ended the player, None while alive """
+        return self.player_snake.cause
+
+
+class Arena(ArenaBoard):
+    """ The rules of a game with many snakes on one board """
+
+    def __init__(self, cell_width, cell_height, bots=100, apples=None,
+                 speed=15, rng=None, seed=None, policy=greedy_policy,
+                 player=True, respawn_ticks=30):
+        """ Create an arena and start a new game.
+
+        Args:
+            cell_width (int): Number of cells horizontally
+            cell_height (int): Number of cells vertically
+            bots (int): Number of bot snakes
+            apples (int): Number of apples on the board, defaults to one
+                for every two snakes
+            speed (int): Snake speed, used as the score multiplier
+            rng (random.Random): Random source, defaults to a new
+                random.Random seeded with seed
+            seed (int): Seed for the default random source
+            policy (function): Policy steering the bots, see bots.py
+            player (bool): If the first snake is steered by step()
+            respawn_ticks (int): Ticks before a dead bot comes back
+        """
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.speed = speed
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.policy = policy
+        self.player = player
+        self.respawn_ticks = respawn_ticks
+        cells = cell_width * cell_height
+
+        # Number of the snake in every cell, 0 for free, and the apples
+        self.occupied = array('H', bytes(2 * cells))
+        self.apple_grid = bytearray(cells)
+        self.apple_cells = []
+        self.apple_pos = {}
+        count = bots + int(player)
+        self.apple_count = apples if apples is not None else count // 2 + 1
+
+        self.snakes = [ArenaSnake(self, number + 1)
+                       for number in range(count)]
+        if player:
+            self.snakes[0].bot = False
+        self.reset()
+
+    def reset(self):
+        """ Place every snake and the apples for a new game. """
+        self.occupied[:] = array('H', bytes(2 * len(self.occupied)))
+        self.apple_grid[:] = bytes(len(self.apple_grid))
+        self.apple_cells = []
+        self.apple_pos = {}
+        self.ticks = 0
+        self.deaths = {}
+        self.game_over = False
+
+        # Changes of the last tick, for drawing
+        self.cleared = []
+        self.moved = []
+        self.spawned = []
+        self.placed = []
+
+        # Events of the last tick, for server.py: numbers of the snakes
+        # that moved and spawned, and of the snakes ended with the cause
+        self.movers = []
+        self.born = []
+        self.killed = []
+
+        # The player and clients first, so the bots make room for them
+        for snake in self.snakes:
+            snake.alive = False
+            snake.body.clear()
+        for snake in sorted(self.snakes, key=lambda snake: snake.bot):
+            if snake.respawn_tick >= 0:
+                self.spawn(snake)
+        self.place_apples()
+
+    def spawn(self, snake, tries=16):
+        """ Place a snake three cells long on a random free spot.
+
+        A bot that does not fit on a few random spots tries again next
+        tick. The player and the snakes of clients are placed on the first
+        spot that fits from a random cell on instead, as their game can not
+        wait.
+
+        Args:
+            snake (ArenaSnake): Dead snake
+            tries (int): Random spots to try
+
+        Returns:
+            bool: True if the snake was placed
+        """
+        width, height = self.cell_width, self.cell_height
+        randrange = self.rng.randrange
+        for _ in range(tries):
+            x = randrange(2, width)
+            y = randrange(1, height)
+            if self.fits(x, y):
+                break
+        else:
+            if snake.bot:
+                return False
+
+            # Every spot in turn, O(cells) but only on a crowded board
+            cells = width * height
+            start = randrange(cells)
+            for offset in range(cells):
+                y, x = divmod((start + offset) % cells, width)
+                if x >= 2 and y >= 1 and self.fits(x, y):
+                    break
+            else:
+                return False
+
+        # Heading up, away from the body
+        occupied = self.occupied
+        cells = (y * width + x, y * width + x - 1, y * width + x - 2)
+        snake.body.extend(cells)
+        for cell in cells:
+            occupied[cell] = snake.number
+        snake.head_x, snake.head_y = x, y
+        snake.direction = 'up'
+        snake.alive = True
+        snake.eaten = 0
+        snake.cause = None
+        snake.apple_cell = None
+        return True
+
+    def fits(self, x, y):
+        """ Check if a new snake fits with its head on a cell.
+
+        Args:
+            x (int): Column of the head, from 2
+            y (int): Row of the head, from 1
+
+        Returns:
+            bool: True if the head, the two cells to its left and the cell
+                above it are free
+        """
+        width = self.cell_width
+        cell = y * width + x
+        occupied, apple_grid = self.occupied, self.apple_grid
+        if occupied[cell - width]:
+            return False
+        return not any(occupied[body] or apple_grid[body]
+                       for body in (cell, cell - 1, cell - 2))
+
+    def place_apples(self, tries=16):
+        """ Add apples on random free cells, up to apple_count.
+
+        Args:
+            tries (int): Random cells to try for every apple
+        """
+        occupied, apple_grid = self.occupied, self.apple_grid
+        randrange = self.rng.randrange
+        cells = len(occupied)
+        while len(self.apple_cells) < self.apple_count:
+            for _ in range(tries):
+                cell = randrange(cells)
+                if not occupied[cell] and not apple_grid[cell]:
+                    break
+            else:
+                return
+            apple_grid[cell] = 1
+            self.apple_pos[cell] = len(self.apple_cells)
+            self.apple_cells.append(cell)
+            self.placed.append(cell)
+
+    def choose_apple(self, snake, samples=4):
+        """ Pick the nearest of a few random apples for a snake to head for.
+
+        Args:
+            snake (ArenaSnake): Snake without an apple to head for
+            samples (int): Apples to pick from
+        """
+        apples = self.apple_cells
+        if not apples:
+            snake.apple_cell = None
+            return
+        width = self.cell_width
+        best = None
+        for _ in range(samples):
+            cell = apples[self.rng.randrange(len(apples))]
+            y, x = divmod(cell, width)
+            distance = abs(x - snake.head_x) + abs(y - snake.head_y)
+            if best is None or distance < best[0]:
+                best = (distance, cell)
+        snake.apple_cell = best[1]
+
+    def add_snake(self):
+        """ Add a snake steered through step(), reusing a free number.
+
+        The snake is placed by the next tick, and respawns like the bots.
+
+        Returns:
+            int: Number of the new snake, None if every number is taken
+        """
+        for snake in self.snakes:
+            if snake.respawn_tick < 0 and not snake.alive:
+                break
+        else:
+            if len(self.snakes) + 1 >= 1 << 16:
+                return None
+            snake = ArenaSnake(self, len(self.snakes) + 1)
+            self.snakes.append(snake)
+        snake.bot = False
+        snake.respawn_tick = self.ticks
+        return snake.number
+
+    def remove_snake(self, number):
+        """ Take a snake added by add_snake off the board for good.
+
+        The snake is ended by the next tick, with 'left' as the cause, and
+        its number is free for add_snake again.
+
+        Args:
+            number (int): Number of the snake
+        """
+        self.snakes[number - 1].respawn_tick = -1
+
+    def step(self, direction=None, turns=None):
+        """ Advance every snake a single tick.
+
+        Tails move out of the way first, then every head moves, so a snake
+        may follow right behind a tail, its own or another's. A head moving
+        into a body or the edge ends that snake, and heads moving into the
+        same cell end both.
+
+        Args:
+            direction (str): Optional new heading of the player
+            turns (dict): Optional new headings of snakes added by
+                add_snake, by snake number
+
+        Returns:
+            bool: True while the player is alive, or always without one
+        """
+        if self.game_over:
+            return False
+        self.ticks += 1
+        self.cleared = cleared = []
+        self.moved = moved = []
+        self.spawned = []
+        self.placed = []
+        self.movers = movers = []
+        self.born = []
+        self.killed = []
+        turns = dict(turns) if turns else {}
+        if self.player and direction is not None:
+            turns[self.player_number] = direction
+        rng, policy = self.rng, self.policy
+        occupied, apple_grid = self.occupied, self.apple_grid
+        width, height = self.cell_width, self.cell_height
+
+        # Headings and the cell every head moves into
+        moves = []
+        claims = {}
+        ended = []
+        for snake in self.snakes:
+            if snake.respawn_tick < 0:
+                if snake.alive:
+                    self.kill(snake, 'left')
+                    snake.respawn_tick = -1
+                continue
+            if not snake.alive:
+                if self.ticks >= snake.respawn_tick and self.spawn(snake):
+                    self.born.append(snake.number)
+                    self.spawned.extend(snake.body)
+                continue
+            if not snake.bot:
+                if snake.number in turns:
+                    snake.turn(turns[snake.number])
+            else:
+                if (snake.apple_cell is None or
+                   not apple_grid[snake.apple_cell]):
+                    self.choose_apple(snake)
+                snake.turn(policy(snake, rng))
+            move_x, move_y = DIRECTIONS[snake.direction]
+            x, y = snake.head_x + move_x, snake.head_y + move_y
+            if not (0 <= x < width and 0 <= y < height):
+                ended.append((snake, 'wall'))
+                continue
+            cell = y * width + x
+            claims[cell] = claims.get(cell, 0) + 1
+            moves.append((snake, x, y, cell))
+
+        # Tails out of the way, unless growing
+        for snake, x, y, cell in moves:
+            if not apple_grid[cell]:
+                tail = snake.body.pop()
+                occupied[tail] = 0
+                cleared.append(tail)
+
+        # Collisions, decided before any head moves
+        for move in moves:
+            snake, x, y, cell = move
+            if claims[cell] > 1:
+                ended.append((snake, 'head'))
+            elif occupied[cell]:
+                ended.append((
+                    snake,
+                    'self' if occupied[cell] == snake.number else 'snake'))
+
+        # Heads of the snakes that made it
+        for snake, cause in ended:
+            self.kill(snake, cause)
+        for snake, x, y, cell in moves:
+            if not snake.alive:
+                continue
+            snake.body.appendleft(cell)
+            occupied[cell] = snake.number
+            snake.head_x, snake.head_y = x, y
+            moved.append(cell)
+            movers.append(snake.number)
+            if apple_grid[cell]:
+                self.remove_apple(cell)
+                snake.eaten += 1
+        self.place_apples()
+
+        if self.player and not self.player_snake.alive:
+            self.game_over = True
+            return False
+        return True
+
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (assets.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Cache for images, fonts and text used by Classic Snake HD. """
+
+from collections import OrderedDict
+
+import pygame
+
+
+class AssetCache:
+    """ Loads, scales and converts images and fonts once.
+
+    Images are stored per path and size, converted to the display format so
+    blitting them needs no pixel conversion. Fonts are stored per path and
+    point size. Rendered text is stored per font, text and color. All share
+    one bounded store and the least recently used entry is dropped when it
+    is full.
+    """
+
+    def __init__(self, max_items=32):
+        """ Create an empty cache.
+
+        Args:
+            max_items (int): Maximum number of cached images and fonts
+        """
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        """ Get a cached item, loading it on a miss.
+
+        Args:
+            key (tuple): Cache key
+            load (function): Called without arguments to create the item
+
+        Returns:
+            object: The cached item
+        """
+        if key in self.items:
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+
+        self.misses += 1
+        item = load()
+        self.items[key] = item
+        if len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+        return item
+
+    def image(self, path, size=None):
+        """ Get an image, scaled and converted to the display format.
+
+        Args:
+            path (str): Path to the image
+            size (tuple): Width and height to scale to, None keeps the size
+
+        Returns:
+            pygame.Surface: The image
+        """
+        def load():
+            surface = pygame.image.load(path)
+            if size is not None and surface.get_size() != tuple(size):
+                surface = pygame.transform.scale(surface, size)
+            if surface.get_flags() & pygame.SRCALPHA:
+                return surface.convert_alpha()
+            return surface.convert()
+
+        return self.get(('image', path, size), load)
+
+    def font(self, path, size):
+        """ Get a font.
+
+        Args:
+            path (str): Path to the font file
+            size (int): Point size
+
+        Returns:
+            pygame.font.Font: The font
+        """
+        return self.get(
+            ('font', path, size), lambda: pygame.font.Font(path, size))
+
+    def text(self, font, text, color):
+        """ Get text rendered with antialiasing.
+
+        Args:
+            font (pygame.font.Font): Font to render with
+            text (str): Text
+            color (tuple): RGB value
+
+        Returns:
+            pygame.Surface: The rendered text
+        """
+        return self.get(
+            ('text', font, text, tuple(color)),
+            lambda: font.render(text, True, color).convert_alpha())
+
+    def digits(self, font, color):
+        """ Get an atlas of the digits 0 to 9, for numbers that change often.
+
+        Numbers are composed from the atlas glyph by glyph, see number(), so
+        a new number needs no rendering and does not take up a cache entry
+        of its own.
+
+        Args:
+            font (pygame.font.Font): Font to render with
+            color (tuple): RGB value
+
+        Returns:
+            tuple: Rendered digit surfaces, indexed by digit
+        """
+        return self.get(
+            ('digits', font, tuple(color)),
+            lambda: tuple(font.render(str(digit), True, color).convert_alpha()
+                          for digit in range(10)))
+
+    def number(self, font, number, color, prefix=''):
+        """ Compose a number from the digit atlas.
+
+        The result is not cached, keep it for as long as the number stays
+        the same.
+
+        Args:
+            font (pygame.font.Font): Font to render with
+            number (int): Number, 0 or larger
+            color (tuple): RGB value
+            prefix (str): Text in front of the number, from the text cache
+
+        Returns:
+            pygame.Surface: The rendered number
+        """
+        digits = self.digits(font, color)
+        glyphs = [digits[ord(char) - 48] for char in str(number)]
+        if prefix:
+            glyphs.insert(0, self.text(font, prefix, color))
+
+        # Glyphs side by side, they do not overlap so the highest alpha
+        # of the empty surface and the glyph is a plain copy
+        surface = pygame.Surface(
+            (sum(glyph.get_width() for glyph in glyphs),
+             max(glyph.get_height() for glyph in glyphs)), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += glyph.get_width()
+        return surface.convert_alpha()
+
+    def clear(self):
+        """ Drop everything, e.g. after the resolusion changed. """
+        self.items.clear()
+
+    def stats(self):
+        """ Get cache counters.
+
+        Returns:
+            dict: hits, misses and number of cached items
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'items': len(self.items)
+        }
@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (autopilot.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Autopilot that steers a SnakeEngine towards the apple.
+
+Paths are found with A* and only accepted if the tail can still be reached
+after eating, otherwise the snake follows its own tail for a while. A path
+stays valid while the snake follows it, as the body only ever frees cells
+behind the head, so it is kept and only searched again when the apple moves
+or the next cell turns out to be blocked. On a crowded board it follows a
+Hamiltonian cycle instead, checking each move is safe only until the whole
+body lies along the cycle, from then on no move can trap it.
+
+The tick the head entered every cell is kept, with a single write per
+tick, and tells when each cell of the body frees. A way out to the tail,
+the escape route, is kept between ticks too and carried over each move of
+the head, so neither following the tail nor checking a move along the cycle
+searches every tick. A search for the apple gives up after search_limit
+cells, and the snake follows the cycle to that apple instead of spending
+the time of many ticks on one.
+"""
+
+import heapq
+import time
+from array import array
+from collections import deque
+from itertools import islice
+
+from engine import SNAKE
+from timing import LatencyTracker
+
+
+class Autopilot:
+    """ Picks the direction for every tick of a SnakeEngine """
+
+    def __init__(self, crowded=0.5, retry_ticks=8, search_limit=2000):
+        """ Create an autopilot.
+
+        Args:
+            crowded (float): Share of the board the snake must cover before
+                the Hamiltonian cycle is followed, as far as that is safe
+            retry_ticks (int): Ticks to follow the tail before searching
+                again after no safe path to the apple was found
+            search_limit (int): Cells a search for the apple may expand
+                before giving up and following the cycle instead, which
+                keeps a tick within budget on a large board
+        """
+        self.crowded = crowded
+        self.retry_ticks = retry_ticks
+        self.search_limit = search_limit
+        self.plan_time = LatencyTracker()
+        self.searches = 0
+        self.cycle_size = None
+        self.cycle = None
+        self.reset()
+
+    def reset(self):
+        """ Forget the current path, for a new game. """
+        self.path = deque()
+        self.target = None
+        self.head = None
+        self.retry_at = 0
+        self.target_since = 0
+        self.cycle_head = None
+        self.cycle_tick = None
+        self.cycle_run = 0
+        self.cycle_clear = 0
+        self.cycle_reach = None
+        self.clear_apple = None
+        self.clear_safe = False
+        self.too_far = None
+        self.gave_up = False
+        self.entered = None
+        self.entered_at = None
+        self.clear_escape()
+
+    def __call__(self, engine, rng=None):
+        """ Policy interface as used by bots.POLICIES. """
+        return self.next_direction(engine)
+
+    def next_direction(self, engine):
+        """ Get the direction for the next tick, and time the planning.
+
+        Args:
+            engine (SnakeEngine): Game to steer
+
+        Returns:
+            str: Direction, None to keep going straight
+        """
+        start = time.perf_counter()
+        direction = self.plan(engine)
+        self.plan_time.add(time.perf_counter() - start)
+        return direction
+
+    def plan(self, engine):
+        """ Get the direction for the next tick.
+
+        Args:
+            engine (SnakeEngine): Game to steer
+
+        Returns:
+            str: Direction, None to keep going straight
+        """
+        head = engine.body[0]
+        cells = engine.cell_width * engine.cell_height
+        self.track(engine)
+        self.carry_escape(engine)
+
+        # New apple
+        if self.target != engine.apple_cell:
+            self.target_since = engine.ticks
+
+        # Crowded board, no way to the apple for as many ticks as there are
+        # cells, or too far to search for, follow the cycle
+        if (engine.length > self.crowded * cells or
+           engine.ticks - self.target_since > cells or
+           self.too_far == engine.apple_cell):
+            direction = self.follow_cycle(engine)
+            if direction is not None:
+                return direction
+
+        # Search again only if the apple moved or the path is blocked. After
+        # no safe path was found, wait a few ticks before trying again.
+        if (self.target != engine.apple_cell or self.head != head or
+           not self.path or not self.is_open(engine, self.path[0])):
+            self.path.clear()
+            self.head = None
+            if engine.apple_cell is not None and (
+                    self.target != engine.apple_cell or
+                    engine.ticks >= self.retry_at):
+                path = self.find_path(engine)
+                if path is None:
+                    self.retry_at = engine.ticks + self.retry_ticks
+                    if self.gave_up:
+                        self.too_far = engine.apple_cell
+                else:
+                    self.path.extend(path)
+            self.target = engine.apple_cell
+
+        # Next cell of the path
+        if self.path:
+            cell = self.path.popleft()
+            self.head = cell
+            return self.direction_to(engine, head, cell)
+
+        # No safe path to the apple, follow the escape route until there
+        # is. It stays valid while it is followed, so it is only searched
+        # again once lost.
+        if self.escape_at != (engine.ticks, head):
+            self.find_escape(engine, head)
+        if self.escape_at == (engine.ticks, head):
+            return self.direction_to(engine, head, self.escape[0])
+
+        # Stay alive as long as possible
+        return self.survive(engine)
+
+    def track(self, engine):
+        """ Keep the tick the head entered every cell, see search.
+
+        Only the new head is written each tick. The whole body is read again
+        for a new game, or when ticks were missed, e.g. while steering by
+        hand.
+
+        Args:
+            engine (SnakeEngine): Game to steer
+        """
+        head = engine.body[0]
+        if self.entered_at == (engine.ticks, head):
+            return
+        if (self.entered is not None and engine.length > 1 and
+           len(self.entered) == len(engine.occupied) and
+           self.entered_at == (engine.ticks - 1, engine.body[1])):
+            self.entered[head] = engine.ticks
+        else:
+            self.entered = array('q', [0]) * len(engine.occupied)
+            for idx, cell in enumerate(engine.body):
+                self.entered[cell] = engine.ticks - idx
+        self.entered_at = (engine.ticks, head)
+
+    def neighbours(self, engine, cell):
+        """ Get the cells next to a cell.
+
+        Args:
+            engine (SnakeEngine): Game with the grid size
+            cell (int): Cell index
+
+        Returns:
+            list: Cell indexes
+        """
+        width = engine.cell_width
+        x = cell % width
+        around = []
+        if x > 0:
+            around.append(cell - 1)
+        if x < width - 1:
+            around.append(cell + 1)
+        if cell >= width:
+            around.append(cell - width)
+        if cell < width * (engine.cell_height - 1):
+            around.append(cell + width)
+        return around
+
+    def is_open(self, engine, cell):
+        """ Check if the snake can move into a cell next tick.
+
+        Args:
+            engine (SnakeEngine): Game to look at
+            cell (int): Cell index
+
+        Returns:
+            bool: True if it is free, or the tail moving out of the way
+        """
+        if not engine.occupied[cell]:
+            return True
+        return cell == engine.body[-1] and cell != engine.apple_cell
+
+    def direction_to(self, engine, head, cell):
+        """ Get the direction from the head into a cell next to it.
+
+        Args:
+            engine (SnakeEngine): Game with the grid size
+            head (int): Cell index of the head
+            cell (int): Cell index next to the head
+
+        Returns:
+            str: Direction
+        """
+        step = cell - head
+        if step == 1:
+            return 'right'
+        if step == -1:
+            return 'left'
+        if step > 0:
+            return 'down'
+        return 'up'
+
+    def search(self, engine, start, goal, occupied, entered, offset,
+               avoid=None, any_body=False, limit=None):
+        """ A* search between two cells.
+
+        A cell of the snake can be entered once the body has moved out of
+        it, entered[cell] + offset moves from now, so a path may run through
+        cells the tail will have left by then. Walls and avoid are never
+        entered. Ties prefer the deeper node, so on an open board only about
+        the cells along the path are expanded. After limit cells it gives up
+        as if there were no way, and sets gave_up.
+
+        With any_body the search also ends in the first cell of the snake
+        it can enter: the body ahead of that cell moves out of the way just
+        in time for the head to follow it round to the tail.
+
+        Args:
+            engine (SnakeEngine): Game with the grid size
+            start (int): Cell index to start from
+            goal (int): Cell index to reach
+            occupied (bytearray): What every cell holds, as
+                SnakeEngine.occupied
+            entered (array.array): Tick the head entered every cell of the
+                snake, see track
+            offset (int): Snake length less the current tick
+            avoid (int): Cell index to go round, e.g. the apple
+            any_body (bool): End in any cell of the snake
+            limit (int): Cells to expand at most, None for no limit
+
+        Returns:
+            list: Cell indexes after start up to and including the goal or
+                the cell of the snake, None if there is no way there
+        """
+        width = engine.cell_width
+        goal_x, goal_y = goal % width, goal // width
+        came_from = {start: None}
+        cost = {start: 0}
+        heap = [(0, 0, start)]
+        expanded = 0
+        self.gave_up = False
+        while heap:
+            _, depth, cell = heapq.heappop(heap)
+            if cell == goal:
+                return self.walk_back(came_from, start, cell)
+
+            # Reached in fewer moves since, when fewer cells are free
+            if cost[cell] < -depth:
+                continue
+            expanded += 1
+            if expanded == limit:
+                self.gave_up = True
+                return None
+            steps = 1 - depth
+            for near in self.neighbours(engine, cell):
+                if near == avoid:
+                    continue
+                taken = occupied[near]
+                if taken:
+                    if taken != SNAKE:
+                        continue
+                    moves = entered[near] + offset
+                    if moves > steps and near != goal:
+                        continue
+                    if any_body and moves > 0:
+                        came_from[near] = cell
+                        return self.walk_back(came_from, start, near)
+                if near in cost and cost[near] <= steps:
+                    continue
+                cost[near] = steps
+                came_from[near] = cell
+                guess = (abs(near % width - goal_x) +
+                         abs(near // width - goal_y))
+                heapq.heappush(heap, (steps + guess, -steps, near))
+        return None
+
+    def walk_back(self, came_from, start, cell):
+        """ Get the path a search took to a cell.
+
+        Args:
+            came_from (dict): Cell every cell was reached from
+            start (int): Cell index the search started from
+            cell (int): Cell index it reached
+
+        Returns:
+            list: Cell indexes after start up to and including cell
+        """
+        path = []
+        while cell != start:
+            path.append(cell)
+            cell = came_from[cell]
+        path.reverse()
+        return path
+
+    def find_path(self, engine):
+        """ Find a path to the apple that leaves the tail reachable.
+
+        Args:
+            engine (SnakeEngine): Game to look at
+
+        Returns:
+            list: Cell indexes to move into, None if there is no safe path
+        """
+        self.searches += 1
+        ticks, length = engine.ticks, engine.length
+        path = self.search(engine, engine.body[0], engine.apple_cell,
+                           engine.occupied, self.entered, length - ticks,
+                           limit=self.search_limit)
+        if path is None:
+            return None
+
+        # Board after eating the apple, one segment longer
+        moves = len(path)
+        occupied = bytearray(engine.occupied)
+        entered = array('q', self.entered)
+        for idx, cell in enumerate(path):
+            occupied[cell] = SNAKE
+            entered[cell] = ticks + idx + 1
+        if length < moves:
+            tail = path[moves - 1 - length]
+        else:
+            tail = engine.body[length - moves]
+
+        # Safe if the new head can still follow its own tail
+        if self.search(engine, path[-1], tail, occupied, entered,
+                       length + 1 - ticks - moves, any_body=True,
+                       limit=self.search_limit) is None:
+            return None
+        return path
+
+    def clear_escape(self):
+        """ Forget the escape route. """
+        self.escape = deque()
+        self.escape_index = {}
+        self.escape_base = 0
+        self.escape_at = None
+        self.escape_length = 0
+        self.escape_slack = 0
+
+    def find_escape(self, engine, cell):
+        """ Search the escape route after moving into a cell.
+
+        The escape route leads from the head over free cells into a cell of
+        the body it can enter, see search, and on along the body towards the
+        head. The snake can follow it round and round without running into
+        itself, so while there is one no move is a trap. Its slack is the
+        number of moves the body is out of the way before the head gets
+        there.
+
+        Args:
+            engine (SnakeEngine): Game to look at
+            cell (int): The head, or an open cell next to it
+
+        Returns:
+            bool: True if there is one, it is then kept along with the tick
+                and head it starts from, see carry_escape
+        """
+        self.searches += 1
+        ticks, length = engine.ticks, engine.length
+        tail = engine.body[-1]
+        avoid = engine.apple_cell
+        if cell != engine.body[0]:
+            ticks += 1
+            if cell == engine.apple_cell:
+                length += 1
+                avoid = None
+            elif length > 1:
+                tail = engine.body[-2]
+        offset = length - ticks
+        path = self.search(engine, cell, tail, engine.occupied, self.entered,
+                           offset, avoid=avoid, any_body=True)
+        if path is None:
+            return False
+        self.keep_escape(path, ticks, cell, length)
+        return True
+
+    def keep_escape(self, path, ticks, cell, length):
+        """ Keep an escape route, see find_escape.
+
+        Args:
+            path (list): Cell indexes of the route, ending in the body
+            ticks (int): Tick the route starts from
+            cell (int): Cell index of the head at that tick
+            length (int): Snake length at that tick
+        """
+        self.clear_escape()
+        self.escape.extend(path)
+        self.escape_index = {near: idx for idx, near in enumerate(path)}
+        self.escape_at = (ticks, cell)
+        self.escape_length = length
+        self.escape_slack = (len(path) - self.entered[path[-1]] -
+                             length + ticks)
+
+    def carry_escape(self, engine):
+        """ Carry the escape route over the move just made, or forget it.
+
+        Args:
+            engine (SnakeEngine): Game to steer
+        """
+        if self.escape_at is None:
+            return
+        head = engine.body[0]
+        if self.escape_at != (engine.ticks, head):
+            spliced = None
+            if (engine.length > 1 and
+               self.escape_at == (engine.ticks - 1, engine.body[1])):
+                spliced = self.splice(
+                    engine, head, engine.length - self.escape_length)
+            if spliced is None:
+                self.clear_escape()
+                return
+            drop, add, self.escape_slack = spliced
+            for _ in range(drop):
+                del self.escape_index[self.escape.popleft()]
+                self.escape_base += 1
+            if add is not None:
+                self.escape_base -= 1
+                self.escape.appendleft(add)
+                self.escape_index[add] = self.escape_base
+            self.escape_at = (engine.ticks, head)
+            self.escape_length = engine.length
+
+        # On the way the body went, as far as a cell the body still covers,
+        # which keeps the head out of the rest of the way
+        width = engine.cell_width
+        occupied, entered = engine.occupied, self.entered
+        offsets = (-width, width, -1, 1)
+        last = self.escape[-1]
+        while last != head and (len(self.escape) < 3 or
+                                occupied[last] != SNAKE):
+            cell = last + offsets[engine.links[last]]
+            if (cell in self.escape_index or
+               occupied[cell] not in (0, SNAKE) or
+               entered[cell] != entered[last] + 1):
+                break
+            self.escape_index[cell] = self.escape_base + len(self.escape)
+            self.escape.append(cell)
+            last = cell
+        if occupied[last] != SNAKE:
+            self.clear_escape()
+
+        # A new apple on the way would grow the snake before it gets there
+        elif engine.apple_cell in self.escape_index:
+            self.clear_escape()
+
+    def splice(self, engine, cell, grow):
+        """ Work out the escape route after the head moves into a cell.
+
+        The head can skip ahead along the route, join it from the side, or
+        go round a corner to get back onto it. Each move takes a tick, in
+        which the body frees one more cell unless it grows.
+
+        Args:
+            engine (SnakeEngine): Game to look at
+            cell (int): Cell index next to where the route starts
+            grow (int): 1 if the snake grows with the move
+
+        Returns:
+            tuple: Cells to drop from the front of the route, cell to add
+                in front of it or None, and the slack after the move. None
+                if the route can not be kept.
+        """
+        escape = self.escape
+        slack = self.escape_slack - grow
+        position = self.escape_index.get(cell)
+        if position is not None:
+            position -= self.escape_base
+            if position + 1 >= len(escape) or slack < position:
+                return None
+            return position + 1, None, slack - position
+        around = self.neighbours(engine, cell)
+        for drop in range(min(3, len(escape))):
+            if escape[drop] in around:
+                if slack + 1 < drop:
+                    return None
+                return drop, None, slack + 1 - drop
+        if slack + 2 < 0:
+            return None
+        for near in around:
+            if (not engine.occupied[near] and near != engine.apple_cell and
+               near not in self.escape_index and
+               escape[0] in self.neighbours(engine, near)):
+                return 0, near, slack + 2
+        return None
+
+    def build_cycle(self, engine):
+        """ Build a Hamiltonian cycle over the grid, if there is one.
+
+        Needs an even number of rows or columns. Runs along the first row,
+        serpentines over the rest leaving the first column free, and returns
+        up that column.
+
+        Args:
+            engine (SnakeEngine): Game with the grid size
+        """
+        width, height = engine.cell_width, engine.cell_height
+        self.cycle_size = (width, height)
+        self.cycle = None
+        if width < 2 or height < 2:
+            return
+
+        # Build on rows, transposed if only the columns are even
+        if height % 2 == 0:
+            rows, cols, cell = height, width, lambda a, b: b * width + a
+        elif width % 2 == 0:
+            rows, cols, cell = width, height, lambda a, b: a * width + b
+        else:
+            return
+
+        order = [cell(a, 0) for a in range(cols)]
+        for b in range(1, rows):
+            if b % 2:
+                order.extend(cell(a, b) for a in range(cols - 1, 0, -1))
+            else:
+                order.extend(cell(a, b) for a in range(1, cols))
+        order.extend(cell(0, b) for b in range(rows - 1, 0, -1))
+
+        self.cycle = array('i', [0]) * (width * height)
+        for idx, current in enumerate(order):
+            self.cycle[current] = order[(idx + 1) % len(order)]
+
+    def follow_cycle(self, engine):
+        """ Get the direction to the next cell on the Hamiltonian cycle.
+
+        Args:
+            engine (SnakeEngine): Game to steer
+
+        Returns:
+            str: Direction, None if there is no cycle or the cell is taken
+        """
+        if self.cycle_size != (engine.cell_width, engine.cell_height):
+            self.build_cycle(engine)
+        if self.cycle is None:
+            return None
+        head = engine.body[0]
+
+        # Segments behind the head lying on the cycle in order, counted on
+        # from the last tick while the head follows the cycle. Once that is
+        # the whole body, following the cycle can never trap the head, so
+        # the costly check is skipped.
+        followed = (engine.ticks == self.cycle_tick and
+                    self.cycle[self.cycle_head] == head)
+        if followed:
+            self.cycle_run += 1
+        else:
+            self.cycle_run = 0
+            ahead = head
+            for cell in islice(engine.body, 1, None):
+                if self.cycle[cell] != ahead:
+                    break
+                self.cycle_run += 1
+                ahead = cell
+        self.cycle_head, self.cycle_tick = head, engine.ticks + 1
+
+        cell = self.cycle[head]
+        if not self.is_open(engine, cell):
+            return None
+        if self.cycle_run >= engine.length - 1:
+            return self.direction_to(engine, head, cell)
+
+        # Cells ahead on the cycle that were found free by the time the head
+        # gets there stay so while it follows the cycle and the apple it
+        # counted with is not eaten, and so does the first one that is not.
+        # Enough of them lie the whole body on the cycle, otherwise check
+        # every tick.
+        if (followed and self.cycle_clear and
+           self.clear_apple == engine.apple_cell):
+            self.cycle_clear -= 1
+            if self.cycle_reach is not None:
+                self.cycle_reach = self.cycle_reach - 1 or None
+        else:
+            self.cycle_clear, self.cycle_reach = self.clear_ahead(engine,
+                                                                  cell)
+            self.clear_apple = engine.apple_cell
+            self.clear_safe = self.cycle_clear >= engine.length
+        if not self.clear_safe and not self.escapes(engine, cell,
+                                                    self.cycle_reach):
+            return None
+        return self.direction_to(engine, head, cell)
+
+    def escapes(self, engine, cell, reach):
+        """ Check there is an escape route after moving into a cell.
+
+        Carries the escape route over the move if it can, or takes the
+        cycle up to the body, otherwise searches one from the cell. It is
+        then kept for the next tick.
+
+        Args:
+            engine (SnakeEngine): Game to look at
+            cell (int): Open cell next to the head
+            reach (int): Moves along the cycle into the body, see
+                clear_ahead
+
+        Returns:
+            bool: True if there is one
+        """
+        grow = cell == engine.apple_cell
+        if (self.escape_at == (engine.ticks, engine.body[0]) and
+           self.splice(engine, cell, grow) is not None):
+            return True
+        if reach is None:
+            return self.find_escape(engine, cell)
+        path = [self.cycle[cell]]
+        while len(path) < reach:
+            path.append(self.cycle[path[-1]])
+        self.keep_escape(path, engine.ticks + 1, cell, engine.length + grow)
+        return True
+
+    def clear_ahead(self, engine, cell):
+        """ Count the moves along the cycle after moving into a cell.
+
+        Counts while every cell is free by the time the head gets there,
+        one move later after eating the apple, up to the snake length.
+        The first cell of the body on the way, reached before any apple,
+        ends an escape route, see find_escape.
+
+        Args:
+            engine (SnakeEngine): Game to look at
+            cell (int): Open cell next to the head
+
+        Returns:
+            tuple: Number of moves, and the moves into the body or None
+        """
+        occupied, entered = engine.occupied, self.entered
+        offset = (engine.length + (cell == engine.apple_cell) -
+                  engine.ticks - 1)
+        late = 0
+        reach = None
+        current = cell
+        moves = 0
+        while moves < engine.length:
+            current = self.cycle[current]
+            taken = occupied[current]
+            if taken:
+                if (taken != SNAKE or
+                   entered[current] + offset + late > moves + 1):
+                    break
+                if (reach is None and not late and
+                   entered[current] + offset > 0):
+                    reach = moves + 1
+            late += current == engine.apple_cell
+            moves += 1
+        return moves, reach
+
+    def survive(self, engine):
+        """ Move to the open neighbour with the most room behind it.
+
+        Room is counted with a flood fill capped at the snake length, which
+        keeps the cost bounded on a large board.
+
+        Args:
+            engine (SnakeEngine): Game to steer
+
+        Returns:
+            str: Direction, None if every move ends the game
+        """
+        head = engine.body[0]
+        limit = engine.length + 1
+        best, best_room = None, -1
+        for cell in self.neighbours(engine, head):
+            if not self.is_open(engine, cell):
+                continue
+            seen = {cell}
+            queue = deque([cell])
+            while queue and len(seen) < limit:
+                for near in self.neighbours(engine, queue.popleft()):
+                    if near not in seen and self.is_open(engine, near):
+                        seen.add(near)
+                        queue.append(near)
+            if len(seen) > best_room:
+                best, best_room = cell, len(seen)
+        if best is None:
+            return None
+        return self.direction_to(engine, head, best)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (batch.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Many snake games advanced in lockstep with NumPy.
+
+Same rules as engine.SnakeEngine, but N boards are held in arrays and moved
+with a single vectorized step(), for bot evaluation and balancing of
+difficulty and grid size settings.
+"""
+
+try:
+    import numpy as np
+except ImportError as e:
+    exit(str(e) + ". Try install numpy with 'pip3 install numpy'")
+
+from engine import ACTIONS, DIRECTIONS, OPPOSITE
+
+# Cause of game over per board
+CAUSES = (None, 'wall', 'self', 'win')
+ALIVE, WALL, SELF, WIN = range(4)
+
+
+class BatchEngine:
+    """ N snake games stepped together.
+
+    Each board has an occupancy grid and a ring buffer with its body cells,
+    so moving the head and dropping the tail is a constant amount of work
+    per board. Apples are placed on a uniformly random free cell.
+    """
+
+    def __init__(self, n, cell_width, cell_height, divided=True, speed=15,
+                 seed=None, auto_reset=False):
+        """ Create N boards and start a game on each.
+
+        Args:
+            n (int): Number of boards
+            cell_width (int): Number of cells horizontally
+            cell_height (int): Number of cells vertically
+            divided (bool): Start position, as in SnakeEngine
+            speed (int): Snake speed, used as the score multiplier
+            seed (int): Seed for the random generator
+            auto_reset (bool): Start a new game on boards that ended
+        """
+        self.n = n
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cells = cell_width * cell_height
+        self.divided = divided
+        self.speed = speed
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+
+        # Movement per action number
+        self.move_x = np.array([DIRECTIONS[a][0] for a in ACTIONS], np.int32)
+        self.move_y = np.array([DIRECTIONS[a][1] for a in ACTIONS], np.int32)
+        self.opposite = np.array(
+            [ACTIONS.index(OPPOSITE[a]) for a in ACTIONS], np.int8)
+
+        # Boards
+        self.occupied = np.zeros((n, self.cells), np.uint8)
+        self.body = np.zeros((n, self.cells), np.int32)
+        self.head_ptr = np.zeros(n, np.int32)
+        self.length = np.zeros(n, np.int32)
+        self.head_x = np.zeros(n, np.int32)
+        self.head_y = np.zeros(n, np.int32)
+        self.direction = np.zeros(n, np.int8)
+        self.apple = np.zeros(n, np.int32)
+        self.ticks = np.zeros(n, np.int32)
+        self.cause = np.zeros(n, np.int8)
+        self.rows = np.arange(n)
+
+        # Result of the last ended game per board
+        self.final_length = np.zeros(n, np.int32)
+        self.final_ticks = np.zeros(n, np.int32)
+        self.final_cause = np.zeros(n, np.int8)
+        self.reset()
+
+    @property
+    def apples(self):
+        """ numpy.ndarray: Apples eaten per board """
+        return self.length - 3
+
+    @property
+    def score(self):
+        """ numpy.ndarray: Score per board, apples times snake speed """
+        return self.apples * self.speed
+
+    @property
+    def done(self):
+        """ numpy.ndarray: True for boards where the game has ended """
+        return self.cause != ALIVE
+
+    def reset(self, mask=None):
+        """ Start new games.
+
+        Args:
+            mask (numpy.ndarray): Boards to reset, default all of them
+        """
+        idx = self.rows if mask is None else np.flatnonzero(mask)
+        if not len(idx):
+            return
+
+        # Start position, three cells long, heading up
+        offset = 6 if self.divided else 4
+        head_x = self.cell_width - offset
+        head_y = self.cell_height - offset
+        start = [head_y * self.cell_width + head_x - i for i in (2, 1, 0)]
+
+        self.occupied[idx] = 0
+        self.occupied[idx[:, None], start] = 1
+        self.body[idx, :3] = start
+        self.head_ptr[idx] = 2
+        self.length[idx] = 3
+        self.head_x[idx] = head_x
+        self.head_y[idx] = head_y
+        self.direction[idx] = ACTIONS.index('up')
+        self.ticks[idx] = 0
+        self.cause[idx] = ALIVE
+        self.place_apples(idx)
+
+    def place_apples(self, idx):
+        """ Put a new apple on a random free cell of each given board.
+
+        Picks the k-th free cell, with k uniform over the free cells, so it
+        never needs retries. Boards without a free cell are won.
+
+        Args:
+            idx (numpy.ndarray): Board numbers
+        """
+        free_count = self.cells - self.length[idx]
+        full = free_count == 0
+        if full.any():
+            self.cause[idx[full]] = WIN
+            idx, free_count = idx[~full], free_count[~full]
+        if not len(idx):
+            return
+        k = (self.rng.random(len(idx)) * free_count).astype(np.int32)
+        free_rank = np.cumsum(self.occupied[idx] == 0, axis=1)
+        self.apple[idx] = np.argmax(free_rank > k[:, None], axis=1)
+
+    def step(self, actions=None):
+        """ Advance every running board a single tick.
+
+        Args:
+            actions (numpy.ndarray): Action number per board, -1 keeps the
+                heading. Reversing onto the body is ignored as in
+                SnakeEngine.turn.
+
+        Returns:
+            tuple: Boolean arrays (ate, done) for this tick
+        """
+        alive = self.cause == ALIVE
+
+        # New heading
+        if actions is not None:
+            actions = np.asarray(actions, np.int8)
+            turn = ((actions >= 0) &
+                    (actions != self.opposite[self.direction]))
+            self.direction = np.where(turn, actions, self.direction)
+
+        # Move the head one cell
+        head_x = self.head_x + self.move_x[self.direction]
+        head_y = self.head_y + self.move_y[self.direction]
+        self.ticks += alive
+
+        # Game over if the snake hit a edge
+        wall = alive & ((head_x < 0) | (head_x >= self.cell_width) |
+                        (head_y < 0) | (head_y >= self.cell_height))
+        moving = alive & ~wall
+        cell = np.where(moving, head_y * self.cell_width + head_x, 0)
+        ate = moving & (cell == self.apple)
+
+        # Release the tail cell before moving into it, unless growing
+        shrink = np.flatnonzero(moving & ~ate)
+        tail_ptr = (self.head_ptr[shrink] - self.length[shrink] + 1)
+        tail = self.body[shrink, tail_ptr % self.cells]
+        self.occupied[shrink, tail] = 0
+        self.length[shrink] -= 1
+
+        # Game over if the snake hit it self, the tail stays where it was
+        hit = moving & (self.occupied[self.rows, cell] == 1)
+        undo = hit[shrink]
+        self.occupied[shrink[undo], tail[undo]] = 1
+        self.length[shrink[undo]] += 1
+        self.cause[wall] = WALL
+        self.cause[hit] = SELF
+
+        # Move the snake by switching squares
+        move = np.flatnonzero(moving & ~hit)
+        self.head_ptr[move] = (self.head_ptr[move] + 1) % self.cells
+        self.body[move, self.head_ptr[move]] = cell[move]
+        self.occupied[move, cell[move]] = 1
+        self.length[move] += 1
+        self.head_x[move] = head_x[move]
+        self.head_y[move] = head_y[move]
+
+        # New apples, or a win if there is no room left for one
+        ate &= ~hit
+        if ate.any():
+            self.place_apples(np.flatnonzero(ate))
+
+        # Keep the result of ended games, then start new ones
+        done = alive & (self.cause != ALIVE)
+        if done.any():
+            self.final_length[done] = self.length[done]
+            self.final_ticks[done] = self.ticks[done]
+            self.final_cause[done] = self.cause[done]
+            if self.auto_reset:
+                self.reset(done)
+        return ate, done
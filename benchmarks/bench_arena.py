@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_arena.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Tick time of arenas with hundreds of bot snakes.
+
+Plays arenas of greedy bots on a 384x216 board, small cells on a 4K screen,
+and reports the tick time against the budget of 30 ticks per second. For
+comparison, the collisions of the same ticks are also checked the naive
+way, every head against the body of every snake.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_arena
+"""
+
+import time
+
+from arena import Arena
+from timing import LatencyTracker
+
+GRID = (384, 216)
+SNAKES = (100, 250, 500, 1000)
+TICKS = 1000
+SEED = 1
+
+# 30 ticks per second
+BUDGET_MS = 1000 / 30
+
+
+def all_pairs(arena):
+    """ Find the heads inside a body by comparing every pair of snakes.
+
+    Args:
+        arena (Arena): Arena to check
+
+    Returns:
+        int: Number of heads inside a body other than their own neck
+    """
+    snakes = [snake for snake in arena.snakes if snake.alive]
+    hits = 0
+    for snake in snakes:
+        head = snake.body[0]
+        for other in snakes:
+            body = other.body
+            if other is snake:
+                hits += head in list(body)[1:]
+            elif head in body:
+                hits += 1
+    return hits
+
+
+def bench(snakes):
+    """ Play an arena and time its ticks.
+
+    Args:
+        snakes (int): Number of bot snakes
+
+    Returns:
+        tuple: Tick times, all-pairs times and the arena after the game
+    """
+    arena = Arena(*GRID, bots=snakes, seed=SEED, player=False)
+    ticks = LatencyTracker(TICKS)
+    pairs = LatencyTracker(TICKS)
+    for tick in range(TICKS):
+        start = time.perf_counter()
+        arena.step()
+        ticks.add(time.perf_counter() - start)
+
+        # The naive check on a sample of the same ticks
+        if tick % 10 == 0:
+            start = time.perf_counter()
+            all_pairs(arena)
+            pairs.add(time.perf_counter() - start)
+    return ticks, pairs, arena
+
+
+def main():
+    print("Grid {}x{}, {} ticks, budget {:.1f} ms/tick".format(
+        GRID[0], GRID[1], TICKS, BUDGET_MS))
+    print("{:>7}  {:>8}  {:>8}  {:>8}  {:>7}  {:>13}  {:>6}".format(
+        "snakes", "p50 ms", "p99 ms", "ticks/s", "alive", "all-pairs ms",
+        "deaths"))
+    for snakes in SNAKES:
+        ticks, pairs, arena = bench(snakes)
+        report = ticks.report((50, 99))
+        print("{:>7}  {:>8.3f}  {:>8.3f}  {:>8.0f}  {:>7}  {:>13.3f}  "
+              "{:>6}".format(
+                  snakes, report[50], report[99],
+                  len(ticks) / sum(ticks.samples), arena.alive,
+                  pairs.report((50,))[50], sum(arena.deaths.values())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_autopilot.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Planning time of the autopilot per tick on a large grid.
+
+Compares keeping the path between ticks with searching from scratch every
+tick, against the tick budget of the Hard speed. Then times the crowded
+board, with the snake covering CROWDED of it. Growing it that long with
+the autopilot takes millions of ticks, so the snake is laid out along the
+Hamiltonian cycle instead, as following the cycle leaves it, and played
+from there. Laid out a few apples short, it leaves the cycle for the ones
+close enough to search for and then has to find its way back on, which is
+checked every tick.
+
+Exits with an error if the 99th percentile of any mode but replan is over
+budget.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_autopilot
+"""
+
+import random
+import sys
+
+from autopilot import Autopilot
+from engine import SnakeEngine
+
+# Small cells on a 4K screen
+GRID = (384, 216)
+TICKS = 3000
+SEED = 1
+
+# Share of the board the snake covers in the crowded game, and the apples
+# it is short of that when finding its way back onto the cycle
+CROWDED = 0.5
+SHORT = 8
+
+# 60 ticks per second on Hard
+BUDGET_MS = 1000 / 60
+
+
+def bench(replan):
+    """ Play a game with the autopilot and time its planning.
+
+    Args:
+        replan (bool): Forget the path before every tick
+
+    Returns:
+        tuple: Autopilot and the engine after the game
+    """
+    engine = SnakeEngine(*GRID, rng=random.Random(SEED))
+    pilot = Autopilot()
+    while engine.ticks < TICKS:
+        if replan:
+            pilot.reset()
+        if not engine.step(pilot.next_direction(engine)):
+            break
+    return pilot, engine
+
+
+def bench_crowded(short=0):
+    """ Play a game with the autopilot on a crowded board.
+
+    Args:
+        short (int): Apples the snake is short of a crowded board
+
+    Returns:
+        tuple: Autopilot, the engine after the game and the apples eaten
+    """
+    engine = SnakeEngine(*GRID, rng=random.Random(SEED))
+    pilot = Autopilot()
+    pilot.build_cycle(engine)
+
+    # The first cells of the cycle, from the top left corner, head last
+    cells = [0]
+    while len(cells) <= CROWDED * len(engine.occupied) - short:
+        cells.append(pilot.cycle[cells[-1]])
+    engine.place_snake([engine.to_coordinates(cell)
+                        for cell in reversed(cells)],
+                       direction=pilot.direction_to(
+                           engine, cells[-2], cells[-1]))
+    engine.apple = engine.get_random_location()
+    start = engine.length
+    while engine.ticks < TICKS:
+        if not engine.step(pilot.next_direction(engine)):
+            break
+    return pilot, engine, engine.length - start
+
+
+def show(label, pilot, apples, checked=True):
+    """ Print the planning times of a mode.
+
+    Args:
+        label (str): Name of the mode
+        pilot (Autopilot): Autopilot after the game
+        apples (int): Apples eaten
+        checked (bool): Hold the 99th percentile to the budget
+
+    Returns:
+        bool: False if it is checked and over budget
+    """
+    report = pilot.plan_time.report((50, 99, 100))
+    within = report[99] <= BUDGET_MS
+    if not checked:
+        budget = "-"
+    else:
+        budget = "ok" if within else "over"
+    print("{:>12}  {:>8.3f}  {:>8.3f}  {:>8.3f}  {:>8}  {:>7}  {:>6}".format(
+        label, report[50], report[99], report[100], pilot.searches, apples,
+        budget))
+    return within or not checked
+
+
+def main():
+    print("Grid {}x{}, {} ticks, budget {:.1f} ms/tick".format(
+        GRID[0], GRID[1], TICKS, BUDGET_MS))
+    print("{:>12}  {:>8}  {:>8}  {:>8}  {:>8}  {:>7}  {:>6}".format(
+        "mode", "p50 ms", "p99 ms", "max ms", "searches", "apples",
+        "budget"))
+    passed = True
+    for label, replan in (("incremental", False), ("replan", True)):
+        pilot, engine = bench(replan)
+        passed &= show(label, pilot, engine.apples, checked=not replan)
+    for label, short in (("crowded", 0), ("rejoining", SHORT)):
+        pilot, engine, apples = bench_crowded(short)
+        passed &= show(label, pilot, apples)
+    if not passed:
+        sys.exit("Planning over budget")
+
+
+if __name__ == '__main__':
+    main()
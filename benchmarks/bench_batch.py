@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_batch.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Game-steps per second of BatchEngine.
+
+Steps N boards with random actions, restarting games as they end, and
+compares with one SnakeEngine stepped in a Python loop. Run from the
+repository root:
+
+    python3 -m benchmarks.bench_batch
+"""
+
+import random
+import time
+
+import numpy as np
+
+from batch import BatchEngine
+from engine import ACTIONS, SnakeEngine
+
+# Large cells on a 1080p screen
+GRID = (48, 27)
+BOARDS = (1, 100, 10000)
+SECONDS = 2
+
+
+def bench_batch(n):
+    """ Step N boards for a while.
+
+    Args:
+        n (int): Number of boards
+
+    Returns:
+        float: Game-steps per second
+    """
+    engine = BatchEngine(n, *GRID, seed=0, auto_reset=True)
+    rng = np.random.default_rng(0)
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < SECONDS:
+        engine.step(rng.integers(-1, 4, n))
+        steps += n
+    return steps / (time.perf_counter() - start)
+
+
+def bench_engine():
+    """ Step a single SnakeEngine for a while.
+
+    Returns:
+        float: Game-steps per second
+    """
+    engine = SnakeEngine(*GRID, rng=random.Random(0))
+    rng = random.Random(0)
+    moves = (None,) + ACTIONS
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < SECONDS:
+        for _ in range(1000):
+            if not engine.step(rng.choice(moves)):
+                engine.reset()
+        steps += 1000
+    return steps / (time.perf_counter() - start)
+
+
+def main():
+    print("Grid {}x{}".format(*GRID))
+    print("{:>18}  {:>14}".format("engine", "steps/sec"))
+    print("{:>18}  {:>14,.0f}".format("SnakeEngine", bench_engine()))
+    for n in BOARDS:
+        print("{:>18}  {:>14,.0f}".format(
+            "BatchEngine N={}".format(n), bench_batch(n)))
+
+
+if __name__ == '__main__':
+    main()
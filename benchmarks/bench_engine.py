@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_engine.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Tick cost of SnakeEngine versus snake length.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_engine
+"""
+
+import time
+
+from engine import SnakeEngine
+
+# Small cells on a 4K screen
+GRID = (384, 216)
+LENGTHS = (3, 100, 1000, 10000, 50000, 80000)
+TICKS = 300
+ROUNDS = 20
+
+
+def serpentine(width, length):
+    """ Build a snake with the head at (0, 0) and the body folded below.
+
+    Args:
+        width (int): Grid width in cells
+        length (int): Number of segments
+
+    Returns:
+        list: x/y tuples, head first
+    """
+    cells = [(0, 0)]
+    row = 1
+    while len(cells) < length:
+        xs = range(width) if row % 2 else range(width - 1, -1, -1)
+        for x in xs:
+            if len(cells) == length:
+                break
+            cells.append((x, row))
+        row += 1
+    return cells
+
+
+def bench_length(length):
+    """ Time ticks of a snake of fixed length running along the top row.
+
+    Args:
+        length (int): Number of segments
+
+    Returns:
+        float: Nanoseconds per tick
+    """
+    engine = SnakeEngine(*GRID)
+    body = serpentine(GRID[0], length)
+    elapsed = 0
+    for _ in range(ROUNDS):
+        engine.place_snake(body, direction='right')
+        engine.apple = (GRID[0] - 1, GRID[1] - 1)
+        start = time.perf_counter_ns()
+        for _ in range(TICKS):
+            engine.step()
+        elapsed += time.perf_counter_ns() - start
+        assert not engine.game_over
+    return elapsed / (ROUNDS * TICKS)
+
+
+def main():
+    print("Grid {}x{}, {} ticks x {} rounds".format(
+        GRID[0], GRID[1], TICKS, ROUNDS))
+    print("{:>8}  {:>10}".format("length", "ns/tick"))
+    for length in LENGTHS:
+        print("{:>8}  {:>10.0f}".format(length, bench_length(length)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_idle.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" CPU usage of an idle welcome screen.
+
+Opens the welcome screen on the SDL dummy video driver, leaves it alone for a
+few seconds and reports process CPU time as a share of wall time, for a few
+idle_frame_ms settings. A tight pygame.event.get() loop, which is how menus
+used to poll, is measured as the baseline. Run from the repository root:
+
+    python3 -m benchmarks.bench_idle
+"""
+
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from main import SnakeGame
+
+SECONDS = 3
+IDLE_FRAME_MS = (0, 100, 16)
+
+
+def measure(idle):
+    """ Run a function and measure its CPU usage.
+
+    Args:
+        idle (function): Runs for SECONDS
+
+    Returns:
+        float: CPU time in percent of wall time
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    idle()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return cpu / wall * 100
+
+
+def busy_poll():
+    """ Poll events in a tight loop, like the menus used to. """
+    end = time.perf_counter() + SECONDS
+    while time.perf_counter() < end:
+        pygame.event.get()
+
+
+def welcome_screen(idle_frame_ms):
+    """ Get a function idling on the welcome screen.
+
+    The menu marker starts on Quit Game and a timer presses Enter after
+    SECONDS, which leaves the menu.
+
+    Args:
+        idle_frame_ms (int): Idle frame budget
+
+    Returns:
+        function: Idles on the welcome screen
+    """
+    game = SnakeGame()
+    game.idle_frame_ms = idle_frame_ms
+    game.menu_id = 5
+    game.game_exit = lambda: None
+
+    def idle():
+        enter = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN)
+        pygame.time.set_timer(enter, SECONDS * 1000, 1)
+        game.run_scene()
+
+    return idle
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((640, 480))
+    print("{:>24}  {:>6}".format("mode", "cpu %"))
+    print("{:>24}  {:>6.1f}".format("busy poll (before)", measure(busy_poll)))
+    for idle_frame_ms in IDLE_FRAME_MS:
+        print("{:>24}  {:>6.1f}".format(
+            "welcome, idle {} ms".format(idle_frame_ms),
+            measure(welcome_screen(idle_frame_ms))))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_logical.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Native rendering against a logical canvas scaled up once per frame.
+
+For every resolusion, plays the scripted game of bench_suite and times
+draw_frame and update_display the way game_loop calls them:
+
+    native dirty   only changed cells, drawn on the screen
+    native full    the whole screen every frame
+    logical N      changed cells on a canvas of N pixels per cell, scaled
+                   up to the screen every frame
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_logical
+"""
+
+import time
+
+import pygame
+
+from benchmarks.bench_suite import (
+    RESOLUSIONS, FRAMES, record_script, scripted_ticks)
+from main import SnakeGame
+
+CELL_SIZE = 20
+LOGICAL_PIXELS = (2, 4, 8)
+
+
+def bench(game, script):
+    """ Time ticks drawn the way game_loop draws them.
+
+    Args:
+        game (SnakeGame): Game with the grid and canvas set up
+        script (list): Direction or None per tick
+
+    Returns:
+        float: Frames per second
+    """
+    game.dirty_rects = []
+    elapsed = 0
+    for engine in scripted_ticks(game, script, FRAMES):
+        start = time.perf_counter()
+        if engine.ticks == 1:
+            game.setup_canvas(engine.cell_width, engine.cell_height)
+        game.draw_frame(full=engine.ticks == 1)
+        game.update_display()
+        elapsed += time.perf_counter() - start
+    return FRAMES / elapsed
+
+
+def main():
+    modes = [("native dirty", None, True), ("native full", None, False)]
+    modes += [("logical " + str(pixels), pixels, True)
+              for pixels in LOGICAL_PIXELS]
+    print("Cell size {}, {} frames".format(CELL_SIZE, FRAMES))
+    print("{:>10}  {:>13}  {:>8}".format("screen", "mode", "fps"))
+    for resolusion in RESOLUSIONS:
+        game = SnakeGame(resolusion)
+        game.cell_size = (CELL_SIZE, str(CELL_SIZE))
+        game.calculate_grid()
+        script = record_script(game)
+        for label, pixels, dirty in modes:
+            game.logical_pixels = pixels
+            game.dirty_rendering = dirty
+            game.calculate_grid()
+            print("{:>10}  {:>13}  {:>8.1f}".format(
+                "{}x{}".format(*resolusion), label, bench(game, script)))
+        pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_render.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Per-frame cost of drawing the in-game background.
+
+Compares filling the screen and calling draw_grid every frame with blitting
+the cached surface from get_background. Uses the SDL dummy video driver so it
+runs without a display. Run from the repository root:
+
+    python3 -m benchmarks.bench_render
+"""
+
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from main import SnakeGame
+
+RESOLUTIONS = ((1920, 1080), (2560, 1440), (3840, 2160))
+CELL_SIZES = (10, 20, 40)
+FRAMES = 100
+
+
+def make_game(resolution, cell_size):
+    """ Set up a SnakeGame for drawing, without entering the menu loop.
+
+    Args:
+        resolution (tuple): Screen width and height
+        cell_size (int): Cell size in pixels
+
+    Returns:
+        SnakeGame: Game with screen, grid and skin set
+    """
+    game = SnakeGame.__new__(SnakeGame)
+    game.screen = pygame.display.set_mode(resolution)
+    game.screen_res_x, game.screen_res_y = resolution
+    game.cell_size = (cell_size, str(cell_size))
+    game.background = None
+    game.background_key = None
+    game.skin = 'dark'
+    game.skin_bg = (40, 44, 52)
+    game.skin_grid = (59, 64, 72)
+    return game
+
+
+def time_frames(draw):
+    """ Time a draw function.
+
+    Args:
+        draw (function): Draws a single frame
+
+    Returns:
+        float: Milliseconds per frame
+    """
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        draw()
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+
+def main():
+    pygame.display.init()
+    print("{:>11}  {:>5}  {:>12}  {:>12}".format(
+        "resolution", "cell", "before ms", "after ms"))
+    for resolution in RESOLUTIONS:
+        for cell_size in CELL_SIZES:
+            game = make_game(resolution, cell_size)
+
+            def before():
+                game.screen.fill(game.skin_bg)
+                game.draw_grid()
+
+            def after():
+                game.screen.blit(game.get_background(), (0, 0))
+
+            game.get_background()
+            print("{:>11}  {:>5}  {:>12.3f}  {:>12.3f}".format(
+                "{}x{}".format(*resolution), cell_size,
+                time_frames(before), time_frames(after)))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
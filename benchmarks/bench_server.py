@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_server.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Load test of server.py with many simulated clients.
+
+For every number of clients a server is started on localhost, on a 384x216
+arena, and every client connects over TCP, steers its snake at random and
+reads every tick. Reports the time the server takes to run, encode and send
+a tick against the budget of 30 ticks per second, and the bytes sent per
+tick to every client, next to the size of the whole arena as sent to a
+client joining. One client keeps a mirror of the arena, which has to match
+the server's at the end.
+
+Clients run in the same process as the server, on the same event loop, so
+two file descriptors are used per client.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_server
+"""
+
+import asyncio
+import random
+
+from arena import Arena
+from netplay import (TICK, TURN, WELCOME, ArenaMirror, encode_welcome,
+                     frame, read_frames)
+from server import ArenaServer
+
+GRID = (384, 216)
+CLIENTS = (50, 200, 1000)
+TICKS = 150
+SPEED = 30
+SEED = 1
+
+# 30 ticks per second
+BUDGET_MS = 1000 / SPEED
+
+
+async def client(port, seed, stop, mirror=False):
+    """ Play a client, turning at random.
+
+    Args:
+        port (int): Port of the server
+        seed (int): Seed of the turns
+        stop (asyncio.Event): Set when the test is over
+        mirror (bool): Keep a mirror of the arena
+
+    Returns:
+        tuple: Bytes of the ticks received and the mirror, if kept
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    buffer = bytearray()
+    received = 0
+    arena = None
+    while not stop.is_set():
+        data = await reader.read(1 << 16)
+        if not data:
+            break
+        buffer += data
+        for kind, payload in read_frames(buffer):
+            if kind == WELCOME and mirror:
+                arena = ArenaMirror(payload)
+            elif kind == TICK:
+                received += len(payload) + 5
+                if arena is not None:
+                    arena.apply_tick(payload)
+                if rng.random() < 0.2:
+                    writer.write(frame(TURN, bytes((rng.randrange(4),))))
+    writer.close()
+    return received, arena
+
+
+async def bench(clients):
+    """ Run a server with simulated clients.
+
+    Args:
+        clients (int): Number of clients
+
+    Returns:
+        tuple: Server, bytes received per client and the checked mirror
+    """
+    server = ArenaServer(Arena(*GRID, bots=0, speed=SPEED, seed=SEED,
+                               player=False))
+    listener = await asyncio.start_server(
+        server.handle_client, '127.0.0.1', 0, backlog=clients)
+    port = listener.sockets[0].getsockname()[1]
+
+    stop = asyncio.Event()
+    tasks = [asyncio.ensure_future(client(port, idx, stop, idx == 0))
+             for idx in range(clients)]
+    while len(server.clients) < clients:
+        await asyncio.sleep(0.01)
+
+    await server.run(TICKS)
+    stop.set()
+    for writer in list(server.clients.values()):
+        writer.close()
+    results = await asyncio.gather(*tasks)
+    listener.close()
+    await listener.wait_closed()
+    return server, [received for received, _ in results], results[0][1]
+
+
+def main():
+    print("Grid {}x{}, {} ticks, budget {:.1f} ms/tick".format(
+        GRID[0], GRID[1], TICKS, BUDGET_MS))
+    print("{:>7}  {:>8}  {:>8}  {:>10}  {:>11}  {:>6}  {:>6}".format(
+        "clients", "p50 ms", "p99 ms", "bytes/tick", "arena bytes",
+        "alive", "mirror"))
+    for clients in CLIENTS:
+        server, received, mirror = asyncio.run(bench(clients))
+        report = server.tick_times.report((50, 99))
+        arena = server.arena
+        print("{:>7}  {:>8.3f}  {:>8.3f}  {:>10.0f}  {:>11}  {:>6}  "
+              "{:>6}".format(
+                  clients, report[50], report[99],
+                  server.bytes_sent / server.ticks_sent,
+                  len(encode_welcome(arena, 1)), arena.alive,
+                  'ok' if mirror.occupied == arena.occupied else 'FAIL'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_snapshot.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Snapshot cost versus snake length.
+
+capture() runs in the game loop, encode() on the writer thread.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_snapshot
+"""
+
+import time
+
+import snapshot
+from benchmarks.bench_engine import serpentine
+from replay import Replay
+
+# Small cells on a 4K screen
+RESOLUSION = (3840, 2160)
+CELL_SIZE = 10
+LENGTHS = (3, 1000, 10000, 50000, 80000)
+ROUNDS = 50
+
+
+def bench_length(length):
+    """ Time snapshots of a snake of fixed length.
+
+    Args:
+        length (int): Number of segments
+
+    Returns:
+        tuple: Milliseconds for capture, encode and loads, and the size
+    """
+    replay = Replay(0, 60, CELL_SIZE, RESOLUSION)
+    engine = replay.new_engine()
+    engine.place_snake(serpentine(engine.cell_width, length), 'right')
+    engine.apple_cell = engine.free[0]
+
+    capture = encode = 0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        captured = snapshot.capture(engine, replay)
+        middle = time.perf_counter()
+        data = snapshot.encode(captured)
+        capture += middle - start
+        encode += time.perf_counter() - middle
+
+    start = time.perf_counter()
+    restored = snapshot.loads(data)[0]
+    loads = time.perf_counter() - start
+    assert list(restored.body) == list(engine.body)
+    return (capture * 1000 / ROUNDS, encode * 1000 / ROUNDS, loads * 1000,
+            len(data))
+
+
+def main():
+    print("Grid {}x{}, {} rounds".format(
+        RESOLUSION[0] // CELL_SIZE, RESOLUSION[1] // CELL_SIZE, ROUNDS))
+    print("{:>8}  {:>10}  {:>10}  {:>10}  {:>8}".format(
+        "length", "capture ms", "encode ms", "loads ms", "KiB"))
+    for length in LENGTHS:
+        capture, encode, loads, size = bench_length(length)
+        print("{:>8}  {:>10.3f}  {:>10.3f}  {:>10.1f}  {:>8.0f}".format(
+            length, capture, encode, loads, size / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_suite.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Headless benchmark suite over resolusions and cell sizes.
+
+Starts SnakeGame in a window on the SDL dummy video driver, so it runs on
+CI boxes and servers without a display. For every resolusion and cell size
+it plays a scripted game and reports:
+
+    startup_ms     SnakeGame() construction alone: display mode, fonts
+                   and skins, once per resolusion, before the welcome
+                   screen is drawn
+    ticks_per_sec  SnakeEngine.step alone
+    full_fps       draw_grid, draw_snake, draw_apple and draw_score of the
+                   whole screen every frame
+    game_fps       draw_frame and update_display after a tick, as in game_loop
+
+The script is the greedy bot playing from a fixed seed, recorded once and
+then replayed for every measurement, so runs are comparable. Results are
+saved as JSON, and compared with an earlier run with --compare. Run from
+the repository root:
+
+    python3 -m benchmarks.bench_suite [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from bots import greedy_policy
+from engine import SnakeEngine
+from main import SnakeGame
+
+RESOLUSIONS = ((1920, 1080), (2560, 1440), (3840, 2160))
+CELL_SIZES = (10, 20, 40, 16, 32, 64)
+SEED = 0
+TICKS = 20000
+FRAMES = 200
+
+# Results where a higher number is better, the rest are lower is better
+HIGHER_IS_BETTER = ('ticks_per_sec', 'full_fps', 'game_fps')
+
+
+def record_script(game):
+    """ Record the turns of the greedy bot playing one game.
+
+    Args:
+        game (SnakeGame): Game with the grid set up
+
+    Returns:
+        list: Direction or None for every tick until game over
+    """
+    engine = new_engine(game)
+    rng = random.Random(SEED)
+    script = []
+    while len(script) < TICKS:
+        direction = greedy_policy(engine, rng)
+        script.append(direction)
+        if not engine.step(direction):
+            break
+    return script
+
+
+def new_engine(game):
+    """ Create the engine the script was recorded with.
+
+    Args:
+        game (SnakeGame): Game with the grid set up
+
+    Returns:
+        SnakeEngine: New engine
+    """
+    return SnakeEngine(
+        game.cell_width, game.cell_height, divided=game.divided,
+        speed=game.snake_speed[0], seed=SEED)
+
+
+def scripted_ticks(game, script, count):
+    """ Play the script, from the start again after each game over.
+
+    Args:
+        game (SnakeGame): Game with the grid set up, its engine is replaced
+        script (list): Direction or None per tick
+        count (int): Number of ticks
+
+    Yields:
+        SnakeEngine: Engine after every tick
+    """
+    played = 0
+    while played < count:
+        game.engine = new_engine(game)
+        for direction in script:
+            game.engine.step(direction)
+            played += 1
+            yield game.engine
+            if played == count:
+                return
+
+
+def bench_ticks(game, script):
+    """ Time the engine alone.
+
+    Args:
+        game (SnakeGame): Game with the grid set up
+        script (list): Direction or None per tick
+
+    Returns:
+        float: Ticks per second
+    """
+    start = time.perf_counter()
+    for _ in scripted_ticks(game, script, TICKS):
+        pass
+    return TICKS / (time.perf_counter() - start)
+
+
+def bench_full(game, script):
+    """ Time drawing the whole screen every frame.
+
+    Args:
+        game (SnakeGame): Game with the grid set up
+        script (list): Direction or None per tick
+
+    Returns:
+        float: Frames per second
+    """
+    elapsed = 0
+    for engine in scripted_ticks(game, script, FRAMES):
+        start = time.perf_counter()
+        game.screen.fill(game.skin_bg)
+        game.draw_grid()
+        game.draw_snake(engine.snake)
+        if engine.apple is not None:
+            game.draw_apple(engine.apple)
+        game.draw_score(engine.apples)
+        pygame.display.update()
+        elapsed += time.perf_counter() - start
+    return FRAMES / elapsed
+
+
+def bench_game(game, script):
+    """ Time ticks drawn the way game_loop draws them.
+
+    Args:
+        game (SnakeGame): Game with the grid set up
+        script (list): Direction or None per tick
+
+    Returns:
+        float: Frames per second
+    """
+    game.dirty_rects = []
+    elapsed = 0
+    for engine in scripted_ticks(game, script, FRAMES):
+        start = time.perf_counter()
+        game.draw_frame(full=engine.ticks == 1)
+        game.update_display()
+        elapsed += time.perf_counter() - start
+    return FRAMES / elapsed
+
+
+def run():
+    """ Run every benchmark.
+
+    Returns:
+        dict: Results per "WxH/cell" key, and the environment
+    """
+    results = {}
+    for resolusion in RESOLUSIONS:
+        # Startup
+        start = time.perf_counter()
+        game = SnakeGame(resolusion)
+        startup_ms = (time.perf_counter() - start) * 1000
+
+        for cell_size in CELL_SIZES:
+            game.cell_size = (cell_size, str(cell_size))
+            game.calculate_grid()
+            script = record_script(game)
+            key = "{}x{}/{}".format(resolusion[0], resolusion[1], cell_size)
+            results[key] = {
+                'startup_ms': startup_ms,
+                'ticks_per_sec': bench_ticks(game, script),
+                'full_fps': bench_full(game, script),
+                'game_fps': bench_game(game, script)
+            }
+            print("{:>14}  {:>10.1f}  {:>10.0f}  {:>10.1f}  {:>10.1f}".format(
+                key, *results[key].values()))
+        pygame.quit()
+
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+
+def compare(old, new):
+    """ Print the change of every result against an earlier run.
+
+    Args:
+        old (dict): Earlier run
+        new (dict): This run
+    """
+    print("\nChange against the earlier run, positive is better")
+    for key, values in new['results'].items():
+        if key not in old['results']:
+            continue
+        changes = []
+        for name, value in values.items():
+            before = old['results'][key].get(name)
+            if not before:
+                continue
+            change = (value - before) / before * 100
+            if name not in HIGHER_IS_BETTER:
+                change = -change
+            changes.append("{} {:+.1f}%".format(name, change))
+        print("{:>14}  {}".format(key, ", ".join(changes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', default='bench_results.json',
+                        help="file to save the results to")
+    parser.add_argument('--compare', help="results of an earlier run")
+    args = parser.parse_args()
+
+    print("{:>14}  {:>10}  {:>10}  {:>10}  {:>10}".format(
+        "grid", "startup ms", "ticks/s", "full fps", "game fps"))
+    results = run()
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+    print("Saved to " + args.output)
+
+    if args.compare:
+        with open(args.compare) as earlier:
+            compare(json.load(earlier), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_tiles.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Cost of drawing the snake versus its length.
+
+Compares two pygame.draw.rect calls per segment, which is how draw_snake
+used to draw, with the pre-rendered tile drawn by a single Surface.blits
+call. Uses the SDL dummy video driver so it runs without a display. Run
+from the repository root:
+
+    python3 -m benchmarks.bench_tiles
+"""
+
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from benchmarks.bench_engine import serpentine
+from main import SnakeGame
+
+RESOLUSION = (1920, 1080)
+CELL_SIZE = 10
+LENGTHS = (3, 100, 500, 2000, 10000, 20000)
+FRAMES = 50
+
+
+def draw_rects(game, snake_coord):
+    """ Draw the snake with two rects per segment, the old way.
+
+    Args:
+        game (SnakeGame): Game to draw on
+        snake_coord (list): List of x/y coordinate tuples
+    """
+    size = game.cell_size[0]
+    for x, y in snake_coord:
+        pygame.draw.rect(
+            game.screen, game.skin_snake_edges,
+            pygame.Rect(x * size, y * size, size, size))
+        pygame.draw.rect(
+            game.screen, game.skin_snake,
+            pygame.Rect(x * size + 2, y * size + 2, size - 4, size - 4))
+
+
+def time_frames(draw, snake):
+    """ Time drawing a snake.
+
+    Args:
+        draw (function): Draws the snake
+        snake (list): List of x/y coordinate tuples
+
+    Returns:
+        float: Milliseconds per frame
+    """
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        draw(snake)
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+
+def main():
+    game = SnakeGame(RESOLUSION)
+    game.cell_size = (CELL_SIZE, "Small")
+    game.calculate_grid()
+
+    print("{}x{}, cell size {}".format(
+        RESOLUSION[0], RESOLUSION[1], CELL_SIZE))
+    print("{:>8}  {:>10}  {:>10}".format("length", "rects ms", "blits ms"))
+    for length in LENGTHS:
+        snake = serpentine(game.cell_width, length)
+
+        # Both must draw the same pixels
+        game.screen.fill(game.skin_bg)
+        draw_rects(game, snake)
+        before = pygame.image.tobytes(game.screen, 'RGB')
+        game.screen.fill(game.skin_bg)
+        game.draw_snake(snake)
+        assert pygame.image.tobytes(game.screen, 'RGB') == before
+
+        print("{:>8}  {:>10.3f}  {:>10.3f}".format(
+            length,
+            time_frames(lambda coords: draw_rects(game, coords), snake),
+            time_frames(game.draw_snake, snake)))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/bench_world.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Endless mode on a 1 million cell world, for snakes of growing length.
+
+For every length a snake is laid out in rows below the middle of the world
+and steered up, so the camera follows it every tick. Reports the memory of
+the engine, ticks per second and the time to draw and present a tick the
+way game_loop does, at 1080p. A SnakeEngine with the same number of cells
+is measured for comparison.
+
+Run from the repository root:
+
+    python3 -m benchmarks.bench_world
+"""
+
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from engine import SnakeEngine
+from main import SnakeGame
+from world import WorldEngine
+
+WORLD = (1000, 1000)
+LENGTHS = (1000, 10000, 100000, 400000)
+ROW = 800
+TICKS = 400
+RESOLUSION = (1920, 1080)
+CELL_SIZE = 20
+
+
+def serpentine(length):
+    """ Lay out a snake in rows, head first at the top right.
+
+    Args:
+        length (int): Number of segments
+
+    Returns:
+        list: x/y coordinates
+    """
+    left = (WORLD[0] - ROW) // 2
+    top = WORLD[1] // 2 - length // ROW // 2
+    cells = []
+    for idx in range(length):
+        row, column = divmod(idx, ROW)
+        if row % 2 == 0:
+            column = ROW - 1 - column
+        cells.append((left + column, top + row))
+    return cells
+
+
+def new_engine(length):
+    """ Create an endless game with a long snake.
+
+    Args:
+        length (int): Number of segments
+
+    Returns:
+        tuple: WorldEngine and the traced memory in bytes
+    """
+    tracemalloc.start()
+    engine = WorldEngine(*WORLD, seed=0)
+    engine.place_snake(serpentine(length), direction='up')
+    engine.apple = engine.get_random_location()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return engine, memory
+
+
+def bench_ticks(length):
+    """ Time the engine alone.
+
+    Args:
+        length (int): Number of segments
+
+    Returns:
+        float: Ticks per second
+    """
+    engine = new_engine(length)[0]
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        engine.step('up')
+    return TICKS / (time.perf_counter() - start)
+
+
+def bench_frames(game, length):
+    """ Time ticks drawn the way game_loop draws them.
+
+    Args:
+        game (SnakeGame): Game in endless mode
+        length (int): Number of segments
+
+    Returns:
+        float: Milliseconds per frame
+    """
+    game.engine = new_engine(length)[0]
+    game.camera = (0, 0)
+    game.setup_canvas(*game.view_size())
+    game.dirty_rects = []
+    game.draw_frame(full=True)
+    game.update_display()
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        game.engine.step('up')
+        game.draw_frame()
+        game.update_display()
+    return (time.perf_counter() - start) / TICKS * 1000
+
+
+def main():
+    game = SnakeGame(RESOLUSION)
+    game.world = WORLD
+    game.cell_size = (CELL_SIZE, str(CELL_SIZE))
+    game.calculate_grid()
+
+    # Flat board of the same size
+    tracemalloc.start()
+    engine = SnakeEngine(*WORLD)
+    flat = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del engine
+    print("World {}x{}, SnakeEngine of the same size takes {:.1f} MB".format(
+        WORLD[0], WORLD[1], flat / 2 ** 20))
+
+    print("{:>8}  {:>8}  {:>10}  {:>8}  {:>9}".format(
+        "length", "chunks", "memory MB", "ticks/s", "frame ms"))
+    for length in LENGTHS:
+        engine, memory = new_engine(length)
+        print("{:>8}  {:>8}  {:>10.2f}  {:>8.0f}  {:>9.3f}".format(
+            length, len(engine.occupied.chunks), memory / 2 ** 20,
+            bench_ticks(length), bench_frames(game, length)))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
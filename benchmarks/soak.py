@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (benchmarks/soak.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Soak test, plays many rounds through the scene loop.
+
+Starts SnakeGame on the SDL dummy video driver and drives it with posted key
+events: Enter on the welcome screen, random turns while playing and Enter on
+the game over screen. Memory is sampled every few hundred rounds and the run
+fails if it keeps growing. Run from the repository root:
+
+    python3 -m benchmarks.soak [rounds]
+"""
+
+import os
+import random
+import resource
+import sys
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from main import SnakeGame
+
+ROUNDS = 2000
+SAMPLE_EVERY = 250
+WARMUP = 100
+
+# Allowed growth of traced Python memory after warm-up, in bytes
+MAX_GROWTH = 512 * 1024
+
+TURNS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+
+
+def press(key):
+    """ Post a key press to the event queue.
+
+    Args:
+        key (int): pygame key constant
+    """
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS
+    rng = random.Random(0)
+
+    game = SnakeGame()
+    game.countdown_delay = 0
+    game.snake_speed = (1000, "Soak")
+
+    tracemalloc.start()
+    baseline = None
+    played = 0
+    print("{:>7}  {:>12}  {:>12}".format(
+        "rounds", "traced KiB", "max rss KiB"))
+    while played < rounds:
+        scene = game.scene
+        if scene in ('welcome', 'game_over'):
+            press(pygame.K_RETURN)
+        elif scene == 'playing':
+            for _ in range(rng.randrange(4)):
+                press(rng.choice(TURNS))
+        game.run_scene()
+
+        if scene != 'game_over':
+            continue
+        played += 1
+
+        # Sample memory
+        if played == WARMUP:
+            baseline = tracemalloc.get_traced_memory()[0]
+        if played % SAMPLE_EVERY == 0:
+            print("{:>7}  {:>12.0f}  {:>12}".format(
+                played, tracemalloc.get_traced_memory()[0] / 1024,
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+    growth = tracemalloc.get_traced_memory()[0] - baseline
+    print("Growth after warm-up: {:.1f} KiB".format(growth / 1024))
+    pygame.quit()
+    if growth > MAX_GROWTH:
+        sys.exit("Memory grew by more than {} KiB".format(MAX_GROWTH // 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (bots.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Simple bot policies for the headless engine.
+
+A policy is a function taking a SnakeEngine and a random.Random and
+returning the direction for the next tick, or None to keep going straight.
+A class can be used for policies that keep state, a new instance is made
+for every game.
+"""
+
+from autopilot import Autopilot
+from engine import DIRECTIONS, OPPOSITE
+
+
+def safe_directions(engine):
+    """ Get the directions that do not end the game next tick.
+
+    Args:
+        engine (SnakeEngine): Game to look at
+
+    Returns:
+        list: Directions, in the order of DIRECTIONS
+    """
+    safe = []
+    tail = engine.body[-1]
+    for direction, (move_x, move_y) in DIRECTIONS.items():
+        if direction == OPPOSITE[engine.direction]:
+            continue
+        x, y = engine.head_x + move_x, engine.head_y + move_y
+        if not (0 <= x < engine.cell_width and 0 <= y < engine.cell_height):
+            continue
+        cell = y * engine.cell_width + x
+        if engine.occupied[cell] and (
+                cell != tail or cell == engine.apple_cell):
+            continue
+        safe.append(direction)
+    return safe
+
+
+def random_policy(engine, rng):
+    """ Turn at random, but never straight into a wall or the body. """
+    safe = safe_directions(engine)
+    return rng.choice(safe) if safe else None
+
+
+def greedy_policy(engine, rng):
+    """ Head for the apple along the safe direction that gets closest. """
+    safe = safe_directions(engine)
+    if not safe or engine.apple is None:
+        return None
+    apple_x, apple_y = engine.apple
+
+    def distance(direction):
+        move_x, move_y = DIRECTIONS[direction]
+        return (abs(engine.head_x + move_x - apple_x) +
+                abs(engine.head_y + move_y - apple_y))
+
+    return min(safe, key=distance)
+
+
+# Policies by name
+POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+    'autopilot': Autopilot
+}
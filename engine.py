@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (engine.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Headless game rules for Classic Snake HD.
+
+The engine owns the snake, the apple, the score and the game over state and
+knows nothing about pygame, so it can be stepped as fast as the CPU allows
+for simulations, tests and bots. SnakeGame in main.py renders it.
+"""
+
+import random
+from array import array
+from collections import deque
+
+# Movement per direction as (x, y) offsets
+DIRECTIONS = {
+    'up': (0, -1),
+    'down': (0, 1),
+    'left': (-1, 0),
+    'right': (1, 0)
+}
+
+# Direction numbers, index into this tuple, as used in SnakeEngine.links
+ACTIONS = ('up', 'down', 'left', 'right')
+
+ACTION_NUMBERS = {action: idx for idx, action in enumerate(ACTIONS)}
+
+# Direction the snake may never turn into from a given heading
+OPPOSITE = {
+    'up': 'down',
+    'down': 'up',
+    'left': 'right',
+    'right': 'left'
+}
+
+# What SnakeEngine.occupied holds for a taken cell, walls and portals come
+# from a level, see levels.py
+SNAKE = 1
+WALL = 2
+PORTAL = 3
+
+
+class BaseEngine:
+    """ What every game of a single snake has, whatever holds its board.
+
+    Subclasses keep the snake as body, a deque of packed cells (y * width +
+    x) head first, with head_x, head_y and direction, an occupied grid
+    indexed by cell, the apple in apple_cell, the grid size in cell_width
+    and cell_height and the speed, and implement reset and step.
+    """
+
+    # The board fits on the screen, see world.WorldEngine for endless games
+    # and arena.Arena for many snakes
+    endless = False
+    arena = False
+
+    # Walls, portals and spawn points, see levels.Level
+    level = None
+
+    def to_cell(self, coordinates):
+        """ Pack x/y coordinates into a cell index.
+
+        Args:
+            coordinates (tuple): x/y coordinates
+
+        Returns:
+            int: Cell index
+        """
+        return coordinates[1] * self.cell_width + coordinates[0]
+
+    def to_coordinates(self, cell):
+        """ Unpack a cell index into x/y coordinates.
+
+        Args:
+            cell (int): Cell index
+
+        Returns:
+            tuple: x/y coordinates
+        """
+        y, x = divmod(cell, self.cell_width)
+        return x, y
+
+    @property
+    def snake(self):
+        """ list: x/y coordinates of every segment, head first """
+        width = self.cell_width
+        return [(cell % width, cell // width) for cell in self.body]
+
+    @property
+    def head(self):
+        """ tuple: x/y coordinates of the snake head """
+        return self.head_x, self.head_y
+
+    @property
+    def apple(self):
+        """ tuple: x/y coordinates of the apple, None if the board is full """
+        if self.apple_cell is None:
+            return None
+        return self.to_coordinates(self.apple_cell)
+
+    @apple.setter
+    def apple(self, coordinates):
+        if coordinates is None:
+            self.apple_cell = None
+        else:
+            self.apple_cell = self.to_cell(coordinates)
+
+    def is_apple(self, cell):
+        """ Check if the apple is in a cell.
+
+        Args:
+            cell (int): Cell index
+
+        Returns:
+            bool: True if the apple is there
+        """
+        return cell == self.apple_cell
+
+    def is_snake(self, cell):
+        """ Check if the snake is in a cell, and not a wall or portal.
+
+        Args:
+            cell (int): Cell index
+
+        Returns:
+            bool: True if a segment is there
+        """
+        return self.occupied[cell] == SNAKE
+
+    @property
+    def length(self):
+        """ int: Number of segments """
+        return len(self.body)
+
+    @property
+    def apples(self):
+        """ int: Number of apples eaten this game """
+        return len(self.body) - 3
+
+    @property
+    def score(self):
+        """ int: Score as shown in game, apples times snake speed """
+        return self.apples * self.speed
+
+    def turn(self, direction):
+        """ Change heading, unless it reverses the snake onto itself.
+
+        Args:
+            direction (str): 'up', 'down', 'left' or 'right'
+
+        Returns:
+            bool: True if the heading changed
+        """
+        if direction not in DIRECTIONS or direction == self.direction:
+            return False
+        if direction == OPPOSITE[self.direction]:
+            return False
+        self.direction = direction
+        return True
+
+
+class SnakeEngine(BaseEngine):
+    """ The rules of a single snake game, without any rendering """
+
+    def __init__(self, cell_width, cell_height, divided=True, speed=15,
+                 rng=None, seed=None, level=None):
+        """ Create an engine and start a new game.
+
+        Args:
+            cell_width (int): Number of cells horizontally
+            cell_height (int): Number of cells vertically
+            divided (bool): If the resolusion divides evenly into cells,
+                decides the start position like SnakeGame.calculate_grid
+            speed (int): Snake speed, used as the score multiplier
+            rng (random.Random): Random source, defaults to a new
+                random.Random seeded with seed
+            seed (int): Seed for the default random source, so the same
+                seed and turns replay the same game
+            level (levels.Level): Optional level of the same size as the
+                grid
+
+        Raises:
+            ValueError: If the level is another size than the grid
+        """
+        if level is not None and (level.width, level.height) != (
+                cell_width, cell_height):
+            raise ValueError("Level {} is {}x{} cells, not {}x{}".format(
+                level.name, level.width, level.height, cell_width,
+                cell_height))
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.level = level
+        self.divided = divided
+        self.speed = speed
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.occupied = bytearray(cell_width * cell_height)
+        self.links = bytearray(cell_width * cell_height)
+        self.reset()
+
+    def reset(self):
+        """ Reset the snake, apple and score for a new game. """
+
+        # Start position, three cells long, heading up, or a random spawn
+        # point of the level with the body behind the head
+        if self.level is not None and self.level.spawns:
+            spawns = self.level.spawns
+            cell, direction = spawns[self.rng.randrange(len(spawns))]
+            head_x, head_y = self.to_coordinates(cell)
+            move_x, move_y = DIRECTIONS[direction]
+            self.place_snake(
+                [(head_x - move_x * idx, head_y - move_y * idx)
+                 for idx in range(3)],
+                direction=direction)
+        else:
+            offset = 6 if self.divided else 4
+            head_x = self.cell_width - offset
+            head_y = self.cell_height - offset
+            self.place_snake(
+                [(head_x, head_y), (head_x - 1, head_y),
+                 (head_x - 2, head_y)],
+                direction='up')
+
+        # Game state
+        self.apple = self.get_random_location()
+        self.ticks = 0
+        self.vacated = None
+        self.game_over = False
+        self.cause = None
+
+    def place_snake(self, coordinates, direction='up'):
+        """ Replace the snake with the given cells.
+
+        The body is kept as a deque of packed cell indices (y * width + x),
+        head first, next to a bytearray with one byte per cell marking what
+        is occupied. Moving, growing and the collision test are then constant
+        time no matter how long the snake is.
+
+        Every cell not covered by the snake is also kept in a free list, with
+        a position map from cell to its index in that list, so a free cell is
+        removed by swapping in the last one. Picking a random free cell for
+        the apple is then constant time, even on a nearly full board.
+
+        The occupancy buffer is cleared in place, never replaced, so views
+        on it (e.g. a NumPy array in env.SnakeEnv) stay valid. With a level
+        it is reset to the walls and portals of the level instead, which are
+        then never free, and are hit like the body.
+
+        For every body cell but the head, links holds the number of the
+        direction (see ACTIONS) to the next segment towards the head. It is
+        one write per tick and lets snapshot.py save the body order from a
+        plain copy of the buffer. After the head went through a portal of a
+        level the next segment is not next to the cell, so links does not
+        describe the body of a game on a level.
+
+        Args:
+            coordinates (list): x/y tuples, head first
+            direction (str): Current heading
+        """
+        if self.level is not None:
+            self.occupied[:] = self.level.grid
+        else:
+            self.occupied[:] = bytes(len(self.occupied))
+        self.body = deque()
+        for x, y in coordinates:
+            cell = y * self.cell_width + x
+            if self.body:
+                self.links[cell] = self.link(cell, self.body[-1])
+            self.body.append(cell)
+            self.occupied[cell] = SNAKE
+        self.head_x, self.head_y = coordinates[0]
+        self.direction = direction
+
+        # Free cell index
+        self.free = []
+        self.free_pos = [-1] * len(self.occupied)
+        for cell, taken in enumerate(self.occupied):
+            if not taken:
+                self.free_pos[cell] = len(self.free)
+                self.free.append(cell)
+
+    def link(self, cell, toward):
+        """ Get the direction number from a cell to a cell next to it.
+
+        Args:
+            cell (int): Cell index
+            toward (int): Cell index next to it
+
+        Returns:
+            int: Index into ACTIONS
+        """
+        step = toward - cell
+        if step == -self.cell_width:
+            return 0
+        if step == self.cell_width:
+            return 1
+        return 2 if step == -1 else 3
+
+    def get_state(self):
+        """ Get a copy of the game state, to go back to with set_state.
+
+        Includes the order of the free list and the random state, so the
+        game continues exactly as it would have from here.
+
+        Returns:
+            dict: Game state
+        """
+        return {
+            'ticks': self.ticks,
+            'body': array('i', self.body),
+            'direction': self.direction,
+            'apple': self.apple_cell,
+            'free': array('i', self.free),
+            'rng': self.rng.getstate(),
+            'game_over': self.game_over,
+            'cause': self.cause
+        }
+
+    def set_state(self, state):
+        """ Go back to a state from get_state.
+
+        Without 'free' the free list place_snake builds is kept, in cell
+        order, so the apples that follow differ from the original game.
+
+        Args:
+            state (dict): Game state
+        """
+        self.place_snake(
+            [self.to_coordinates(cell) for cell in state['body']],
+            direction=state['direction'])
+        self.apple_cell = state['apple']
+        if 'free' in state:
+            self.free = list(state['free'])
+            for idx, cell in enumerate(self.free):
+                self.free_pos[cell] = idx
+        self.rng.setstate(state['rng'])
+        self.ticks = state['ticks']
+        self.vacated = None
+        self.game_over = state['game_over']
+        self.cause = state['cause']
+
+    def occupy_cell(self, cell):
+        """ Mark a cell as taken and drop it from the free list.
+
+        Args:
+            cell (int): Cell index
+        """
+        self.occupied[cell] = 1
+        idx = self.free_pos[cell]
+        last = self.free.pop()
+        if last != cell:
+            self.free[idx] = last
+            self.free_pos[last] = idx
+        self.free_pos[cell] = -1
+
+    def release_cell(self, cell):
+        """ Mark a cell as empty and add it to the free list.
+
+        Args:
+            cell (int): Cell index
+        """
+        self.occupied[cell] = 0
+        self.free_pos[cell] = len(self.free)
+        self.free.append(cell)
+
+    def get_random_location(self):
+        """ Get a random free location on grid.
+
+        Returns:
+            tuple: x/y coordinates, None if the snake fills the board
+        """
+        if not self.free:
+            return None
+        return self.to_coordinates(
+            self.free[self.rng.randrange(len(self.free))])
+
+    def step(self, direction=None):
+        """ Advance the game a single tick.
+
+        Moves the snake one cell, grows it if the apple is eaten and ends the
+        game if the head leaves the grid or runs into the body or a wall. A
+        head moving into a portal comes out of the other end of it, in the
+        cell past that end. Filling the whole board wins the game, with
+        cause set to 'win'. The cell the tail left this tick is kept in
+        vacated, so a renderer only needs to redraw what changed.
+
+        Args:
+            direction (str): Optional new heading for this tick
+
+        Returns:
+            bool: True while the game is still running
+        """
+        if self.game_over:
+            return False
+        if direction is not None:
+            self.turn(direction)
+
+        # Move the head one cell
+        move_x, move_y = DIRECTIONS[self.direction]
+        head_x = self.head_x + move_x
+        head_y = self.head_y + move_y
+        self.ticks += 1
+
+        # Game over if the snake hit a edge
+        if (head_x < 0 or head_x >= self.cell_width or
+           head_y < 0 or head_y >= self.cell_height):
+            self.game_over = True
+            self.cause = 'wall'
+            return False
+        cell = head_y * self.cell_width + head_x
+        occupied, free, free_pos = self.occupied, self.free, self.free_pos
+
+        # Through a portal, to the cell past its other end
+        if occupied[cell] == PORTAL:
+            head_y, head_x = divmod(self.level.portals[cell], self.cell_width)
+            head_x += move_x
+            head_y += move_y
+            if (head_x < 0 or head_x >= self.cell_width or
+               head_y < 0 or head_y >= self.cell_height):
+                self.game_over = True
+                self.cause = 'wall'
+                return False
+            cell = head_y * self.cell_width + head_x
+
+        # Release the tail cell before moving into it, unless growing.
+        # Same as release_cell, inlined as this runs every tick.
+        ate = cell == self.apple_cell
+        self.vacated = None
+        if not ate:
+            tail = self.body.pop()
+            occupied[tail] = 0
+            free_pos[tail] = len(free)
+            free.append(tail)
+
+        # Game over if the snake hit it self or a wall
+        if occupied[cell]:
+            if not ate:
+                self.body.append(tail)
+                self.occupy_cell(tail)
+            self.game_over = True
+            self.cause = 'self' if occupied[cell] == SNAKE else 'wall'
+            return False
+
+        # Move the snake by switching squares, same as occupy_cell
+        if not ate:
+            self.vacated = tail
+        self.links[self.body[0]] = ACTION_NUMBERS[self.direction]
+        self.body.appendleft(cell)
+        occupied[cell] = 1
+        idx = free_pos[cell]
+        last = free.pop()
+        if last != cell:
+            free[idx] = last
+            free_pos[last] = idx
+        free_pos[cell] = -1
+        self.head_x, self.head_y = head_x, head_y
+
+        # New apple, or a win if there is no room left for one
+        if ate:
+            self.apple = self.get_random_location()
+            if self.apple is None:
+                self.game_over = True
+                self.cause = 'win'
+                return False
+        return True
+
+
+class TurnQueue:
+    """ Bounded queue of turns waiting for the next ticks.
+
+    Key presses faster than the snake moves are kept instead of folded into
+    a single move, and the engine takes at most one per tick. A turn is
+    checked against the heading the snake will have when it is applied, the
+    last queued turn or else the current heading, so only real reversals and
+    repeats are dropped.
+    """
+
+    def __init__(self, size=3):
+        """ Create an empty queue.
+
+        Args:
+            size (int): Maximum number of waiting turns
+        """
+        self.turns = deque()
+        self.size = size
+
+    def __len__(self):
+        return len(self.turns)
+
+    def push(self, direction, heading, stamp=None):
+        """ Queue a turn.
+
+        Args:
+            direction (str): 'up', 'down', 'left' or 'right'
+            heading (str): Current heading of the snake
+            stamp (float): Optional time of the key press
+
+        Returns:
+            bool: True if the turn was queued
+        """
+        if self.turns:
+            heading = self.turns[-1][0]
+        if direction == heading or direction == OPPOSITE[heading]:
+            return False
+        if len(self.turns) >= self.size:
+            return False
+        self.turns.append((direction, stamp))
+        return True
+
+    def pop(self):
+        """ Take the next turn.
+
+        Returns:
+            tuple: Direction and stamp, None if the queue is empty
+        """
+        if self.turns:
+            return self.turns.popleft()
+        return None
+
+    def peek(self):
+        """ Get the next direction without taking it.
+
+        Returns:
+            str: Next direction, None if the queue is empty
+        """
+        if self.turns:
+            return self.turns[0][0]
+        return None
+
+    def clear(self):
+        """ Drop all waiting turns. """
+        self.turns.clear()
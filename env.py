@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (env.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Gym-style environment for training agents on Classic Snake HD.
+
+Observations are views, not copies. The board is a NumPy array over the
+occupancy buffer of the engine, and the optional RGB image is a surfarray
+view on a pygame surface that is drawn incrementally. A step allocates
+nothing for the observation.
+"""
+
+import random
+
+try:
+    import numpy as np
+except ImportError as e:
+    exit(str(e) + ". Try install numpy with 'pip3 install numpy'")
+
+from engine import ACTIONS, SnakeEngine
+
+# Colors of the RGB observation, the 'dark' skin
+COLORS = {
+    'bg': (40, 44, 52),
+    'snake': (198, 120, 214),
+    'apple': (224, 106, 92)
+}
+
+
+class SnakeEnv:
+    """ Snake with reset(seed) and step(action) -> obs, reward, done, info
+
+    The observation is a (cell_height, cell_width) uint8 array, 1 where the
+    snake is. The apple and head are in info. Actions are numbers into
+    engine.ACTIONS (up, down, left, right), -1 or None keeps the heading.
+
+    Rewards are 1 for an apple, -1 for hitting a edge or the snake itself
+    and 0 otherwise.
+    """
+
+    def __init__(self, cell_width=48, cell_height=27, divided=True,
+                 speed=15, rgb=False, cell_pixels=4):
+        """ Create the environment.
+
+        Args:
+            cell_width (int): Number of cells horizontally
+            cell_height (int): Number of cells vertically
+            divided (bool): Start position, as in SnakeEngine
+            speed (int): Snake speed, used as the score multiplier
+            rgb (bool): Also keep an RGB image, in info['rgb']
+            cell_pixels (int): Pixels per cell in the RGB image
+        """
+        self.engine = SnakeEngine(
+            cell_width, cell_height, divided=divided, speed=speed,
+            rng=random.Random())
+        self.board = np.frombuffer(self.engine.occupied, np.uint8).reshape(
+            cell_height, cell_width)
+        self.info = {}
+
+        # RGB image, drawn straight into the pixels of a pygame surface
+        self.rgb = None
+        self.cell_pixels = cell_pixels
+        if rgb:
+            import pygame
+            self.surface = pygame.Surface(
+                (cell_width * cell_pixels, cell_height * cell_pixels), 0, 32)
+            self.pixels = pygame.surfarray.pixels3d(self.surface)
+            self.rgb = self.pixels.transpose(1, 0, 2)
+
+    def reset(self, seed=None):
+        """ Start a new game.
+
+        Args:
+            seed (int): Seed for apple placement, None for a random game
+
+        Returns:
+            numpy.ndarray: Board observation
+        """
+        self.engine.rng.seed(seed)
+        self.engine.reset()
+        self.drawn_apple = self.engine.apple_cell
+
+        # Whole RGB image
+        if self.rgb is not None:
+            self.pixels[:] = COLORS['bg']
+            for cell in self.engine.body:
+                self.fill_cell(cell, COLORS['snake'])
+            self.fill_cell(self.engine.apple_cell, COLORS['apple'])
+
+        self.update_info()
+        return self.board
+
+    def step(self, action):
+        """ Advance the game a single tick.
+
+        Args:
+            action (int): Action number, -1 or None keeps the heading
+
+        Returns:
+            tuple: Observation, reward, done and info
+        """
+        engine = self.engine
+        apples = engine.apples
+        if action is None or action < 0:
+            alive = engine.step()
+        else:
+            alive = engine.step(ACTIONS[action])
+
+        # Reward
+        if engine.apples > apples:
+            reward = 1.0
+        elif not alive and engine.cause != 'win':
+            reward = -1.0
+        else:
+            reward = 0.0
+
+        # Changed cells of the RGB image
+        if self.rgb is not None and alive:
+            if engine.vacated is not None:
+                self.fill_cell(engine.vacated, COLORS['bg'])
+            self.fill_cell(engine.body[0], COLORS['snake'])
+            if engine.apple_cell != self.drawn_apple:
+                self.fill_cell(engine.apple_cell, COLORS['apple'])
+        self.drawn_apple = engine.apple_cell
+
+        self.update_info()
+        return self.board, reward, not alive, self.info
+
+    def fill_cell(self, cell, color):
+        """ Fill a cell of the RGB image.
+
+        Args:
+            cell (int): Cell index
+            color (tuple): RGB value
+        """
+        if cell is None:
+            return
+        x, y = self.engine.to_coordinates(cell)
+        size = self.cell_pixels
+        self.pixels[x * size:(x + 1) * size, y * size:(y + 1) * size] = color
+
+    def update_info(self):
+        """ Update the info dict in place, it is reused every step. """
+        engine = self.engine
+        self.info['apple'] = engine.apple
+        self.info['head'] = engine.head
+        self.info['direction'] = engine.direction
+        self.info['apples'] = engine.apples
+        self.info['score'] = engine.score
+        self.info['ticks'] = engine.ticks
+        self.info['cause'] = engine.cause
+        if self.rgb is not None:
+            self.info['rgb'] = self.rgb
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (levels.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Level packs of Classic Snake HD, with walls, portals and spawn points.
+
+A level is drawn as text, one character per cell:
+
+    #         wall
+    a to z    portal, but v, every letter twice, a head moving into one end
+              comes out of the other, in the cell past it
+    ^ v < >   spawn point, the head of the snake and its heading, with
+              room for the body behind it, without any the snake starts
+              in the free cell closest to the default start
+    .         free cell, as is any other character
+
+and built into a pack with a layout for every grid the game has at the
+given resolusions, one for each cell size, see SnakeGame.calculate_grid.
+Layouts are scaled from the text: a cell is a wall if any text cell it
+covers is, and portals and spawn points go to the middle of their text
+cell.
+
+A pack is a binary file of a header, a directory and the layouts:
+
+    header    HEADER: magic b'SNKL', version, number of levels and layouts
+    names     NAME of every level, UTF-8 padded with NUL bytes
+    layouts   LAYOUT of every layout: level, width, height, offset of its
+              data, number of portals and spawn points
+    data      the walls of every layout as a bitmap of a bit per cell,
+              lowest bit first, then the portals as PORTAL_PAIR cells and
+              the spawn points as SPAWN cell and direction number
+
+LevelPack opens it with mmap, so opening a pack only reads the directory,
+and a layout is read from disk when a game on it first starts. A grid the
+pack has no layout for is scaled from the largest layout, see
+LevelPack.fit.
+
+Run from the repository root to build a pack:
+
+    python3 levels.py resources/levels.pack resources/levels/*.txt
+"""
+
+import argparse
+import mmap
+import os
+import struct
+
+from engine import ACTIONS, ACTION_NUMBERS, DIRECTIONS, PORTAL, WALL
+
+MAGIC = b'SNKL'
+VERSION = 1
+HEADER = struct.Struct('<4sBHI')
+NAME = struct.Struct('<32s')
+LAYOUT = struct.Struct('<HHHIHH')
+PORTAL_PAIR = struct.Struct('<II')
+SPAWN = struct.Struct('<IB')
+
+# Headings of the spawn point characters
+SPAWN_CHARS = {'^': 'up', 'v': 'down', '<': 'left', '>': 'right'}
+
+# Cells of every byte of a wall bitmap, lowest bit first
+BITMAP_CELLS = [bytes(WALL if byte >> bit & 1 else 0 for bit in range(8))
+                for byte in range(256)]
+
+# Screens the packs are built for by default
+RESOLUSIONS = ((1280, 720), (1920, 1080), (2560, 1440), (3840, 2160))
+
+
+class Level:
+    """ Walls, portals and spawn points of a level on a grid of one size """
+
+    def __init__(self, name, width, height, grid, portals, spawns):
+        """ Create a level.
+
+        Args:
+            name (str): Name of the level
+            width (int): Number of cells horizontally
+            height (int): Number of cells vertically
+            grid (bytes): WALL, PORTAL or 0 for every cell, as copied into
+                SnakeEngine.occupied
+            portals (dict): Cell of the other end of every portal cell
+            spawns (list): Head cell and heading of every spawn point
+        """
+        self.name = name
+        self.width = width
+        self.height = height
+        self.grid = grid
+        self.portals = portals
+        self.spawns = spawns
+
+    @property
+    def walls(self):
+        """ list: x/y coordinates of every wall """
+        width = self.width
+        return [(cell % width, cell // width)
+                for cell, taken in enumerate(self.grid) if taken == WALL]
+
+
+class LevelPack:
+    """ A level pack file, read through mmap """
+
+    def __init__(self, path):
+        """ Open a pack and read its directory.
+
+        Args:
+            path (str): Path to the pack
+
+        Raises:
+            ValueError: If the file is not a level pack
+        """
+        with open(path, 'rb') as pack_file:
+            self.data = mmap.mmap(
+                pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError("Not a level pack: " + path)
+        magic, version, levels, layouts = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a level pack: " + path)
+
+        pos = HEADER.size
+        self.names = []
+        for _ in range(levels):
+            name = NAME.unpack_from(self.data, pos)[0]
+            self.names.append(name.rstrip(b'\0').decode('utf-8'))
+            pos += NAME.size
+        self.layouts = {}
+        for _ in range(layouts):
+            level, width, height, offset, portals, spawns = (
+                LAYOUT.unpack_from(self.data, pos))
+            self.layouts[level, width, height] = (offset, portals, spawns)
+            pos += LAYOUT.size
+
+        # Levels read or scaled so far, by level and grid size
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def sizes(self, level):
+        """ Get the grids a level has a layout for.
+
+        Args:
+            level (int): Index of the level
+
+        Returns:
+            list: Width/height tuples
+        """
+        return sorted((width, height)
+                      for number, width, height in self.layouts
+                      if number == level)
+
+    def layout(self, level, width, height):
+        """ Read the layout of a level for a grid.
+
+        Args:
+            level (int): Index of the level
+            width (int): Number of cells horizontally
+            height (int): Number of cells vertically
+
+        Returns:
+            Level: The level, None if it has no layout for the grid
+
+        Raises:
+            ValueError: If the level has no spawn point and no room for one
+        """
+        key = (level, width, height)
+        entry = self.layouts.get(key)
+        if entry is None:
+            return None
+        if key in self.cache:
+            return self.cache[key]
+        offset, portal_count, spawn_count = entry
+        data = self.data
+        cells = width * height
+
+        # Walls, then the portals on top
+        end = offset + (cells + 7) // 8
+        grid = bytearray(b''.join(
+            BITMAP_CELLS[byte] for byte in data[offset:end])[:cells])
+        portals = {}
+        for _ in range(portal_count):
+            first, second = PORTAL_PAIR.unpack_from(data, end)
+            grid[first] = grid[second] = PORTAL
+            portals[first], portals[second] = second, first
+            end += PORTAL_PAIR.size
+        spawns = []
+        for _ in range(spawn_count):
+            cell, direction = SPAWN.unpack_from(data, end)
+            spawns.append((cell, ACTIONS[direction]))
+            end += SPAWN.size
+        if not spawns:
+            spawns.append(free_spawn(self.names[level], grid, width, height))
+        self.cache[key] = Level(self.names[level], width, height,
+                                bytes(grid), portals, spawns)
+        return self.cache[key]
+
+    def fit(self, level, width, height):
+        """ Get a level for a grid, scaled if the pack has no layout for it.
+
+        Grids of other screens, windows or logical pixels are laid out from
+        the largest layout of the level, like scale_level lays out the text.
+
+        Args:
+            level (int): Index of the level
+            width (int): Number of cells horizontally
+            height (int): Number of cells vertically
+
+        Returns:
+            Level: The level, None if the pack has no layout of it
+
+        Raises:
+            ValueError: If the snake has no room to start on the grid
+        """
+        layout = self.layout(level, width, height)
+        key = (level, width, height)
+        if layout is None and key not in self.cache and self.sizes(level):
+            self.cache[key] = scale_level(
+                self.names[level], self.source(level), width, height)
+        return self.cache.get(key, layout)
+
+    def source(self, level):
+        """ Get the largest layout of a level as parse_level would.
+
+        Args:
+            level (int): Index of the level
+
+        Returns:
+            dict: Level to scale with scale_level
+        """
+        width, height = max(self.sizes(level),
+                            key=lambda size: size[0] * size[1])
+        layout = self.layout(level, width, height)
+        grid = layout.grid
+
+        def to_coordinates(cell):
+            return cell % width, cell // width
+
+        return {
+            'width': width,
+            'height': height,
+            'walls': [[grid[y * width + x] == WALL for x in range(width)]
+                      for y in range(height)],
+            'portals': [(to_coordinates(first), to_coordinates(second))
+                        for first, second in layout.portals.items()
+                        if first < second],
+            'spawns': [to_coordinates(cell) + (direction,)
+                       for cell, direction in layout.spawns]
+        }
+
+    def close(self):
+        """ Unmap the pack. """
+        self.data.close()
+
+
+def parse_level(text):
+    """ Read a level drawn as text, see the module docstring.
+
+    Args:
+        text (str): The level, a line per row
+
+    Returns:
+        dict: Width and height of the text, the walls as a row of booleans
+            per line, the portals as pairs of x/y coordinates and the spawn
+            points as x/y coordinates and heading
+
+    Raises:
+        ValueError: If a portal does not have exactly two ends
+    """
+    lines = text.rstrip('\n').split('\n')
+    width = max(len(line) for line in lines)
+    ends = {}
+    spawns = []
+    for y, line in enumerate(lines):
+        for x, char in enumerate(line):
+            if char in SPAWN_CHARS:
+                spawns.append((x, y, SPAWN_CHARS[char]))
+            elif 'a' <= char <= 'z':
+                ends.setdefault(char, []).append((x, y))
+    for char, cells in sorted(ends.items()):
+        if len(cells) != 2:
+            raise ValueError("Portal {} has {} ends".format(char, len(cells)))
+    return {
+        'width': width,
+        'height': len(lines),
+        'walls': [[x < len(line) and line[x] == '#' for x in range(width)]
+                  for line in lines],
+        'portals': [cells for char, cells in sorted(ends.items())],
+        'spawns': spawns
+    }
+
+
+def scale_level(name, source, width, height):
+    """ Lay out a level from parse_level on a grid.
+
+    Args:
+        name (str): Name of the level
+        source (dict): Return value of parse_level
+        width (int): Number of cells horizontally
+        height (int): Number of cells vertically
+
+    Returns:
+        Level: The level
+
+    Raises:
+        ValueError: If a spawn point has no room for the snake, or there
+            is no spawn point and no room for one
+    """
+    text_width, text_height = source['width'], source['height']
+    walls = source['walls']
+
+    def to_cell(x, y):
+        # Middle of the text cell
+        return ((2 * y + 1) * height // (2 * text_height) * width +
+                (2 * x + 1) * width // (2 * text_width))
+
+    # A wall wherever the cell covers one in the text
+    grid = bytearray(width * height)
+    for y in range(height):
+        top = y * text_height // height
+        rows = walls[top:max((y + 1) * text_height // height, top + 1)]
+        for x in range(width):
+            left = x * text_width // width
+            right = max((x + 1) * text_width // width, left + 1)
+            if any(any(row[left:right]) for row in rows):
+                grid[y * width + x] = WALL
+
+    portals = {}
+    for first, second in source['portals']:
+        first, second = to_cell(*first), to_cell(*second)
+        grid[first] = grid[second] = PORTAL
+        portals[first], portals[second] = second, first
+
+    # The snake starts three cells long, the body behind the head
+    spawns = []
+    for x, y, direction in source['spawns']:
+        cell = to_cell(x, y)
+        head_y, head_x = divmod(cell, width)
+        move_x, move_y = DIRECTIONS[direction]
+        for idx in range(3):
+            body_x, body_y = head_x - move_x * idx, head_y - move_y * idx
+            if (not (0 <= body_x < width and 0 <= body_y < height) or
+                    grid[body_y * width + body_x] == PORTAL):
+                raise ValueError("Spawn point at {},{} of {} has no room "
+                                 "on {}x{} cells".format(
+                                     x, y, name, width, height))
+            grid[body_y * width + body_x] = 0
+        spawns.append((cell, direction))
+    if not spawns:
+        spawns.append(free_spawn(name, grid, width, height))
+    return Level(name, width, height, bytes(grid), portals, spawns)
+
+
+def free_spawn(name, grid, width, height):
+    """ Find a spawn point for a level drawn without one.
+
+    The default start of SnakeEngine.reset may lie on the walls of the
+    level, so the snake starts at the free cell closest to it instead,
+    heading up with the body below the head and the cell above it free.
+
+    Args:
+        name (str): Name of the level
+        grid (bytes): WALL, PORTAL or 0 for every cell
+        width (int): Number of cells horizontally
+        height (int): Number of cells vertically
+
+    Returns:
+        tuple: Head cell and heading
+
+    Raises:
+        ValueError: If there is no room for the snake
+    """
+    start_x, start_y = width - 4, height - 4
+    heads = sorted(
+        ((x, y) for y in range(1, height - 2) for x in range(width)),
+        key=lambda head: abs(head[0] - start_x) + abs(head[1] - start_y))
+    for x, y in heads:
+        if not any(grid[(y + idx) * width + x] for idx in range(-1, 3)):
+            return y * width + x, 'up'
+    raise ValueError("{} has no room for the snake on {}x{} cells".format(
+        name, width, height))
+
+
+def grid_sizes(resolusion):
+    """ Get the grids the game has at a resolusion, one per cell size.
+
+    Args:
+        resolusion (tuple): Screen width and height
+
+    Returns:
+        list: Width/height tuples
+    """
+    res_x, res_y = resolusion
+    if res_x % 40 == 0 and res_y % 40 == 0:
+        sizes = (10, 20, 40)
+    else:
+        sizes = (16, 32, 64)
+    return [(res_x // size, res_y // size) for size in sizes]
+
+
+def write_pack(path, levels, grids):
+    """ Build a pack with a layout of every level for every grid.
+
+    Args:
+        path (str): Path to write the pack to
+        levels (list): Name and parse_level result of every level
+        grids (list): Width/height tuples
+    """
+    directory = []
+    data = bytearray()
+    start = HEADER.size + NAME.size * len(levels) + LAYOUT.size * (
+        len(levels) * len(grids))
+    for number, (name, source) in enumerate(levels):
+        for width, height in grids:
+            level = scale_level(name, source, width, height)
+            directory.append(LAYOUT.pack(
+                number, width, height, start + len(data),
+                len(level.portals) // 2, len(level.spawns)))
+
+            # Walls, a bit per cell
+            grid = level.grid
+            for idx in range(0, len(grid), 8):
+                byte = 0
+                for bit, taken in enumerate(grid[idx:idx + 8]):
+                    if taken == WALL:
+                        byte |= 1 << bit
+                data.append(byte)
+            for first, second in level.portals.items():
+                if first < second:
+                    data += PORTAL_PAIR.pack(first, second)
+            for cell, direction in level.spawns:
+                data += SPAWN.pack(cell, ACTION_NUMBERS[direction])
+
+    with open(path, 'wb') as pack_file:
+        pack_file.write(HEADER.pack(MAGIC, VERSION, len(levels),
+                                    len(directory)))
+        for name, source in levels:
+            pack_file.write(NAME.pack(name.encode('utf-8')))
+        pack_file.write(b''.join(directory))
+        pack_file.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('pack', help="level pack to write")
+    parser.add_argument('levels', nargs='+',
+                        help="levels drawn as text, see levels.py")
+    parser.add_argument('--resolusion', metavar='WxH', action='append',
+                        help="screen to lay the levels out for, every cell "
+                             "size, may be repeated")
+    args = parser.parse_args()
+
+    resolusions = RESOLUSIONS
+    if args.resolusion:
+        resolusions = [tuple(int(size) for size in resolusion.split('x'))
+                       for resolusion in args.resolusion]
+    grids = sorted(set(grid for resolusion in resolusions
+                       for grid in grid_sizes(resolusion)))
+
+    levels = []
+    for path in args.levels:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as level_file:
+            levels.append((name, parse_level(level_file.read())))
+    write_pack(args.pack, levels, grids)
+
+    # Read it back
+    pack = LevelPack(args.pack)
+    print("{}: {} levels, {} layouts, {} bytes".format(
+        args.pack, len(pack), len(pack.layouts), len(pack.data)))
+    for number, name in enumerate(pack.names):
+        print("  {}: {}".format(name, ", ".join(
+            "{}x{}".format(*size) for size in pack.sizes(number))))
+    pack.close()
+
+
+if __name__ == '__main__':
+    main()
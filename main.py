@@ -17,46 +17,126 @@ __version__ = "1.2"
 __copyright__ = "Copyright © 2016 Philip Andersen"
 
 try:
+    import argparse
     import sys
-    import random
     import json
+    import random
+    import time
     import pygame
+    from arena import Arena
+    from assets import AssetCache
+    from autopilot import Autopilot
+    from engine import DIRECTIONS, PORTAL, WALL, SnakeEngine, TurnQueue
+    from levels import LevelPack
+    from netplay import RemoteArena
+    from replay import Replay
+    from snapshot import SnapshotWriter, load as load_snapshot
+    from timing import FrameProfiler, LatencyTracker
+    from world import WorldEngine
 except ImportError as e:
     exit(str(e) + ". Try install pygame with 'pip3 install pygame'")
 
 
+# Names of the snake speeds and cell sizes, see toggle_snake_speed and
+# toggle_cell_size
+SPEED_NAMES = {10: "Very Easy", 15: "Easy", 30: "Medium", 60: "Hard"}
+CELL_SIZE_NAMES = {
+    10: "Small", 20: "Medium", 40: "Large",
+    16: "Small", 32: "Medium", 64: "Large"
+}
+
+# Phases of a frame timed by the profiler. The grid is drawn by blitting
+# the cached background, step is the engine moving the snake, checking for
+# collisions and placing apples.
+PHASES = (
+    'events', 'autopilot', 'step', 'draw_grid', 'draw_snake', 'draw_apple',
+    'draw_score', 'interpolate', 'overlay', 'update'
+)
+
+# Arrow keys to snake directions
+KEY_DIRECTIONS = {
+    pygame.K_UP: 'up',
+    pygame.K_DOWN: 'down',
+    pygame.K_LEFT: 'left',
+    pygame.K_RIGHT: 'right'
+}
+
+
 class SnakeGame:
     """ A Snake Game made with PyGame """
 
-    def __init__(self):
-        """ Load pygame and show the welcome screen
+    def __init__(self, resolusion=None, resizable=False):
+        """ Load pygame and set up the game
 
-        Load pygame and resources, switch to fullscreen mode, set default
-        settings and welcome the user to the welcome screen.
+        Load pygame and resources, switch to fullscreen mode and set default
+        settings. Call run() to welcome the user to the welcome screen.
+
+        Args:
+            resolusion (tuple): Width and height of a window to open instead
+                of going fullscreen, e.g. for benchmarks on the SDL dummy
+                video driver
+            resizable (bool): Let the user resize the window
         """
 
         # Load PyGame
         pygame.init()
 
         # Switch to fullscreen mode and save resolusion
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-        self.screen_res_x = pygame.display.Info().current_w
-        self.screen_res_y = pygame.display.Info().current_h
+        if resolusion is None:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        elif resizable:
+            self.screen = pygame.display.set_mode(
+                resolusion, pygame.RESIZABLE)
+        else:
+            self.screen = pygame.display.set_mode(resolusion)
+        self.screen_res_x, self.screen_res_y = self.screen.get_size()
 
         # Path to resources
         self.image_welcome = "resources/bg.png"
         self.image_black = "resources/black_35.png"
         self.font = "resources/BowlbyOneSC-Regular.ttf"
 
+        # Images, fonts and text are loaded once through the asset cache
+        self.assets = AssetCache(max_items=128)
+
         # Set font
-        self.font_size_big = int(self.screen_res_x/40)
-        self.font_size_small = int(self.screen_res_x/50)
-        self.font_big = pygame.font.Font(self.font, self.font_size_big)
-        self.font_small = pygame.font.Font(self.font, self.font_size_small)
+        self.load_fonts()
 
         # Default (global) game settings
         self.snake_speed = (15, "Easy")
+        self.countdown_delay = 1000
+        self.idle_frame_ms = 0
         self.highscore = 0
+        self.dirty_rendering = True
+        self.render_fps = 60
+        self.max_ticks_per_frame = 5
+        self.interpolate = False
+        self.turn_queue_size = 3
+        self.input_latency = LatencyTracker()
+        self.profiler = FrameProfiler(PHASES)
+        self.profile_overlay = False
+        self.profile_csv = None
+        self.overlay_every = 500
+        self.autopilot = False
+        self.pilot = Autopilot()
+        self.replay_file = 'last_game.replay'
+        self.resumed = False
+        self.snapshot_every = 3000
+        self.snapshots = SnapshotWriter('snapshot.bin')
+        self.background_key = None
+        self.tiles_key = None
+        self.tile_blits = []
+        self.logical_pixels = None
+        self.canvas = self.screen
+        self.score_rect = None
+        self.score_key = None
+        self.score_text = None
+        self.world = None
+        self.camera = (0, 0)
+        self.arena_bots = 0
+        self.server = None
+        self.level_pack = None
+        self.level_number = None
         self.calculate_grid(first_run=True)
 
         # Get skins
@@ -68,8 +148,62 @@ class SnakeGame:
             print(str(e) + "\nSkins file missing, using default variables.")
         self.toggle_skin('dark')
 
-        # Show welcome screen
-        self.show_welcome_screen(background=self.image_welcome)
+        # Scenes, each one returns the name of the next scene. Navigation
+        # is a flat loop in run() instead of screens calling each other, so
+        # the stack does not grow however long the session is.
+        self.scene = 'welcome'
+        self.menu_id = 0
+        self.scenes = {
+            'welcome': lambda: self.show_welcome_screen(
+                background=self.image_welcome, menu_id=self.menu_id),
+            'countdown': lambda: self.show_countdown(
+                background=self.image_black, fg_color=self.skin_fg),
+            'playing': self.game_loop,
+            'paused': lambda: self.show_paused(
+                background=self.image_black, fg_color=self.skin_fg),
+            'game_over': lambda: self.game_over(
+                background=self.image_black, fg_color=self.skin_fg)
+        }
+
+    def load_fonts(self):
+        """ Load the fonts in sizes relative to the resolusion. """
+        self.font_size_big = int(self.screen_res_x/40)
+        self.font_size_small = int(self.screen_res_x/50)
+        self.font_big = self.assets.font(self.font, self.font_size_big)
+        self.font_small = self.assets.font(self.font, self.font_size_small)
+
+    def resize(self):
+        """ Follow a resized window.
+
+        The menus, fonts and the grid of the next game follow the new size.
+        A running game keeps its grid, and is scaled to fit with logical
+        rendering or drawn from the top left corner without.
+        """
+        self.screen = pygame.display.get_surface()
+        self.screen_res_x, self.screen_res_y = self.screen.get_size()
+        self.load_fonts()
+        self.calculate_grid()
+
+    def run(self, resume=True):
+        """ Run scenes until the game quits.
+
+        Args:
+            resume (bool): Start with the round that was running when the
+                game last stopped, if there is one, see resume_game
+        """
+        if resume and self.resume_game():
+            self.scene = 'paused'
+        while self.scene is not None:
+            self.run_scene()
+
+    def run_scene(self):
+        """ Run the current scene and move on to the scene it returns.
+
+        Returns:
+            str: Name of the next scene
+        """
+        self.scene = self.scenes[self.scene]()
+        return self.scene
 
     def generate_menu(self, menu, actions, spacing=0.5, item_id=0,
                       item_rgb=(255, 255, 255), item_rgb_active=(255, 0, 255),
@@ -85,6 +219,9 @@ class SnakeGame:
             item_rgb_active (tuple): Active item color (RGB value)
             pos_x (int): Menu x position
             pos_y (int): Menu y position
+
+        Returns:
+            str: Next scene, as returned by the chosen action
          """
 
         # Default menu position
@@ -94,13 +231,13 @@ class SnakeGame:
 
         # Render menu items
         for idx, item in enumerate(menu):
-            item_text = self.font_big.render(item, True, item_rgb)
+            item_text = self.assets.text(self.font_big, item, item_rgb)
             item_pos = pos_x, self.font_size_big // spacing * idx + pos_y
             self.screen.blit(item_text, item_text.get_rect().move(item_pos))
             pygame.display.update(item_text.get_rect().move(item_pos))
 
         # Add selected/selected status for menu items
-        selected_text = self.font_big.render(item, True, item_rgb_active)
+        selected_text = self.assets.text(self.font_big, item, item_rgb_active)
         selected_rect = item_text.get_rect().move(item_pos)
         selected_fill = pygame.Surface.copy(self.screen)
 
@@ -115,8 +252,8 @@ class SnakeGame:
                 pygame.display.update(selected_rect)
 
                 # Create next selecteded/selected text
-                selected_text = self.font_big.render(
-                    menu[item_id], True, item_rgb_active)
+                selected_text = self.assets.text(
+                    self.font_big, menu[item_id], item_rgb_active)
                 selected_rect = selected_text.get_rect().move(
                     pos_x, self.font_size_big // spacing * item_id + pos_y)
 
@@ -127,7 +264,12 @@ class SnakeGame:
                 # Prevent infinite loop of flickering selected
                 key_pressed = False
 
-            for event in pygame.event.get():
+            for event in self.wait_events():
+
+                # Draw the screen again at the new size
+                if event.type == pygame.VIDEORESIZE:
+                    self.menu_id = item_id
+                    return self.scene
 
                 # Check if any key is pressed
                 if event.type == pygame.KEYDOWN:
@@ -149,9 +291,7 @@ class SnakeGame:
 
                     # Check if Enter-key is pressed
                     elif event.key == pygame.K_RETURN:
-                        actions[item_id]()
-
-        return item_id
+                        return actions[item_id]()
 
     def calculate_grid(self, first_run=False):
         """ Calculate grid based on resolusion.
@@ -186,6 +326,54 @@ class SnakeGame:
         self.cell_width = int(self.screen_res_x / self.cell_size[0])
         self.cell_height = int(self.screen_res_y / self.cell_size[0])
 
+        # Grid changed, render the background and tiles again on next use
+        self.background = None
+        self.tiles = None
+        self.setup_canvas(self.cell_width, self.cell_height)
+
+    @property
+    def logical(self):
+        """ bool: True if the board is drawn on a logical canvas """
+        return self.logical_pixels is not None
+
+    def setup_canvas(self, cell_width, cell_height):
+        """ Set up the surface the board is drawn on.
+
+        Natively the board is drawn straight on to the screen with cell_size
+        pixels per cell. With logical_pixels set, it is drawn on a small
+        canvas with logical_pixels per cell instead, which present_canvas
+        scales up to the screen once per frame. The board is scaled by a
+        whole factor when it fits and centred, so cells stay square.
+
+        Args:
+            cell_width (int): Board width in cells
+            cell_height (int): Board height in cells
+        """
+        if not self.logical:
+            self.canvas = self.screen
+            self.cell_pixels = self.cell_size[0]
+        else:
+            self.cell_pixels = self.logical_pixels
+            size = (cell_width * self.cell_pixels,
+                    cell_height * self.cell_pixels)
+            if self.canvas is self.screen or self.canvas.get_size() != size:
+                self.canvas = pygame.Surface(size).convert()
+
+            # Scale to fit, by a whole factor if the canvas fits at all
+            scale = min(self.screen_res_x / size[0],
+                        self.screen_res_y / size[1])
+            if scale >= 1:
+                scale = int(scale)
+            self.board_rect = pygame.Rect(
+                0, 0, int(size[0] * scale), int(size[1] * scale))
+            self.board_rect.center = (
+                self.screen_res_x // 2, self.screen_res_y // 2)
+            self.board_view = self.screen.subsurface(self.board_rect)
+            self.clear_screen = True
+
+        # Edge of snake segments, thinner on small cells
+        self.cell_edge = min(2, (self.cell_pixels - 1) // 2)
+
     def show_welcome_screen(self, background=(0, 0, 0), game_details=True,
                             game_details_fg=(210, 210, 210), menu_id=0):
         """ Show welcome screen with main menu.
@@ -199,13 +387,14 @@ class SnakeGame:
             background (tuple|str): Path or RGB value
             game_details (bool): Default set to True, to show game details.
             game_details_fg (tuple): RGB value
+
+        Returns:
+            str: Next scene
         """
         # Draw a background
         if isinstance(background, str):
-            self.screen.blit(pygame.transform.scale(
-                pygame.image.load(background),
-                (self.screen_res_x, self.screen_res_y)
-            ), (0, 0))
+            self.screen.blit(self.assets.image(
+                background, (self.screen_res_x, self.screen_res_y)), (0, 0))
 
         else:
             self.screen.fill(background)
@@ -214,56 +403,89 @@ class SnakeGame:
         if game_details:
 
             # Difficulty text
-            difficulty_text = self.font_small.render(
-                "Snake speed: " + self.snake_speed[1], True, game_details_fg)
+            difficulty_text = self.assets.text(
+                self.font_small, "Snake speed: " + self.snake_speed[1],
+                game_details_fg)
             difficulty_text_rect = difficulty_text.get_rect().move(
                 self.screen_res_x/10,
                 self.screen_res_y/5 + self.screen_res_x/40)
 
             # Grid text
-            grid_text = self.font_small.render(
-                "Grid size: " + self.cell_size[1], True, game_details_fg)
+            grid_text = self.assets.text(
+                self.font_small, "Grid size: " + self.cell_size[1],
+                game_details_fg)
             grid_text_rect = grid_text.get_rect().move(
                 self.screen_res_x/10,
                 self.screen_res_y/5 + self.screen_res_x/20)
 
             # Skin text
-            skin_text = self.font_small.render(
-                "Skin: " + self.skin_text, True, game_details_fg)
+            skin_text = self.assets.text(
+                self.font_small, "Skin: " + self.skin_text, game_details_fg)
             skin_text_rect = skin_text.get_rect().move(
                 self.screen_res_x/10,
                 self.screen_res_y/5 + self.screen_res_x/13)
 
+            # Autopilot text
+            autopilot_text = self.assets.text(
+                self.font_small,
+                "Autopilot: " + ("On" if self.autopilot else "Off"),
+                game_details_fg)
+            autopilot_text_rect = autopilot_text.get_rect().move(
+                self.screen_res_x/10,
+                self.screen_res_y/5 + self.screen_res_x/10)
+
             # Highscore
-            highscore_text = self.font_small.render(
-                "Highscore:  " + str(self.highscore), True, game_details_fg)
+            highscore_text = self.assets.text(
+                self.font_small, "Highscore:  " + str(self.highscore),
+                game_details_fg)
             highscore_text_rect = highscore_text.get_rect().move(
                 self.screen_res_x/10,
                 self.screen_res_y/5 + self.screen_res_x/8)
 
+            # Level text, with a level pack
+            if self.level_pack is not None:
+                level_text = self.assets.text(
+                    self.font_small, "Level: " + (
+                        "Off" if self.level_number is None else
+                        self.level_pack.names[self.level_number]),
+                    game_details_fg)
+                level_text_rect = level_text.get_rect().move(
+                    self.screen_res_x/10,
+                    self.screen_res_y/5 + self.screen_res_x*3/20)
+                self.screen.blit(level_text, level_text_rect)
+
             # Draw to screen
             self.screen.blit(difficulty_text, difficulty_text_rect)
             self.screen.blit(grid_text, grid_text_rect)
             self.screen.blit(skin_text, skin_text_rect)
+            self.screen.blit(autopilot_text, autopilot_text_rect)
             self.screen.blit(highscore_text, highscore_text_rect)
         pygame.display.update()
 
-        # Main menu
-        self.generate_menu(
-            menu=[
-                'Start Game',
-                '- Toggle Speed',
-                '- Toggle Grid size',
-                '- Toggle Skin',
-                'Quit Game'
-            ],
-            actions=[
-                self.game_start,
-                self.toggle_snake_speed,
-                self.toggle_cell_size,
-                self.toggle_skin,
-                self.game_exit
-            ],
+        # Main menu, levels only with a level pack
+        menu = [
+            'Start Game',
+            '- Toggle Speed',
+            '- Toggle Grid size',
+            '- Toggle Skin',
+            '- Toggle Autopilot'
+        ]
+        actions = [
+            self.game_start,
+            self.toggle_snake_speed,
+            self.toggle_cell_size,
+            self.toggle_skin,
+            self.toggle_autopilot
+        ]
+        spacing = 0.5
+        if self.level_pack is not None:
+            menu.append('- Toggle Level')
+            actions.append(self.toggle_level)
+            spacing = 0.65
+        return self.generate_menu(
+            menu=menu + ['Quit Game'],
+            actions=actions + [self.game_exit],
+            spacing=spacing,
             item_id=menu_id,
             item_rgb=self.skin_fg,
             item_rgb_active=self.skin_fg_active)
@@ -271,50 +493,54 @@ class SnakeGame:
     def show_countdown(self, background=None, fg_color=(255, 255, 255)):
         """ Show a countdown (3..2..1..)
 
-        Show a 3-2-1 countdown with a sec delay between each. If no background
-        color or path is specificed it will draw ontop of the current screen.
+        Show a 3-2-1 countdown with countdown_delay (a sec) between each. If
+        no background color or path is specificed it will draw ontop of the
+        current screen.
 
         Args:
             background (str|tuple): Path or RGB value for background
             fg_color (tuple): RGB value for text
+
+        Returns:
+            str: Next scene
         """
 
         # Load background if any
         if background is not None:
             if isinstance(background, str):
-                self.screen.blit(pygame.transform.scale(
-                    pygame.image.load(background),
-                    (self.screen_res_x, self.screen_res_y)
-                ), (0, 0))
+                self.screen.blit(self.assets.image(
+                    background, (self.screen_res_x, self.screen_res_y)),
+                    (0, 0))
             else:
                 self.screen.fill(background)
 
         # Set font
-        countdown_font = pygame.font.Font(self.font, int(self.screen_res_x/15))
+        countdown_font = self.assets.font(self.font, int(self.screen_res_x/15))
 
         # 3
-        countdown_3 = countdown_font.render('3', True, fg_color)
+        countdown_3 = self.assets.text(countdown_font, '3', fg_color)
         countdown_3_rect = countdown_3.get_rect()
         countdown_3_rect.midtop = (self.screen_res_x/2, self.screen_res_y/8)
         self.screen.blit(countdown_3, countdown_3_rect)
         pygame.display.update()
-        pygame.time.wait(1000)
+        pygame.time.wait(self.countdown_delay)
 
         # 2
-        countdown_2 = countdown_font.render('2', True, fg_color)
+        countdown_2 = self.assets.text(countdown_font, '2', fg_color)
         countdown_2_rect = countdown_2.get_rect()
         countdown_2_rect.midtop = (self.screen_res_x/2, self.screen_res_y/3)
         self.screen.blit(countdown_2, countdown_2_rect)
         pygame.display.update()
-        pygame.time.wait(1000)
+        pygame.time.wait(self.countdown_delay)
 
         # 1
-        countdown_1 = countdown_font.render('1', True, fg_color)
+        countdown_1 = self.assets.text(countdown_font, '1', fg_color)
         countdown_1_rect = countdown_1.get_rect()
         countdown_1_rect.midtop = (self.screen_res_x/2, self.screen_res_y/1.8)
         self.screen.blit(countdown_1, countdown_1_rect)
         pygame.display.update()
-        pygame.time.wait(1000)
+        pygame.time.wait(self.countdown_delay)
+        return 'playing'
 
     def toggle_cell_size(self):
         """ Toggle between gird sizes by changing the cell size.
@@ -326,6 +552,9 @@ class SnakeGame:
 
         After new value is set, then recalculate the grid and return to the
         welcome screen.
+
+        Returns:
+            str: Next scene
         """
         if self.cell_size[0] == 10:
             self.cell_size = (20, "Medium")
@@ -341,7 +570,8 @@ class SnakeGame:
             self.cell_size = (16, "Small")
 
         self.calculate_grid()
-        self.show_welcome_screen(menu_id=2, background=self.image_welcome)
+        self.menu_id = 2
+        return 'welcome'
 
     def toggle_skin(self, get_skin=False, get_toggle=False):
         """ Toggle between skins or get desired skin.
@@ -349,6 +579,9 @@ class SnakeGame:
         Args:
             get_skin (bool): If true get the skin instead of toggle
             get_toggle (bool): If true place menu marker on skin toggle
+
+        Returns:
+            str: Next scene
         """
 
         # Check if skins.json returned some data
@@ -407,14 +640,14 @@ class SnakeGame:
             self.skin_snake_edges = (168, 0, 205)
             self.skin_grid = (59, 64, 72)
 
-        # Update background
+        # Update background and tiles
         self.image_welcome = 'skins/' + self.skin + '.png'
+        self.background = None
+        self.tiles = None
 
         # Return to welcome screen
-        if get_toggle:
-            self.show_welcome_screen(menu_id=3, background=self.image_welcome)
-        else:
-            self.show_welcome_screen(background=self.image_welcome)
+        self.menu_id = 3 if get_toggle else 0
+        return 'welcome'
 
     def toggle_snake_speed(self):
         """ Toggle between snake speed difficulty.
@@ -426,6 +659,9 @@ class SnakeGame:
         15 = Easy
         30 = Medium
         60 = Hard
+
+        Returns:
+            str: Next scene
         """
         if self.snake_speed[0] == 10:
             self.snake_speed = (15, "Easy")
@@ -438,98 +674,219 @@ class SnakeGame:
 
         self.fps_clock = pygame.time.Clock()
         self.fps_clock.tick(self.snake_speed[0])
-        self.show_welcome_screen(menu_id=1, background=self.image_welcome)
+        self.menu_id = 1
+        return 'welcome'
+
+    def toggle_autopilot(self):
+        """ Toggle the autopilot on or off.
+
+        With the autopilot on, the snake steers itself towards the apple
+        and arrow keys are ignored. ESC still pauses the game.
+
+        Returns:
+            str: Next scene
+        """
+        self.autopilot = not self.autopilot
+        self.menu_id = 4
+        return 'welcome'
+
+    def toggle_level(self):
+        """ Toggle between the levels of the level pack, and none.
+
+        Only the name of the level is known until a game starts on it, see
+        levels.LevelPack.
+
+        Returns:
+            str: Next scene
+        """
+        if self.level_number is None:
+            self.level_number = 0
+        elif self.level_number + 1 < len(self.level_pack):
+            self.level_number += 1
+        else:
+            self.level_number = None
+        self.menu_id = 5
+        return 'welcome'
+
+    def wait_events(self):
+        """ Wait for user interaction without busy-spinning the CPU.
+
+        Used by menus and wait screens. Blocks until an event arrives, or
+        until idle_frame_ms has passed for screens that should keep looping.
+        The default of 0 waits for as long as it takes. A resized window is
+        followed before the events are returned.
+
+        Returns:
+            list: Events, empty if the wait timed out
+        """
+        event = pygame.event.wait(self.idle_frame_ms)
+        if event.type == pygame.NOEVENT:
+            return []
+        events = [event] + pygame.event.get()
+        if any(event.type == pygame.VIDEORESIZE for event in events):
+            self.resize()
+        return events
 
     def get_keypress(self):
         """ Wait for user interaction for Enter-key. """
         while True:
-            for event in pygame.event.get():
+            for event in self.wait_events():
                 if (event.type == pygame.KEYDOWN and
                    event.key == pygame.K_RETURN):
                     return True
 
-    def get_random_location(self):
-        """ Get a random location on grid """
-        return {
-            'x': random.randint(0, self.cell_width - 1),
-            'y': random.randint(0, self.cell_height - 1)
-        }
+    def get_background(self):
+        """ Get the in-game background with the grid drawn on it.
 
-    def draw_grid(self):
-        """ Draw a square grid """
+        Rendered once into a surface and reused every frame. It is keyed by
+        skin, cell size, canvas size and level, and dropped by calculate_grid
+        and toggle_skin so it is rendered again after a change. The walls
+        and portals of a level never move, so they are part of it, and the
+        level pack hands out the same Level for a grid every game.
+
+        Returns:
+            pygame.Surface: Background surface the size of the canvas
+        """
+        level = self.engine.level
+        key = (self.skin, self.cell_pixels, self.canvas.get_size(), level)
+        if self.background is None or self.background_key != key:
+            self.background = pygame.Surface(
+                self.canvas.get_size()).convert()
+            self.background.fill(self.skin_bg)
+            self.draw_grid(self.background)
+            if level is not None:
+                self.draw_level(self.background, level)
+            self.background_key = key
+        return self.background
+
+    def draw_level(self, surface, level):
+        """ Draw the walls and portals of a level.
+
+        Walls are filled with the text color, portals are a ring in the
+        active text color.
+
+        Args:
+            surface (pygame.Surface): Surface to draw on
+            level (levels.Level): Level of the engine
+        """
+        size = self.cell_pixels
+        inset = size // 4
+        for cell, taken in enumerate(level.grid):
+            if not taken:
+                continue
+            y, x = divmod(cell, level.width)
+            rect = pygame.Rect(x * size, y * size, size, size)
+            if taken == WALL:
+                surface.fill(self.skin_fg, rect)
+            elif taken == PORTAL:
+                surface.fill(self.skin_fg_active, rect)
+                if size >= 4:
+                    surface.fill(self.skin_bg, rect.inflate(
+                        -2 * inset, -2 * inset))
+
+    def get_tiles(self):
+        """ Get the snake and apple tiles for the current skin and cell size.
+
+        Each one is rendered once into a surface the size of a cell, so a
+        segment is drawn with a single blit instead of two rects. Dropped by
+        calculate_grid and toggle_skin like the background.
+
+        Returns:
+            tuple: Snake, apple and player tile surfaces, the player tile
+                marks the player among the snakes of an arena
+        """
+        size = self.cell_pixels
+        key = (self.skin, size)
+        if self.tiles is None or self.tiles_key != key:
+            # Snake, edge color with the snake color inside
+            edge = self.cell_edge
+            snake = pygame.Surface((size, size)).convert()
+            snake.fill(self.skin_snake_edges)
+            snake.fill(self.skin_snake,
+                       (edge, edge, size - 2 * edge, size - 2 * edge))
+
+            # Apple
+            apple = pygame.Surface((size, size)).convert()
+            apple.fill(self.skin_apple)
+
+            # Player, the snake colors swapped
+            player = pygame.Surface((size, size)).convert()
+            player.fill(self.skin_snake)
+            player.fill(self.skin_snake_edges,
+                        (edge, edge, size - 2 * edge, size - 2 * edge))
+
+            self.tiles = (snake, apple, player)
+            self.tiles_key = key
+        return self.tiles
+
+    def draw_grid(self, surface=None):
+        """ Draw a square grid
+
+        Left out when cells are too small for lines between them, e.g. on a
+        logical canvas with a few pixels per cell.
+
+        Args:
+            surface (pygame.Surface): Surface to draw on, default the canvas
+        """
+        if surface is None:
+            surface = self.canvas
+        if self.cell_pixels < 4:
+            return
+        width, height = surface.get_size()
 
         # Horizontal lines
-        for x in range(0, self.screen_res_x, self.cell_size[0]):
+        for x in range(0, width, self.cell_pixels):
             pygame.draw.line(
-                self.screen,
+                surface,
                 self.skin_grid,
                 (x, 0),
-                (x, self.screen_res_y))
+                (x, height))
 
         # Vertical lines
-        for y in range(0, self.screen_res_y, self.cell_size[0]):
+        for y in range(0, height, self.cell_pixels):
             pygame.draw.line(
-                self.screen,
+                surface,
                 self.skin_grid,
                 (0, y),
-                (self.screen_res_x, y))
+                (width, y))
 
     def draw_snake(self, snake_coord):
         """ Draw snake based on coordinates.
 
+        Every segment is the pre-rendered snake tile, drawn with a single
+        Surface.blits call. The list of blits is kept and reused, so a long
+        snake does not build a new list every frame.
+
         Args:
-            snake_coord (dict): List of three dicts with x/y coordinates
+            snake_coord (list): List of x/y coordinate tuples
         """
-        for coordinates in snake_coord:
+        self.draw_tiles(snake_coord, 0)
 
-            # Get coordinates
-            x = coordinates['x'] * self.cell_size[0]
-            y = coordinates['y'] * self.cell_size[0]
+    def draw_tiles(self, coordinates, tile):
+        """ Draw a tile in every cell of a list with a single blits call.
 
-            # Draw snake inner edge
-            snake_edge_rect = pygame.Rect(
-                x, y,
-                self.cell_size[0],
-                self.cell_size[0]
-            )
-            pygame.draw.rect(
-                self.screen,
-                self.skin_snake_edges,
-                snake_edge_rect
-            )
-
-            # Fill snake color
-            snake_rect = pygame.Rect(
-                x + 2,
-                y + 2,
-                self.cell_size[0] - 4,
-                self.cell_size[0] - 4
-            )
-            pygame.draw.rect(
-                self.screen,
-                self.skin_snake,
-                snake_rect
-            )
+        Args:
+            coordinates (list): List of x/y coordinate tuples
+            tile (int): Index into get_tiles
+        """
+        tile = self.get_tiles()[tile]
+        size = self.cell_pixels
+        left, top = self.camera
+        blits = self.tile_blits
+        blits.clear()
+        blits.extend((tile, ((x - left) * size, (y - top) * size))
+                     for x, y in coordinates)
+        self.canvas.blits(blits, doreturn=False)
 
     def draw_apple(self, coordinates):
         """ Draw a square (apple) based on coordinates.
 
         Args:
-            coordinates (dict): Dict with x/y coordinates
+            coordinates (tuple): Tuple with x/y coordinates
         """
-        x = coordinates['x'] * self.cell_size[0]
-        y = coordinates['y'] * self.cell_size[0]
-
-        apple_rect = pygame.Rect(
-            x, y,
-            self.cell_size[0],
-            self.cell_size[0]
-        )
-        pygame.draw.rect(
-            self.screen,
-            self.skin_apple,
-            apple_rect
-        )
+        x = (coordinates[0] - self.camera[0]) * self.cell_pixels
+        y = (coordinates[1] - self.camera[1]) * self.cell_pixels
+        self.canvas.blit(self.get_tiles()[1], (x, y))
 
     def draw_score(self, score):
         """ Draw score during the game.
@@ -537,146 +894,754 @@ class SnakeGame:
         Args:
             score (int): current score
         """
-        # Create score text
-        score_text = 'Score: ' + str(score * self.snake_speed[0])
-        score_text = self.font_small.render(score_text, True, self.skin_fg)
-        score_rect = score_text.get_rect()
-        score_rect.topleft = (20, 10)
+        # Composed from cached glyphs when the score changes
+        key = (score * self.snake_speed[0], self.font_small, self.skin_fg)
+        if self.score_key != key:
+            self.score_key = key
+            self.score_text = self.assets.number(
+                self.font_small, key[0], self.skin_fg, 'Score: ')
 
         # Update on screen
-        self.screen.blit(score_text, score_rect)
+        return self.screen.blit(self.score_text, (20, 10))
+
+    def cell_rect(self, coordinates):
+        """ Get the canvas rect of a cell.
+
+        Args:
+            coordinates (tuple): Tuple with x/y coordinates
+
+        Returns:
+            pygame.Rect: Rect covering the cell
+        """
+        return pygame.Rect(
+            (coordinates[0] - self.camera[0]) * self.cell_pixels,
+            (coordinates[1] - self.camera[1]) * self.cell_pixels,
+            self.cell_pixels,
+            self.cell_pixels
+        )
+
+    def redraw_area(self, rect):
+        """ Draw background, snake and apple cells again inside a rect.
+
+        Args:
+            rect (pygame.Rect): Canvas area to restore
+        """
+        engine = self.engine
+        self.canvas.blit(self.get_background(), rect, rect)
+
+        # Cells touching the rect
+        size = self.cell_pixels
+        left, top = self.camera
+        for y in range(rect.top // size + top,
+                       min(rect.bottom // size + 1 + top, engine.cell_height)):
+            for x in range(rect.left // size + left,
+                           min(rect.right // size + 1 + left,
+                               engine.cell_width)):
+                cell = engine.to_cell((x, y))
+                if engine.is_snake(cell):
+                    # The player among the snakes of an arena
+                    self.draw_tiles([(x, y)], 2 if (
+                        engine.arena and
+                        engine.occupied[cell] == engine.player_number) else 0)
+                elif engine.is_apple(cell):
+                    self.draw_apple((x, y))
+
+    def view_size(self):
+        """ Get the number of cells shown, the whole board unless endless.
+
+        Returns:
+            tuple: Width and height in cells
+        """
+        if not self.engine.endless:
+            return self.engine.cell_width, self.engine.cell_height
+        return self.cell_width, self.cell_height
+
+    def follow_camera(self):
+        """ Move the camera to keep the head away from the viewport edges.
+
+        Only endless games scroll, the classic board always fits on the
+        screen. The camera moves once the head comes within a quarter of
+        the viewport of an edge, and stops at the edges of the world.
+
+        Returns:
+            bool: True if the camera moved
+        """
+        engine = self.engine
+        if not engine.endless:
+            return False
+        view_width, view_height = self.view_size()
+        margin_x, margin_y = view_width // 4, view_height // 4
+        left = min(max(self.camera[0],
+                       engine.head_x + margin_x + 1 - view_width),
+                   engine.head_x - margin_x)
+        top = min(max(self.camera[1],
+                      engine.head_y + margin_y + 1 - view_height),
+                  engine.head_y - margin_y)
+        camera = (max(0, min(left, engine.cell_width - view_width)),
+                  max(0, min(top, engine.cell_height - view_height)))
+        if camera == self.camera:
+            return False
+        self.camera = camera
+        return True
+
+    def visible_snake(self):
+        """ Get the snake cells inside the viewport.
+
+        Endless games look them up in the chunks under the viewport, so the
+        cost follows the size of the screen, not the length of the snake.
+
+        Returns:
+            list: x/y coordinates
+        """
+        if not self.engine.endless:
+            return self.engine.snake
+        view_width, view_height = self.view_size()
+        return self.engine.cells_in(
+            self.camera[0], self.camera[1], view_width, view_height)
+
+    def draw_frame(self, full=False):
+        """ Draw the engine state after a tick.
+
+        With dirty_rendering on, only the cells that changed this tick are
+        drawn: the new head, the cell the tail left and a new apple. Just
+        those rects are passed to pygame.display.update by update_display.
+        The score is drawn again when it changes or when a changed cell is
+        under it. With logical rendering the score is drawn on the screen by
+        present_canvas instead. In endless games the whole screen is drawn
+        when the camera moves, arenas are drawn by draw_arena.
+
+        Args:
+            full (bool): Draw and present the whole screen
+        """
+        engine = self.engine
+        if engine.arena:
+            self.draw_arena(full)
+            return
+        profiler = self.profiler
+        start = profiler.now()
+
+        # Whole screen
+        if self.follow_camera() or full or not self.dirty_rendering:
+            self.canvas.blit(self.get_background(), (0, 0))
+            start = profiler.lap('draw_grid', start)
+            self.draw_snake(self.visible_snake())
+            start = profiler.lap('draw_snake', start)
+            if engine.apple is not None:
+                self.draw_apple(engine.apple)
+            start = profiler.lap('draw_apple', start)
+            if not self.logical:
+                self.score_rect = self.draw_score(engine.apples)
+            profiler.lap('draw_score', start)
+            self.drawn_apple = engine.apple_cell
+            self.drawn_apples = engine.apples
+            self.interpolated_rect = None
+            self.full_update = True
+            return
+
+        # Cell the tail left
+        dirty = self.dirty_rects
+        if engine.vacated is not None:
+            rect = self.cell_rect(engine.to_coordinates(engine.vacated))
+            self.canvas.blit(self.get_background(), rect, rect)
+            dirty.append(rect)
+        start = profiler.lap('draw_grid', start)
+
+        # New head
+        self.draw_snake([engine.head])
+        dirty.append(self.cell_rect(engine.head))
+        start = profiler.lap('draw_snake', start)
+
+        # New apple, the old one is under the head
+        if engine.apple_cell != self.drawn_apple:
+            if engine.apple is not None:
+                self.draw_apple(engine.apple)
+                dirty.append(self.cell_rect(engine.apple))
+            self.drawn_apple = engine.apple_cell
+        start = profiler.lap('draw_apple', start)
+
+        # Score, when changed or drawn over
+        self.update_score()
+        profiler.lap('draw_score', start)
+
+    def update_score(self):
+        """ Draw the score again if it changed or was drawn over. """
+        engine = self.engine
+        dirty = self.dirty_rects
+        if self.logical:
+            return
+        if (engine.apples != self.drawn_apples or
+           self.score_rect.collidelist(dirty) != -1):
+            self.redraw_area(self.score_rect)
+            dirty.append(self.score_rect)
+            self.score_rect = self.draw_score(engine.apples)
+            dirty.append(self.score_rect)
+            self.drawn_apples = engine.apples
+
+    def draw_arena(self, full=False):
+        """ Draw an arena after a tick.
+
+        The same as draw_frame for every snake. With dirty_rendering on only
+        the changes of the tick are drawn: cells freed by tails and ended
+        snakes, new heads, new snakes and new apples. The player is drawn
+        with the snake colors swapped.
+
+        Args:
+            full (bool): Draw and present the whole screen
+        """
+        engine = self.engine
+        profiler = self.profiler
+        start = profiler.now()
+        to_coordinates = engine.to_coordinates
+        player = engine.player_snake
+
+        # Whole screen
+        if full or not self.dirty_rendering:
+            self.canvas.blit(self.get_background(), (0, 0))
+            start = profiler.lap('draw_grid', start)
+            self.draw_snake(engine.snake_cells())
+            if player.alive:
+                self.draw_tiles(
+                    [to_coordinates(cell) for cell in player.body], 2)
+            start = profiler.lap('draw_snake', start)
+            self.draw_tiles(
+                [to_coordinates(cell) for cell in engine.apple_cells], 1)
+            start = profiler.lap('draw_apple', start)
+            if not self.logical:
+                self.score_rect = self.draw_score(engine.apples)
+            profiler.lap('draw_score', start)
+            self.drawn_apples = engine.apples
+            self.interpolated_rect = None
+            self.full_update = True
+            return
+
+        # Cells freed by tails and ended snakes
+        dirty = self.dirty_rects
+        background = self.get_background()
+        for cell in engine.cleared:
+            rect = self.cell_rect(to_coordinates(cell))
+            self.canvas.blit(background, rect, rect)
+            dirty.append(rect)
+        start = profiler.lap('draw_grid', start)
+
+        # New heads and snakes, the player's in its own colors
+        occupied, number = engine.occupied, engine.player_number
+        cells = engine.moved + engine.spawned
+        self.draw_snake([to_coordinates(cell) for cell in cells
+                         if occupied[cell] != number])
+        self.draw_tiles([to_coordinates(cell) for cell in cells
+                         if occupied[cell] == number], 2)
+        dirty.extend(self.cell_rect(to_coordinates(cell)) for cell in cells)
+        start = profiler.lap('draw_snake', start)
+
+        # New apples
+        cells = [to_coordinates(cell) for cell in engine.placed]
+        self.draw_tiles(cells, 1)
+        dirty.extend(self.cell_rect(cell) for cell in cells)
+        start = profiler.lap('draw_apple', start)
+
+        self.update_score()
+        profiler.lap('draw_score', start)
+
+    def draw_interpolation(self, progress, direction):
+        """ Draw the head part of the way into the next cell.
+
+        Smooths movement between ticks when rendering runs faster than the
+        snake. What was drawn last frame is restored first, in case the
+        snake has turned since.
+
+        Args:
+            progress (float): Time to the next tick, 0 to 1
+            direction (str): Heading the next tick will move in
+        """
+        engine = self.engine
+        dirty = self.dirty_rects
+
+        # Restore the last partial segment
+        if self.interpolated_rect is not None:
+            self.redraw_area(self.interpolated_rect)
+            dirty.append(self.interpolated_rect)
+            self.interpolated_rect = None
+
+        # Part of the next cell, growing from the side of the head, if the
+        # snake can move into it
+        rect = self.partial_rect(progress, direction)
+        if rect is not None:
+            self.draw_partial_segment(rect)
+            dirty.append(rect)
+            self.interpolated_rect = rect
+
+        # Keep the score on top
+        if not self.logical and self.score_rect.collidelist(dirty) != -1:
+            self.redraw_area(self.score_rect)
+            if rect is not None and rect.colliderect(self.score_rect):
+                self.draw_partial_segment(rect)
+            self.draw_score(engine.apples)
+            dirty.append(self.score_rect)
+
+    def partial_rect(self, progress, direction):
+        """ Get the part of the next cell the head has slid into.
+
+        Args:
+            progress (float): Time to the next tick, 0 to 1
+            direction (str): Heading the next tick will move in
+
+        Returns:
+            pygame.Rect: Canvas area, None if there is nothing to draw
+        """
+        engine = self.engine
+        if engine.arena and not engine.player_snake.alive:
+            return None
+
+        # Next cell, if the snake can move into it
+        move_x, move_y = DIRECTIONS[direction]
+        x, y = engine.head_x + move_x, engine.head_y + move_y
+        if not (0 <= x < engine.cell_width and 0 <= y < engine.cell_height):
+            return None
+        if engine.occupied[engine.to_cell((x, y))]:
+            return None
+
+        size = self.cell_pixels
+        length = int(size * progress)
+        if length <= 0:
+            return None
+        rect = self.cell_rect((x, y))
+        if direction == 'right':
+            rect.width = length
+        elif direction == 'left':
+            rect.left, rect.width = rect.right - length, length
+        elif direction == 'down':
+            rect.height = length
+        elif direction == 'up':
+            rect.top, rect.height = rect.bottom - length, length
+        return rect
+
+    def draw_partial_segment(self, rect):
+        """ Draw a snake segment that only covers part of a cell.
+
+        Args:
+            rect (pygame.Rect): Canvas area of the segment
+        """
+        edge = self.cell_edge
+        pygame.draw.rect(self.canvas, self.skin_snake_edges, rect)
+        pygame.draw.rect(
+            self.canvas, self.skin_snake, rect.inflate(-2 * edge, -2 * edge))
+
+    def toggle_profile_overlay(self):
+        """ Show or hide the performance overlay.
+
+        The profiler runs while the overlay is shown, or all the time when
+        the histograms are written to profile_csv on exit.
+        """
+        self.profile_overlay = not self.profile_overlay
+        self.profiler.enable(
+            self.profile_overlay or self.profile_csv is not None)
+        if (not self.profile_overlay and self.overlay is not None and
+           not self.logical):
+            self.redraw_area(self.overlay_rect)
+            self.dirty_rects.append(self.overlay_rect)
+            self.overlay = None
+
+    def render_profile_overlay(self):
+        """ Render the latest profiler numbers into the overlay surface.
+
+        Frame time percentiles, then mean and p99 of every phase. Text is
+        rendered a few times a second, the surface is drawn every frame.
+        """
+        report = self.profiler.report()
+        if not report:
+            lines = ["Profiling..."]
+        else:
+            frame = report['frame']
+            lines = ["frame  p50 {:.1f}  p95 {:.1f}  p99 {:.1f} ms".format(
+                frame[50], frame[95], frame[99]), "phase  mean / p99 ms"]
+            for phase in PHASES:
+                lines.append("{}  {:.2f} / {:.2f}".format(
+                    phase, report[phase]['mean'], report[phase][99]))
+
+        # Text on a solid box in the top right corner
+        font = self.assets.font(self.font, max(12, self.font_size_small // 2))
+        texts = [font.render(line, True, self.skin_fg) for line in lines]
+        width = max(text.get_width() for text in texts) + 20
+        height = sum(text.get_height() for text in texts) + 20
+        surface = pygame.Surface((width, height)).convert()
+        surface.fill(self.skin_bg)
+        y = 10
+        for text in texts:
+            surface.blit(text, (10, y))
+            y += text.get_height()
+
+        # Restore the area of a larger overlay
+        rect = surface.get_rect(topright=(self.screen_res_x - 20, 10))
+        if (self.overlay is not None and not self.logical and
+           not rect.contains(self.overlay_rect)):
+            self.redraw_area(self.overlay_rect)
+            self.dirty_rects.append(self.overlay_rect)
+        self.overlay = surface
+        self.overlay_rect = rect
+
+    def draw_profile_overlay(self):
+        """ Draw the overlay over whatever was drawn this frame. """
+        self.screen.blit(self.overlay, self.overlay_rect)
+        self.dirty_rects.append(self.overlay_rect)
+
+    def present_canvas(self):
+        """ Scale the logical canvas up to the screen.
+
+        The whole board is scaled straight into the screen in one call, with
+        the score drawn on top at screen resolusion. Does nothing when the
+        board is drawn natively.
+        """
+        if not self.logical:
+            return
+        if self.clear_screen:
+            self.screen.fill(self.skin_bg)
+            self.clear_screen = False
+            self.full_update = True
+        elif self.score_rect is not None:
+            # Old score, it may be outside the board
+            self.screen.fill(self.skin_bg, self.score_rect)
+        pygame.transform.scale(
+            self.canvas, self.board_rect.size, self.board_view)
+        self.score_rect = self.draw_score(self.engine.apples)
+
+    def update_display(self):
+        """ Present what was drawn since the last call.
+
+        With logical rendering the canvas is only scaled up in frames where
+        something was drawn on it.
+        """
+        if self.logical and (self.dirty_rects or self.full_update):
+            self.present_canvas()
+            rects = [self.board_rect, self.score_rect]
+            if self.profile_overlay and self.overlay is not None:
+                self.screen.blit(self.overlay, self.overlay_rect)
+                rects.append(self.overlay_rect)
+            self.dirty_rects = rects
+        if self.full_update:
+            pygame.display.update()
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+        self.full_update = False
+        self.dirty_rects = []
 
     def game_start(self):
         """ Start the snake game
 
-        Starting a new game, sets default in-game settings and the main game
-        loop.
+        Starting a new game, creates a new engine with the current settings
+        and draws the empty grid for the countdown.
+
+        Returns:
+            str: Next scene
         """
         # Default in-game settings
-        self.fps_clock = pygame.time.Clock()
         self.total_score = 0
-        apple = self.get_random_location()
-        move = 'up'
-        tip = 0
-        if self.divided:
-            snake_coord = [
-                {
-                    'x': self.cell_width - 6,
-                    'y': self.cell_height - 6
-                },
-                {
-                    'x': self.cell_width - 7,
-                    'y': self.cell_height - 6
-                },
-                {
-                    'x': self.cell_width - 8,
-                    'y': self.cell_height - 6
-                }]
+        self.total_apples = 0
+        self.resumed = False
+
+        # Every game has its own seeded random source, so the seed and the
+        # turns are enough to replay it. Endless games, arenas and levels are
+        # not replayed.
+        level = self.get_level()
+        if self.server is not None:
+            self.replay = None
+            try:
+                self.engine = RemoteArena(*self.server)
+            except OSError as e:
+                print("Could not join {}:{}: {}".format(
+                    self.server[0], self.server[1], e))
+                return 'welcome'
+        elif self.arena_bots:
+            self.replay = None
+            self.engine = Arena(
+                self.cell_width, self.cell_height, bots=self.arena_bots,
+                speed=self.snake_speed[0])
+        elif level is not None:
+            self.replay = None
+            self.engine = SnakeEngine(
+                self.cell_width, self.cell_height, self.divided,
+                speed=self.snake_speed[0], level=level)
+        elif self.world is None:
+            self.replay = Replay(
+                random.getrandbits(32), self.snake_speed[0],
+                self.cell_size[0], (self.screen_res_x, self.screen_res_y),
+                self.divided)
+            self.engine = self.replay.new_engine()
         else:
-            snake_coord = [
-                {
-                    'x': self.cell_width - 4,
-                    'y': self.cell_height - 4
-                },
-                {
-                    'x': self.cell_width - 5,
-                    'y': self.cell_height - 4
-                },
-                {
-                    'x': self.cell_width - 6,
-                    'y': self.cell_height - 4
-                }]
+            self.replay = None
+            self.engine = WorldEngine(
+                self.world[0], self.world[1], speed=self.snake_speed[0],
+                apple_range=min(self.cell_width, self.cell_height) // 4)
+        self.pilot.reset()
+        self.camera = (0, 0)
+
+        # Background and grid, the countdown is shown on top of it
+        self.setup_canvas(*self.view_size())
+        self.canvas.blit(self.get_background(), (0, 0))
+        self.present_canvas()
+        return 'countdown'
+
+    def get_level(self):
+        """ Read the layout of the chosen level for the current grid.
+
+        Returns:
+            levels.Level: The level, None without one or if it does not
+                fit on the grid
+        """
+        if self.level_pack is None or self.level_number is None:
+            return None
+        if self.server is not None or self.arena_bots or self.world:
+            return None
+        try:
+            return self.level_pack.fit(
+                self.level_number, self.cell_width, self.cell_height)
+        except ValueError as e:
+            print(str(e))
+            return None
+
+    def resume_game(self):
+        """ Restore the round from the last snapshot, if there is one.
+
+        Snapshots are saved every snapshot_every ms while playing and when
+        pausing, and removed at game over, so this picks up a round that
+        was paused or cut short by a crash or power cut. Called by run(),
+        a SnakeGame made for benchmarks leaves the snapshot alone.
+
+        Returns:
+            bool: True if a round was restored
+        """
+        snapshot = load_snapshot(self.snapshots.path)
+        if snapshot is None:
+            return False
+        engine, replay, autopilot = snapshot
+
+        # A snapshot from another screen does not fit the grid, it is kept
+        # for when the game runs on that screen again
+        if replay.resolusion != (self.screen_res_x, self.screen_res_y):
+            return False
+
+        # Settings of the round
+        self.snake_speed = (
+            replay.speed, SPEED_NAMES.get(replay.speed, "Custom"))
+        self.cell_size = (
+            replay.cell_size, CELL_SIZE_NAMES.get(replay.cell_size, "Custom"))
+        self.calculate_grid()
+        self.divided = replay.divided
+        self.autopilot = autopilot
+
+        # Game state, the replay is only kept for the settings of further
+        # snapshots, the restored apples do not follow it
+        self.engine = engine
+        self.replay = replay
+        self.resumed = True
+        self.pilot.reset()
+        self.camera = (0, 0)
+        self.total_apples = engine.apples
+        self.total_score = engine.score
+        return True
+
+    def show_paused(self, background=None, fg_color=(255, 255, 255)):
+        """ Pause screen, shown on ESC and when a round was resumed.
+
+        Args:
+            background (str|tuple): Path or RGB value, drawn over the game
+            fg_color (tuple): RGB value for text
+
+        Returns:
+            str: Next scene
+        """
+        # The game, dimmed by the background
+        self.dirty_rects = []
+        self.setup_canvas(*self.view_size())
+        self.draw_frame(full=True)
+        self.present_canvas()
+        if background is not None:
+            if isinstance(background, str):
+                self.screen.blit(self.assets.image(
+                    background, (self.screen_res_x, self.screen_res_y)),
+                    (0, 0))
+            else:
+                self.screen.fill(background)
+
+        # Paused
+        paused = self.assets.text(
+            self.assets.font(self.font, 150), 'Paused', fg_color)
+        paused_rect = paused.get_rect()
+        paused_rect.midtop = (self.screen_res_x / 2, self.screen_res_y / 3)
+
+        # Press enter or ESC
+        press_enter = self.assets.text(
+            self.font_big, 'Press ENTER to resume, ESC to end the game',
+            fg_color)
+        press_enter_rect = press_enter.get_rect()
+        press_enter_rect.midbottom = (
+            self.screen_res_x / 2,
+            self.screen_res_y - 100
+        )
+
+        # Draw on to screen
+        self.screen.blit(paused, paused_rect)
+        self.screen.blit(press_enter, press_enter_rect)
+        pygame.display.update()
+
+        # Resume with a countdown on top of the game, or end it
+        while True:
+            for event in self.wait_events():
+                if event.type == pygame.VIDEORESIZE:
+                    return 'paused'
+                if event.type != pygame.KEYDOWN:
+                    continue
+                if event.key == pygame.K_RETURN:
+                    self.setup_canvas(*self.view_size())
+                    self.draw_frame(full=True)
+                    self.present_canvas()
+                    return 'countdown'
+                if event.key == pygame.K_ESCAPE:
+                    return 'game_over'
+
+    def game_loop(self):
+        """ The main game loop
+
+        The engine owns the rules, this loop only feeds it user input and
+        draws the result. It uses a fixed timestep: the snake moves at the
+        snake speed in ticks per second, while input and drawing run at
+        render_fps. With interpolate on, the head slides into the next cell
+        between ticks.
+
+        Turns are queued and applied one per tick. Each key press is timed
+        until the frame showing the turn is presented, and kept in
+        input_latency.
+
+        A snapshot is saved every snapshot_every ms, and on ESC which pauses
+        the game.
+
+        F3 toggles an overlay with frame times and the cost of each phase of
+        the frame, see FrameProfiler.
+
+        With logical rendering the board is drawn on the logical canvas and
+        scaled up to the screen once per frame by update_display.
+
+        Returns:
+            str: Next scene
+        """
+        self.fps_clock = pygame.time.Clock()
+        turns = TurnQueue(self.turn_queue_size)
+        shown = []
+        tick_ms = 1000 / self.engine.speed
+        max_lag = tick_ms * self.max_ticks_per_frame
+
+        profiler = self.profiler
+        profiler.enable(self.profile_overlay or self.profile_csv is not None)
+
+        # The autopilot plans for a single snake over every cell, so it only
+        # plays the classic board without walls
+        autopilot = (self.autopilot and not self.engine.endless and
+                     not self.engine.arena and self.engine.level is None)
+
+        # Draw the starting position
+        self.dirty_rects = []
+        self.overlay = None
+        self.setup_canvas(*self.view_size())
+        self.draw_frame(full=True)
+        self.update_display()
 
         # Main game loop
-        first_loop = True
+        lag = 0
+        since_snapshot = 0
+        since_overlay = self.overlay_every
+        self.fps_clock.tick()
         while True:
             # Set fps clock
-            self.fps_clock.tick(self.snake_speed[0])
-            # Draw background and grid
-            self.screen.fill(self.skin_bg)
-            self.draw_grid()
-
-            # Show countdown
-            if first_loop:
-                self.show_countdown(
-                    background='resources/black_35.png',
-                    fg_color=self.skin_fg
-                )
-                first_loop = False
-
-            # Change snake move depending on user input
+            frame_ms = self.fps_clock.tick(self.render_fps)
+            lag = min(lag + frame_ms, max_lag)
+            profiler.end_frame()
+            start = profiler.now()
+
+            # Save a snapshot in the background now and then
+            since_snapshot += frame_ms
+            if (since_snapshot >= self.snapshot_every and
+               self.replay is not None):
+                since_snapshot = 0
+                self.snapshots.save(self.engine, self.replay, self.autopilot)
+
+            # Queue snake turns depending on user input
             for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT and move is not 'right':
-                        move = 'left'
-                    elif event.key == pygame.K_RIGHT and move is not 'left':
-                        move = 'right'
-                    elif event.key == pygame.K_DOWN and move is not 'up':
-                        move = 'down'
-                    elif event.key == pygame.K_UP and move is not 'down':
-                        move = 'up'
+                if event.type == pygame.VIDEORESIZE:
+                    # The grid of the round stays, the board follows the
+                    # window
+                    self.resize()
+                    self.setup_canvas(*self.view_size())
+                    self.overlay = None
+                    self.draw_frame(full=True)
+                elif event.type == pygame.KEYDOWN:
+                    if event.key in KEY_DIRECTIONS and not autopilot:
+                        turns.push(
+                            KEY_DIRECTIONS[event.key],
+                            self.engine.direction,
+                            time.perf_counter())
                     elif event.key == pygame.K_ESCAPE:
-                        return self.game_over(
-                            background='resources/black_35.png',
-                            fg_color=self.skin_fg
-                        )
-
-            # Game over if the snake hit a edge
-            if (snake_coord[tip]['x'] == -1 or
-                snake_coord[tip]['x'] == self.cell_width or
-                snake_coord[tip]['y'] == -1 or
-               snake_coord[tip]['y'] == self.cell_height):
-                return self.game_over(
-                    background='resources/black_35.png',
-                    fg_color=self.skin_fg
-                )
-
-            # Game over if the snake hit it self
-            for body in snake_coord[1:]:
-                if (body['x'] == snake_coord[tip]['x'] and
-                   body['y'] == snake_coord[tip]['y']):
-                    return self.game_over(
-                        background='resources/black_35.png',
-                        fg_color=self.skin_fg
-                    )
-
-            # Check if the snake hit a apple
-            if (snake_coord[tip]['x'] == apple['x'] and
-               snake_coord[tip]['y'] == apple['y']):
-                apple = self.get_random_location()
-            else:
-                del snake_coord[-1]
-
-            # Move the snake by switching squares
-            if move is 'right':
-                snake_head = {
-                    'x': snake_coord[tip]['x'] + 1,
-                    'y': snake_coord[tip]['y']
-                }
-            elif move is 'left':
-                snake_head = {
-                    'x': snake_coord[tip]['x'] - 1,
-                    'y': snake_coord[tip]['y']
-                }
-            elif move is 'up':
-                snake_head = {
-                    'x': snake_coord[tip]['x'],
-                    'y': snake_coord[tip]['y'] - 1
-                }
-            elif move is 'down':
-                snake_head = {
-                    'x': snake_coord[tip]['x'],
-                    'y': snake_coord[tip]['y'] + 1
-                }
-
-            # Draw and update screen and variables
-            snake_coord.insert(0, snake_head)
-            self.draw_snake(snake_coord)
-            self.draw_apple(apple)
-            self.draw_score(len(snake_coord) - 3)
-            self.total_apples = len(snake_coord) - 3
-            self.total_score = self.total_apples * self.snake_speed[0]
-            pygame.display.update()
+                        if self.replay is not None:
+                            self.snapshots.save(
+                                self.engine, self.replay, self.autopilot)
+                        return 'paused'
+                    elif event.key == pygame.K_F3:
+                        self.toggle_profile_overlay()
+                        since_overlay = self.overlay_every
+            start = profiler.lap('events', start)
+
+            # Advance the snake for every tick that has passed, taking at
+            # most one queued turn each tick
+            while lag >= tick_ms:
+                lag -= tick_ms
+                turn = turns.pop()
+                if autopilot:
+                    direction = self.pilot.next_direction(self.engine)
+                    start = profiler.lap('autopilot', start)
+                elif turn is None:
+                    direction = None
+                else:
+                    direction = turn[0]
+                    shown.append(turn[1])
+                heading = self.engine.direction
+                alive = self.engine.step(direction)
+                start = profiler.lap('step', start)
+
+                # Keep turns that changed the heading for the replay
+                if (self.replay is not None and
+                   self.engine.direction != heading):
+                    self.replay.record(
+                        self.engine.ticks, self.engine.direction)
+
+                # Totals first, the last apple of a win counts too
+                self.total_apples = self.engine.apples
+                self.total_score = self.engine.score
+
+                # Game over if the snake hit a edge or it self
+                if not alive:
+                    return 'game_over'
+                self.draw_frame()
+                start = profiler.now()
+
+            # Draw and update screen
+            if self.interpolate:
+                self.draw_interpolation(
+                    lag / tick_ms, turns.peek() or self.engine.direction)
+                start = profiler.lap('interpolate', start)
+            if self.profile_overlay:
+                since_overlay += frame_ms
+                if since_overlay >= self.overlay_every:
+                    since_overlay = 0
+                    self.render_profile_overlay()
+                self.draw_profile_overlay()
+                start = profiler.lap('overlay', start)
+            self.update_display()
+            profiler.lap('update', start)
+
+            # Input latency of turns shown this frame
+            if shown:
+                now = time.perf_counter()
+                for stamp in shown:
+                    self.input_latency.add(now - stamp)
+                shown.clear()
 
     def game_over(self, background=None, fg_color=(255, 255, 255)):
         """ Game over screen
@@ -684,24 +1649,32 @@ class SnakeGame:
         Args:
             background (str|tuple): Path or RGB value
             fg_color (tuple): RGB value for primary text
+
+        Returns:
+            str: Next scene
         """
+        self.save_replay()
+        self.snapshots.discard()
+
         # Load background
         if background is not None:
             if isinstance(background, str):
-                self.screen.blit(pygame.transform.scale(
-                    pygame.image.load(background),
-                    (self.screen_res_x, self.screen_res_y)
-                ), (0, 0))
+                self.screen.blit(self.assets.image(
+                    background, (self.screen_res_x, self.screen_res_y)),
+                    (0, 0))
             else:
                 self.screen.fill(background)
 
         # Fonts
-        font_game_over = pygame.font.Font(self.font, 150)
-        font_game_over_small = pygame.font.Font(self.font, 75)
-        font_game_over_smallest = pygame.font.Font(self.font, 50)
+        font_game_over = self.assets.font(self.font, 150)
+        font_game_over_small = self.assets.font(self.font, 75)
+        font_game_over_smallest = self.assets.font(self.font, 50)
 
-        # Game over
-        game_over = font_game_over.render('Game Over', True, fg_color)
+        # Game over, or a win if the snake filled the board
+        if self.engine.cause == 'win':
+            game_over = self.assets.text(font_game_over, 'You Win!', fg_color)
+        else:
+            game_over = self.assets.text(font_game_over, 'Game Over', fg_color)
         game_over_rect = game_over.get_rect()
         game_over_rect.midtop = (self.screen_res_x / 2, 10)
 
@@ -718,9 +1691,8 @@ class SnakeGame:
         # Highscore
         if self.total_score > self.highscore:
             self.highscore = self.total_score
-            highscore_text = font_game_over_smallest.render(
-                "New highscore!", True, fg_color
-            )
+            highscore_text = self.assets.text(
+                font_game_over_smallest, "New highscore!", fg_color)
             highscore_rect = highscore_text.get_rect()
             highscore_rect.midtop = (
                 self.screen_res_x / 2,
@@ -739,9 +1711,8 @@ class SnakeGame:
         )
 
         # Press enter
-        press_enter = self.font_big.render(
-            'Press ENTER to return', True, fg_color
-        )
+        press_enter = self.assets.text(
+            self.font_big, 'Press ENTER to return', fg_color)
         press_enter_rect = press_enter.get_rect()
         press_enter_rect.midbottom = (
             self.screen_res_x / 2,
@@ -756,16 +1727,96 @@ class SnakeGame:
         pygame.display.update()
 
         # Wait for user to press Enter before returning to show_welcome_screen
-        while True:
-            if self.get_keypress():
-                pygame.event.get()
-                self.show_welcome_screen(background=self.image_welcome)
+        self.get_keypress()
+        pygame.event.get()
+        self.menu_id = 0
+        return 'welcome'
+
+    def save_replay(self):
+        """ Save the replay of the last game to replay_file.
+
+        Replays are played back with replay.py. A resumed round is not
+        saved, its apples after the resume do not follow the replay.
+        """
+        if self.replay_file is None or self.replay is None or self.resumed:
+            return
+        self.replay.ticks = self.engine.ticks
+        try:
+            self.replay.save(self.replay_file)
+        except OSError as e:
+            print(str(e) + "\nCould not save the replay.")
 
     def game_exit(self):
         """ Quit application; Uninitialize pygame, then system exit """
+        for label, tracker in (("Input latency", self.input_latency),
+                               ("Autopilot planning", self.pilot.plan_time)):
+            report = tracker.report()
+            if report:
+                print(label + ": " + ", ".join(
+                    "p{} {:.2f} ms".format(pct, ms)
+                    for pct, ms in report.items()))
+        if self.profile_csv is not None:
+            self.profiler.write_csv(self.profile_csv)
+            print("Profile histograms written to " + self.profile_csv)
+        self.snapshots.wait()
         pygame.quit()
         sys.exit()
 
 
 if __name__ == '__main__':
-    Snake = SnakeGame()
+    parser = argparse.ArgumentParser(description="Classic Snake HD")
+    parser.add_argument(
+        '--profile', metavar='CSV',
+        help="time every frame and write the histograms to CSV on exit")
+    parser.add_argument(
+        '--window', metavar='WxH',
+        help="play in a window of this size instead of fullscreen")
+    parser.add_argument(
+        '--resizable', action='store_true',
+        help="let the window be resized, with --window")
+    parser.add_argument(
+        '--world', metavar='WxH',
+        help="play endless games on a world of this many cells")
+    parser.add_argument(
+        '--arena', metavar='BOTS', type=int, default=0,
+        help="play against this many bot snakes on one board")
+    parser.add_argument(
+        '--connect', metavar='HOST:PORT',
+        help="play in the arena of a server.py, see --logical for boards "
+             "of another size than the screen")
+    parser.add_argument(
+        '--levels', metavar='PACK', default='resources/levels.pack',
+        help="level pack to choose levels from, see levels.py")
+    parser.add_argument(
+        '--level', metavar='N', type=int,
+        help="start on level N of the level pack, from 1")
+    parser.add_argument(
+        '--logical', metavar='N', type=int,
+        help="draw the board with N pixels per cell and scale it up")
+    args = parser.parse_args()
+
+    window = None
+    if args.window:
+        window = tuple(int(size) for size in args.window.split('x'))
+    Snake = SnakeGame(window, args.resizable)
+    Snake.profile_csv = args.profile
+    Snake.arena_bots = args.arena
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        Snake.server = (host, int(port))
+    if args.levels:
+        try:
+            Snake.level_pack = LevelPack(args.levels)
+        except (OSError, ValueError) as e:
+            print("No levels: " + str(e))
+    if args.level is not None and Snake.level_pack is not None:
+        if not 1 <= args.level <= len(Snake.level_pack):
+            parser.error("level must be 1 to {}".format(
+                len(Snake.level_pack)))
+        Snake.level_number = args.level - 1
+    if args.world:
+        Snake.world = tuple(int(size) for size in args.world.split('x'))
+    if args.logical:
+        Snake.logical_pixels = args.logical
+        Snake.calculate_grid()
+    Snake.run()
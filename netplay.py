@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (netplay.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Wire format of networked arenas, see server.py.
+
+The server runs the rules, clients keep a mirror of the arena that follows
+the changes of every tick. Every message is a frame of a FRAME header, the
+length of the payload and the kind of message, followed by the payload.
+
+A client gets a WELCOME when it joins, with the whole arena:
+
+    header    WELCOME_HEADER: width, height, speed, the number of the
+              client's snake and the tick
+    snakes    count, then for every living snake its number, apples eaten
+              and length, the head cell and direction number, and the
+              direction numbers from every segment to the next, four to a
+              byte
+    apples    count, then the cells
+
+then a TICK for every tick:
+
+    tick      tick number
+    killed    count, then the number of every ended snake and the index
+              of the cause in CAUSES
+    moved     count, then the direction number of every other living
+              snake in number order, four to a byte
+    born      count, then the number and head cell of every new snake
+    placed    count, then the cells of the new apples
+
+and sends a TURN, a single direction number, to steer its snake.
+
+Numbers and cells are unsigned varints as in replay.py. Which tails moved,
+which apples were eaten and who scored is not sent, it follows from the
+moves: a head moving onto an apple eats it and the snake grows, any other
+head moves the tail along. A tick of an arena of a thousand snakes is a few
+hundred bytes, where the full board would be tens of kilobytes.
+"""
+
+import socket
+import struct
+from array import array
+from collections import deque
+
+from arena import ArenaBoard, ArenaSnake
+from engine import ACTIONS, ACTION_NUMBERS, DIRECTIONS
+from replay import read_varint, write_varint
+
+# Payload length and kind of every message
+FRAME = struct.Struct('<IB')
+WELCOME = 1
+TICK = 2
+TURN = 3
+
+WELCOME_HEADER = struct.Struct('<HHHHI')
+
+# Causes of a snake ending, index into this tuple
+CAUSES = ('wall', 'self', 'snake', 'head', 'left')
+
+CAUSE_NUMBERS = {cause: idx for idx, cause in enumerate(CAUSES)}
+
+
+def frame(kind, payload):
+    """ Wrap a payload into a message.
+
+    Args:
+        kind (int): WELCOME, TICK or TURN
+        payload (bytes): Payload
+
+    Returns:
+        bytes: Message
+    """
+    return FRAME.pack(len(payload), kind) + payload
+
+
+def read_frames(buffer):
+    """ Take every complete message off the front of a buffer.
+
+    Args:
+        buffer (bytearray): Bytes received, what is read is removed
+
+    Returns:
+        list: Kind and payload of every message
+    """
+    frames = []
+    pos = 0
+    while len(buffer) - pos >= FRAME.size:
+        length, kind = FRAME.unpack_from(buffer, pos)
+        end = pos + FRAME.size + length
+        if end > len(buffer):
+            break
+        frames.append((kind, bytes(buffer[pos + FRAME.size:end])))
+        pos = end
+    del buffer[:pos]
+    return frames
+
+
+def pack_directions(out, directions):
+    """ Append direction numbers, four to a byte.
+
+    Args:
+        out (bytearray): Buffer to append to
+        directions (list): Direction numbers, see engine.ACTIONS
+    """
+    for idx in range(0, len(directions), 4):
+        byte = 0
+        for shift, number in enumerate(directions[idx:idx + 4]):
+            byte |= number << (shift * 2)
+        out.append(byte)
+
+
+def unpack_directions(data, pos, count):
+    """ Read direction numbers packed by pack_directions.
+
+    Args:
+        data (bytes): Buffer to read from
+        pos (int): Offset of the first byte
+        count (int): Number of directions
+
+    Returns:
+        tuple: Direction numbers and the offset after them
+    """
+    directions = [data[pos + (idx >> 2)] >> ((idx & 3) * 2) & 3
+                  for idx in range(count)]
+    return directions, pos + (count + 3) // 4
+
+
+def encode_welcome(arena, number):
+    """ Encode the whole arena for a client joining.
+
+    Args:
+        arena (Arena): Arena of the server
+        number (int): Number of the client's snake
+
+    Returns:
+        bytes: WELCOME message
+    """
+    width = arena.cell_width
+    out = bytearray(WELCOME_HEADER.pack(
+        width, arena.cell_height, arena.speed, number, arena.ticks))
+    snakes = [snake for snake in arena.snakes if snake.alive]
+    write_varint(out, len(snakes))
+    for snake in snakes:
+        body = snake.body
+        write_varint(out, snake.number)
+        write_varint(out, snake.eaten)
+        write_varint(out, len(body))
+        write_varint(out, body[0])
+        out.append(ACTION_NUMBERS[snake.direction])
+
+        # Direction from every segment to the next, towards the tail
+        links = []
+        previous = body[0]
+        for cell in list(body)[1:]:
+            step = cell - previous
+            if step == -width:
+                links.append(0)
+            elif step == width:
+                links.append(1)
+            else:
+                links.append(2 if step == -1 else 3)
+            previous = cell
+        pack_directions(out, links)
+    write_varint(out, len(arena.apple_cells))
+    for cell in arena.apple_cells:
+        write_varint(out, cell)
+    return frame(WELCOME, bytes(out))
+
+
+def encode_tick(arena):
+    """ Encode the changes of the last tick of an arena.
+
+    Args:
+        arena (Arena): Arena of the server, right after Arena.step
+
+    Returns:
+        bytes: TICK message
+    """
+    out = bytearray()
+    write_varint(out, arena.ticks)
+    write_varint(out, len(arena.killed))
+    for number, cause in arena.killed:
+        write_varint(out, number)
+        out.append(CAUSE_NUMBERS[cause])
+    snakes = arena.snakes
+    write_varint(out, len(arena.movers))
+    pack_directions(out, [ACTION_NUMBERS[snakes[number - 1].direction]
+                          for number in arena.movers])
+    write_varint(out, len(arena.born))
+    for number in arena.born:
+        write_varint(out, number)
+        write_varint(out, snakes[number - 1].body[0])
+    write_varint(out, len(arena.placed))
+    for cell in arena.placed:
+        write_varint(out, cell)
+    return frame(TICK, bytes(out))
+
+
+class ArenaMirror(ArenaBoard):
+    """ A client's copy of an arena, following the server tick by tick.
+
+    Looks like an Arena to SnakeGame.draw_arena, with the client's snake as
+    the player, sharing ArenaBoard with it but none of its rules: it only
+    ever changes through apply_tick.
+    """
+
+    def __init__(self, payload):
+        """ Create the mirror from a WELCOME payload.
+
+        Args:
+            payload (bytes): Payload of the WELCOME message
+        """
+        (self.cell_width, self.cell_height, self.speed, self.player_number,
+         self.ticks) = WELCOME_HEADER.unpack_from(payload)
+        self.game_over = False
+        self.deaths = {}
+        self.respawn_ticks = 0
+        cells = self.cell_width * self.cell_height
+        self.occupied = array('H', bytes(2 * cells))
+        self.apple_grid = bytearray(cells)
+        self.apple_cells = []
+        self.apple_pos = {}
+        self.snakes = []
+        self.clear_changes()
+
+        pos = WELCOME_HEADER.size
+        count, pos = read_varint(payload, pos)
+        for _ in range(count):
+            number, pos = read_varint(payload, pos)
+            snake = self.get_snake(number)
+            snake.eaten, pos = read_varint(payload, pos)
+            length, pos = read_varint(payload, pos)
+            cell, pos = read_varint(payload, pos)
+            snake.direction = ACTIONS[payload[pos]]
+            links, pos = unpack_directions(payload, pos + 1, length - 1)
+            snake.head_y, snake.head_x = divmod(cell, self.cell_width)
+            snake.alive = True
+            snake.body.append(cell)
+            for link in links:
+                move_x, move_y = DIRECTIONS[ACTIONS[link]]
+                cell += move_y * self.cell_width + move_x
+                snake.body.append(cell)
+            for cell in snake.body:
+                self.occupied[cell] = number
+        count, pos = read_varint(payload, pos)
+        for _ in range(count):
+            cell, pos = read_varint(payload, pos)
+            self.add_apple(cell)
+        self.get_snake(self.player_number)
+
+    def clear_changes(self):
+        """ Forget the changes drawn since the last call. """
+        self.cleared = []
+        self.moved = []
+        self.spawned = []
+        self.placed = []
+        self.movers = []
+        self.born = []
+        self.killed = []
+
+    def get_snake(self, number):
+        """ Get a snake by number, adding snakes up to it when new.
+
+        Args:
+            number (int): Number of the snake
+
+        Returns:
+            ArenaSnake: Snake
+        """
+        while len(self.snakes) < number:
+            self.snakes.append(ArenaSnake(self, len(self.snakes) + 1))
+        return self.snakes[number - 1]
+
+    def add_apple(self, cell):
+        """ Put an apple on the board.
+
+        Args:
+            cell (int): Cell index
+        """
+        self.apple_grid[cell] = 1
+        self.apple_pos[cell] = len(self.apple_cells)
+        self.apple_cells.append(cell)
+        self.placed.append(cell)
+
+    def apply_tick(self, payload):
+        """ Apply a tick of the server, in the order the server ran it.
+
+        Ended snakes are taken off first, then every tail that moves and
+        only then every head, as in Arena.step, and new snakes and apples
+        last.
+
+        Args:
+            payload (bytes): Payload of the TICK message
+
+        Raises:
+            ValueError: If the tick does not match the mirror
+        """
+        width = self.cell_width
+        occupied, apple_grid = self.occupied, self.apple_grid
+        self.ticks, pos = read_varint(payload, 0)
+
+        count, pos = read_varint(payload, pos)
+        for _ in range(count):
+            number, pos = read_varint(payload, pos)
+            snake = self.get_snake(number)
+            self.kill(snake, CAUSES[payload[pos]])
+            pos += 1
+
+        # Every living snake moves
+        movers = [snake for snake in self.snakes if snake.alive]
+        count, pos = read_varint(payload, pos)
+        if count != len(movers):
+            raise ValueError("Tick {} moves {} snakes, {} are alive".format(
+                self.ticks, count, len(movers)))
+        directions, pos = unpack_directions(payload, pos, count)
+        moves = []
+        for snake, direction in zip(movers, directions):
+            snake.direction = ACTIONS[direction]
+            move_x, move_y = DIRECTIONS[snake.direction]
+            x, y = snake.head_x + move_x, snake.head_y + move_y
+            cell = y * width + x
+            moves.append((snake, x, y, cell))
+            if not apple_grid[cell]:
+                tail = snake.body.pop()
+                occupied[tail] = 0
+                self.cleared.append(tail)
+        for snake, x, y, cell in moves:
+            snake.body.appendleft(cell)
+            occupied[cell] = snake.number
+            snake.head_x, snake.head_y = x, y
+            self.moved.append(cell)
+            self.movers.append(snake.number)
+            if apple_grid[cell]:
+                self.remove_apple(cell)
+                snake.eaten += 1
+
+        # New snakes, three cells long heading up, and new apples
+        count, pos = read_varint(payload, pos)
+        for _ in range(count):
+            number, pos = read_varint(payload, pos)
+            snake = self.get_snake(number)
+            cell, pos = read_varint(payload, pos)
+            snake.body.extend((cell, cell - 1, cell - 2))
+            for cell in snake.body:
+                occupied[cell] = number
+                self.spawned.append(cell)
+            snake.head_y, snake.head_x = divmod(snake.body[0], width)
+            snake.direction = 'up'
+            snake.alive = True
+            snake.eaten = 0
+            snake.cause = None
+            self.born.append(number)
+        count, pos = read_varint(payload, pos)
+        for _ in range(count):
+            cell, pos = read_varint(payload, pos)
+            self.add_apple(cell)
+
+
+class RemoteArena(ArenaMirror):
+    """ An arena on a server, played by SnakeGame like a local one """
+
+    def __init__(self, host, port, timeout=5):
+        """ Connect to a server and join its arena.
+
+        Args:
+            host (str): Host name of the server
+            port (int): Port of the server
+            timeout (float): Seconds to wait for the server
+
+        Raises:
+            OSError: If the server can not be reached or does not answer
+        """
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+        self.pending = deque()
+        while not self.pending:
+            if not self.receive(blocking=True):
+                raise ConnectionError("The server closed the connection")
+        kind, payload = self.pending.popleft()
+        if kind != WELCOME:
+            raise OSError("Expected a welcome from the server")
+        super().__init__(payload)
+        self.sock.setblocking(False)
+
+    def receive(self, blocking=False):
+        """ Read what the server sent into pending.
+
+        Args:
+            blocking (bool): Wait for at least some bytes
+
+        Returns:
+            bool: False if the server closed the connection
+        """
+        while True:
+            try:
+                data = self.sock.recv(1 << 16)
+            except BlockingIOError:
+                break
+            if not data:
+                return False
+            self.buffer += data
+            if blocking:
+                break
+        self.pending.extend(read_frames(self.buffer))
+        return True
+
+    def step(self, direction=None, turns=None):
+        """ Send a turn and apply every tick received since the last step.
+
+        Ticks arrive at the server's pace, so a step may apply none or
+        several. The changes to draw are then taken from what the cells
+        hold in the end, as a cell may change more than once.
+
+        Args:
+            direction (str): Optional new heading of the player
+
+        Returns:
+            bool: True while the player is alive and connected
+        """
+        if self.game_over:
+            return False
+        try:
+            if direction is not None and direction != self.direction:
+                self.sock.sendall(frame(
+                    TURN, bytes((ACTION_NUMBERS[direction],))))
+            connected = self.receive()
+        except OSError:
+            connected = False
+
+        self.clear_changes()
+        died = False
+        while self.pending:
+            kind, payload = self.pending.popleft()
+            if kind == TICK:
+                self.apply_tick(payload)
+                died = died or any(
+                    number == self.player_number
+                    for number, cause in self.killed)
+        if died or not connected:
+            if not died:
+                self.player_snake.cause = 'left'
+            self.game_over = True
+            self.sock.close()
+            return False
+
+        # What the changed cells hold now
+        occupied, apple_grid = self.occupied, self.apple_grid
+        touched = set(self.cleared)
+        touched.update(self.moved, self.spawned, self.placed)
+        self.cleared = [cell for cell in touched
+                        if not occupied[cell] and not apple_grid[cell]]
+        self.moved = [cell for cell in touched if occupied[cell]]
+        self.spawned = []
+        self.placed = [cell for cell in touched
+                       if apple_grid[cell] and not occupied[cell]]
+        return True
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (replay.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Compact replays of Classic Snake HD games.
+
+A game is fully decided by the seed of its random source, the settings and
+the turns, so that is all a replay stores. The file is a fixed header:
+
+    magic     4s  b'SNKR'
+    version   B
+    speed     H   snake speed in ticks per second
+    cell_size H   cell size in pixels
+    res_x     H   screen resolusion
+    res_y     H
+    divided   B   1 if the resolusion divides into cells, see
+                  SnakeGame.calculate_grid
+    seed      I   seed of the game's random.Random
+    ticks     I   ticks played
+
+followed by the number of turns and the turns themselves, all as unsigned
+LEB128 varints. Each turn is run-length encoded as the number of ticks
+since the previous turn, shifted left two bits, with the new direction in
+the low bits. A game of a few hundred turns takes a few hundred bytes.
+
+Run from the repository root to re-simulate a replay:
+
+    python3 replay.py last_game.replay [--seek TICK]
+"""
+
+import argparse
+import bisect
+import struct
+import time
+
+from engine import ACTIONS, SnakeEngine
+
+MAGIC = b'SNKR'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHHHBII')
+
+
+def write_varint(out, value):
+    """ Append an unsigned varint.
+
+    Args:
+        out (bytearray): Buffer to append to
+        value (int): Value, 0 or larger
+    """
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """ Read an unsigned varint.
+
+    Args:
+        data (bytes): Buffer to read from
+        pos (int): Offset of the varint
+
+    Returns:
+        tuple: Value and the offset after it
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """ Seed, settings and turns of a single game """
+
+    def __init__(self, seed, speed, cell_size, resolusion, divided=True,
+                 turns=None, ticks=0):
+        """ Create a replay.
+
+        Args:
+            seed (int): Seed of the game's random source, 32 bits
+            speed (int): Snake speed in ticks per second
+            cell_size (int): Cell size in pixels
+            resolusion (tuple): Screen width and height in pixels
+            divided (bool): Start position, as in SnakeEngine
+            turns (list): Tick and direction of every turn
+            ticks (int): Ticks played
+        """
+        self.seed = seed
+        self.speed = speed
+        self.cell_size = cell_size
+        self.resolusion = tuple(resolusion)
+        self.divided = divided
+        self.turns = turns if turns is not None else []
+        self.ticks = ticks
+
+    def record(self, tick, direction):
+        """ Add a turn, if it changes the direction.
+
+        Args:
+            tick (int): Tick the turn was applied in, engine.ticks after
+                the step
+            direction (str): New heading
+        """
+        last = self.turns[-1][1] if self.turns else 'up'
+        if direction != last:
+            self.turns.append((tick, direction))
+
+    def new_engine(self):
+        """ Create an engine at the start of the recorded game.
+
+        The grid is derived from the resolusion and cell size the same way
+        SnakeGame.calculate_grid does it.
+
+        Returns:
+            SnakeEngine: New engine
+        """
+        res_x, res_y = self.resolusion
+        return SnakeEngine(
+            res_x // self.cell_size, res_y // self.cell_size,
+            divided=self.divided, speed=self.speed, seed=self.seed)
+
+    def to_bytes(self):
+        """ Encode the replay.
+
+        Returns:
+            bytes: Replay file contents
+        """
+        out = bytearray(HEADER.pack(
+            MAGIC, VERSION, self.speed, self.cell_size,
+            self.resolusion[0], self.resolusion[1], int(self.divided),
+            self.seed, self.ticks))
+        write_varint(out, len(self.turns))
+        previous = 0
+        for tick, direction in self.turns:
+            write_varint(out, (tick - previous) << 2 |
+                         ACTIONS.index(direction))
+            previous = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Decode a replay.
+
+        Args:
+            data (bytes): Replay file contents
+
+        Returns:
+            Replay: The replay
+        """
+        (magic, version, speed, cell_size, res_x, res_y, divided, seed,
+         ticks) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Classic Snake HD replay")
+        count, pos = read_varint(data, HEADER.size)
+        turns = []
+        tick = 0
+        for _ in range(count):
+            value, pos = read_varint(data, pos)
+            tick += value >> 2
+            turns.append((tick, ACTIONS[value & 3]))
+        return cls(seed, speed, cell_size, (res_x, res_y), bool(divided),
+                   turns, ticks)
+
+    def save(self, path):
+        """ Write the replay to a file.
+
+        Args:
+            path (str): File path
+        """
+        with open(path, 'wb') as replay_file:
+            replay_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """ Read a replay from a file.
+
+        Args:
+            path (str): File path
+
+        Returns:
+            Replay: The replay
+        """
+        with open(path, 'rb') as replay_file:
+            return cls.from_bytes(replay_file.read())
+
+
+class ReplayPlayer:
+    """ Re-simulates a replay headlessly.
+
+    Every keyframe_every ticks the engine state is kept as a keyframe, so
+    seeking to a tick only re-simulates from the nearest keyframe before
+    it instead of from the start.
+    """
+
+    def __init__(self, replay, keyframe_every=1000):
+        """ Create a player at the start of the replay.
+
+        Args:
+            replay (Replay): Replay to play
+            keyframe_every (int): Ticks between keyframes
+        """
+        self.replay = replay
+        self.keyframe_every = keyframe_every
+        self.engine = replay.new_engine()
+        self.turn_ticks = [tick for tick, _ in replay.turns]
+        self.next_turn = 0
+        self.keyframes = [(0, self.engine.get_state(), 0)]
+
+    @property
+    def done(self):
+        """ bool: True at the end of the replay """
+        return self.engine.game_over or self.engine.ticks >= self.replay.ticks
+
+    def step(self):
+        """ Play a single tick.
+
+        Returns:
+            bool: True while the replay has more ticks
+        """
+        engine = self.engine
+        direction = None
+        if (self.next_turn < len(self.turn_ticks) and
+           self.turn_ticks[self.next_turn] == engine.ticks + 1):
+            direction = self.replay.turns[self.next_turn][1]
+            self.next_turn += 1
+        engine.step(direction)
+
+        # Keep a keyframe the first time past it
+        if (engine.ticks % self.keyframe_every == 0 and
+           engine.ticks > self.keyframes[-1][0]):
+            self.keyframes.append(
+                (engine.ticks, engine.get_state(), self.next_turn))
+        return not self.done
+
+    def play(self):
+        """ Play to the end of the replay.
+
+        Returns:
+            SnakeEngine: Engine at the end
+        """
+        while not self.done:
+            self.step()
+        return self.engine
+
+    def seek(self, tick):
+        """ Jump to a tick, or the end of the game if it is earlier.
+
+        Args:
+            tick (int): Tick to go to
+
+        Returns:
+            SnakeEngine: Engine at that tick
+        """
+        # Start from the nearest keyframe, unless already between it and
+        # the tick
+        idx = bisect.bisect_right([k[0] for k in self.keyframes], tick) - 1
+        keyframe_tick, state, next_turn = self.keyframes[idx]
+        if not keyframe_tick <= self.engine.ticks <= tick:
+            self.engine.set_state(state)
+            self.next_turn = next_turn
+        while self.engine.ticks < tick and not self.done:
+            self.step()
+        return self.engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path', help="replay file")
+    parser.add_argument('--seek', type=int, help="tick to jump to")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    player = ReplayPlayer(replay)
+    print("Seed {}, speed {}, cell size {}, {}x{}, {} turns, {} ticks".format(
+        replay.seed, replay.speed, replay.cell_size, replay.resolusion[0],
+        replay.resolusion[1], len(replay.turns), replay.ticks))
+
+    start = time.perf_counter()
+    engine = player.play()
+    elapsed = time.perf_counter() - start
+    print("Score {}, apples {}, ended by {}, {:.0f} ticks/sec".format(
+        engine.score, engine.apples, engine.cause or 'quit',
+        engine.ticks / elapsed if elapsed else 0))
+
+    if args.seek is not None:
+        start = time.perf_counter()
+        engine = player.seek(args.seek)
+        print("Tick {}: head {}, length {}, apple {}, {:.2f} ms".format(
+            engine.ticks, engine.head, engine.length, engine.apple,
+            (time.perf_counter() - start) * 1000))
+
+
+if __name__ == '__main__':
+    main()
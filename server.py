@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (server.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Server for networked arenas, many players and bots on one board.
+
+The server runs the arena rules on an asyncio event loop and is the only
+one that does. Every client that connects over TCP gets a snake of its own
+and the whole arena, then only the changes of every tick, see netplay.py
+for the wire format. The tick is encoded once and the same bytes are
+written to every client.
+
+Clients send turns, which are queued and applied one per tick like the
+TurnQueue of a local game. A client that can not keep up, with more than
+max_buffer bytes waiting to be sent, is dropped.
+
+Run from the repository root, and join with main.py --connect:
+
+    python3 server.py --port 7777 --grid 96x54 --bots 20
+"""
+
+import argparse
+import asyncio
+import time
+from collections import deque
+
+from arena import Arena
+from engine import ACTIONS
+from netplay import FRAME, TURN, encode_tick, encode_welcome
+from timing import LatencyTracker
+
+
+class ArenaServer:
+    """ Runs an arena and keeps its clients in sync """
+
+    def __init__(self, arena, max_buffer=1 << 20, turn_queue_size=3):
+        """ Create a server for an arena.
+
+        Args:
+            arena (Arena): Arena to run, without a player
+            max_buffer (int): Bytes waiting to be sent to a client before
+                it is dropped
+            turn_queue_size (int): Turns kept waiting for every client
+        """
+        self.arena = arena
+        self.max_buffer = max_buffer
+        self.turn_queue_size = turn_queue_size
+        self.clients = {}
+        self.turns = {}
+        self.min_apples = arena.apple_count
+
+        # Time to run, encode and send a tick, and the ticks sent
+        self.tick_times = LatencyTracker()
+        self.ticks_sent = 0
+        self.bytes_sent = 0
+
+    async def handle_client(self, reader, writer):
+        """ Serve a client until it leaves, see asyncio.start_server.
+
+        Args:
+            reader (asyncio.StreamReader): Turns of the client
+            writer (asyncio.StreamWriter): Messages to the client
+        """
+        arena = self.arena
+        number = arena.add_snake()
+        if number is None:
+            writer.close()
+            return
+
+        self.fit_apples()
+        writer.write(encode_welcome(arena, number))
+        self.clients[number] = writer
+        self.turns[number] = turns = deque()
+        try:
+            while True:
+                length, kind = FRAME.unpack(
+                    await reader.readexactly(FRAME.size))
+                payload = await reader.readexactly(length)
+                if (kind == TURN and payload and payload[0] < len(ACTIONS)
+                        and len(turns) < self.turn_queue_size):
+                    turns.append(ACTIONS[payload[0]])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.drop(number)
+
+    def drop(self, number):
+        """ Disconnect a client and take its snake off the board.
+
+        Args:
+            number (int): Number of the client's snake
+        """
+        writer = self.clients.pop(number, None)
+        if writer is None:
+            return
+        del self.turns[number]
+        self.arena.remove_snake(number)
+        self.fit_apples()
+        writer.close()
+
+    def fit_apples(self):
+        """ Keep one apple for every two snakes on the board, as in Arena.
+
+        Never fewer than the arena started with. When clients leave, the
+        apples over the new count stay until they are eaten.
+        """
+        arena = self.arena
+        snakes = sum(snake.respawn_tick >= 0 for snake in arena.snakes)
+        arena.apple_count = max(self.min_apples, snakes // 2 + 1)
+
+    def tick(self):
+        """ Advance the arena a tick and send the changes to every client.
+
+        Returns:
+            bytes: TICK message sent
+        """
+        turns = {number: queue.popleft()
+                 for number, queue in self.turns.items() if queue}
+        self.arena.step(turns=turns)
+        message = encode_tick(self.arena)
+        for number, writer in list(self.clients.items()):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.drop(number)
+                continue
+            writer.write(message)
+            self.ticks_sent += 1
+            self.bytes_sent += len(message)
+        return message
+
+    async def run(self, ticks=None, max_behind=5):
+        """ Tick at the speed of the arena.
+
+        Args:
+            ticks (int): Stop after this many ticks, run forever if None
+            max_behind (int): Ticks to catch up on before skipping them
+
+        Returns:
+            int: Ticks run
+        """
+        loop = asyncio.get_running_loop()
+        tick_s = 1 / self.arena.speed
+        next_tick = loop.time()
+        count = 0
+        while ticks is None or count < ticks:
+            next_tick += tick_s
+            now = loop.time()
+            if now - next_tick > tick_s * max_behind:
+                next_tick = now
+            await asyncio.sleep(max(next_tick - now, 0))
+            start = time.perf_counter()
+            self.tick()
+            self.tick_times.add(time.perf_counter() - start)
+            count += 1
+        return count
+
+    async def serve(self, host, port, ticks=None):
+        """ Accept clients and run the arena.
+
+        Args:
+            host (str): Address to listen on
+            port (int): Port to listen on
+            ticks (int): Stop after this many ticks, run forever if None
+        """
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await self.run(ticks)
+
+    def report(self):
+        """ Get the tick times and the bytes sent per tick and client.
+
+        Returns:
+            str: One line summary
+        """
+        report = self.tick_times.report((50, 99))
+        per_client = self.bytes_sent / self.ticks_sent if (
+            self.ticks_sent) else 0
+        return ("{} ticks, p50 {:.3f} ms, p99 {:.3f} ms, "
+                "{:.0f} bytes/tick per client".format(
+                    len(self.tick_times), report.get(50, 0),
+                    report.get(99, 0), per_client))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--grid', default='96x54',
+                        help="grid size in cells, WIDTHxHEIGHT")
+    parser.add_argument('--bots', type=int, default=20)
+    parser.add_argument('--speed', type=int, default=15,
+                        help="ticks per second")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    cell_width, cell_height = (int(v) for v in args.grid.split('x'))
+    server = ArenaServer(Arena(
+        cell_width, cell_height, bots=args.bots, speed=args.speed,
+        seed=args.seed, player=False))
+    print("Serving a {}x{} arena on {}:{}".format(
+        cell_width, cell_height, args.host, args.port))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    print(server.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (snapshot.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Save-state snapshots of a running Classic Snake HD game.
+
+A snapshot is a fixed little-endian header followed by fixed-size blocks:
+
+    header    see HEADER below
+    rng       625 x uint32   state of the game's random.Random
+    body      length / 4     direction from every segment to the next one
+                             towards the head, starting at the tail, as 2
+                             bits per segment, lowest bits first
+    replay    replay bytes   replay.Replay of the game so far
+
+The directions are read from the link buffer the engine keeps anyway, so
+capture() is a single buffer copy even for a snake filling the board, and
+the walk along the body runs in encode() on the writer thread. A snake of
+80000 segments takes 20 KiB, an empty board only the header and the random
+state. The occupancy buffer and the free list are rebuilt from the body on
+restore, the free list in cell order. Apples after a resume therefore
+differ from the ones the game would have had without the break, and the
+replay of a resumed round no longer plays it back.
+
+Levels are not snapshotted: a portal moves the head away from the segment
+behind it, so the body is no longer a chain of neighbouring cells.
+"""
+
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from engine import ACTIONS
+from replay import Replay
+
+MAGIC = b'SNKS'
+VERSION = 2
+
+# magic, version, autopilot, direction, apple (-1 for none), tail cell,
+# length, ticks and replay bytes
+HEADER = struct.Struct('<4sBBBiIIII')
+RNG_WORDS = 625
+
+# Directions of every byte of the body, lowest bits first
+BODY_CODES = [bytes(byte >> shift & 3 for shift in (0, 2, 4, 6))
+              for byte in range(256)]
+
+
+def to_little_endian(values):
+    """ Get the bytes of an array in little-endian order.
+
+    Args:
+        values (array.array): Values
+
+    Returns:
+        bytes: Contents of the array
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_little_endian(typecode, data):
+    """ Read an array from little-endian bytes.
+
+    Args:
+        typecode (str): Array type code
+        data (bytes): Contents of the array
+
+    Returns:
+        array.array: Values
+    """
+    values = array(typecode, data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def capture(engine, replay, autopilot=False):
+    """ Copy what a snapshot needs from a running game.
+
+    Only copies buffers and lists, the encoding is left to encode() so it
+    can run on another thread.
+
+    Args:
+        engine (SnakeEngine): Running game
+        replay (Replay): Replay of the game so far
+        autopilot (bool): If the autopilot is steering
+
+    Returns:
+        tuple: Captured game, for encode()
+
+    Raises:
+        ValueError: If the game is played on a level
+    """
+    if engine.level is not None:
+        raise ValueError("Games on a level are not snapshotted")
+    return (
+        autopilot,
+        ACTIONS.index(engine.direction),
+        -1 if engine.apple_cell is None else engine.apple_cell,
+        engine.body[-1],
+        len(engine.body),
+        engine.ticks,
+        engine.rng.getstate()[1],
+        engine.cell_width,
+        bytes(engine.links),
+        Replay(replay.seed, replay.speed, replay.cell_size,
+               replay.resolusion, replay.divided, replay.turns[:],
+               engine.ticks))
+
+
+def encode(captured):
+    """ Encode a captured game as a snapshot.
+
+    Args:
+        captured (tuple): Return value of capture()
+
+    Returns:
+        bytes: Snapshot
+    """
+    (autopilot, direction, apple, tail, length, ticks, rng, width, links,
+     replay) = captured
+
+    # Directions from the tail to the head, four to a byte
+    offsets = (-width, width, -1, 1)
+    codes = bytearray(length + 2 & ~3)
+    cell = tail
+    for idx in range(length - 1):
+        code = codes[idx] = links[cell]
+        cell += offsets[code]
+    body = bytes(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(
+        codes[0::4], codes[1::4], codes[2::4], codes[3::4]))
+
+    replay_data = replay.to_bytes()
+    return b''.join((
+        HEADER.pack(MAGIC, VERSION, int(autopilot), direction, apple, tail,
+                    length, ticks, len(replay_data)),
+        to_little_endian(array('I', rng)),
+        body,
+        replay_data))
+
+
+def dumps(engine, replay, autopilot=False):
+    """ Get a snapshot of a running game.
+
+    Args:
+        engine (SnakeEngine): Running game
+        replay (Replay): Replay of the game so far
+        autopilot (bool): If the autopilot is steering
+
+    Returns:
+        bytes: Snapshot
+    """
+    return encode(capture(engine, replay, autopilot))
+
+
+def loads(data):
+    """ Restore a game from a snapshot.
+
+    Args:
+        data (bytes): Snapshot
+
+    Returns:
+        tuple: SnakeEngine, Replay and the autopilot flag
+    """
+    (magic, version, autopilot, direction, apple, tail, length, ticks,
+     replay_size) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a Classic Snake HD snapshot")
+
+    # Replay at the end, it has the settings for the engine
+    replay = Replay.from_bytes(data[len(data) - replay_size:])
+    engine = replay.new_engine()
+    cells = len(engine.occupied)
+
+    # Fixed blocks
+    pos = HEADER.size
+    rng = from_little_endian('I', data[pos:pos + RNG_WORDS * 4])
+    pos += RNG_WORDS * 4
+    codes = b''.join(
+        BODY_CODES[byte] for byte in data[pos:pos + (length + 2) // 4])
+
+    # Body from the tail to the head
+    width = engine.cell_width
+    offsets = (-width, width, -1, 1)
+    body = [tail]
+    cell = tail
+    for code in codes[:length - 1]:
+        cell += offsets[code]
+        body.append(cell)
+    body.reverse()
+    if (len(body) != length or min(body) < 0 or max(body) >= cells or
+            len(set(body)) != length):
+        raise ValueError("Broken snapshot")
+
+    # The free list is rebuilt by set_state, in cell order
+    engine.set_state({
+        'ticks': ticks,
+        'body': body,
+        'direction': ACTIONS[direction],
+        'apple': None if apple < 0 else apple,
+        'rng': (3, tuple(rng), None),
+        'game_over': False,
+        'cause': None
+    })
+    return engine, replay, bool(autopilot)
+
+
+def load(path):
+    """ Read a snapshot from a file.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        tuple: SnakeEngine, Replay and the autopilot flag, None if there
+            is no usable snapshot
+    """
+    try:
+        with open(path, 'rb') as snapshot_file:
+            return loads(snapshot_file.read())
+    except (OSError, ValueError, IndexError, struct.error) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(str(e) + "\nSnapshot unusable, starting a new game.")
+        return None
+
+
+class SnapshotWriter:
+    """ Writes snapshots to a file on a background thread.
+
+    The game only pays for capture(), encoding and the disk write run on
+    the writer thread. The file is replaced atomically, written to a
+    temporary file next to it, synced and renamed over it, so a crash or
+    power cut leaves either the old or the new snapshot. If snapshots come
+    faster than they are written, only the newest one is kept.
+    """
+
+    def __init__(self, path):
+        """ Create a writer, the thread is started on first use.
+
+        Args:
+            path (str): Snapshot file path
+        """
+        self.path = path
+        self.pending = None
+        self.busy = False
+        self.written = 0
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def save(self, engine, replay, autopilot=False):
+        """ Queue a snapshot of a running game.
+
+        Args:
+            engine (SnakeEngine): Running game
+            replay (Replay): Replay of the game so far
+            autopilot (bool): If the autopilot is steering
+        """
+        captured = capture(engine, replay, autopilot)
+        with self.condition:
+            self.pending = captured
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def wait(self):
+        """ Block until every queued snapshot is written. """
+        with self.condition:
+            while self.pending is not None or self.busy:
+                self.condition.wait()
+
+    def discard(self):
+        """ Remove the snapshot, e.g. when the game is over. """
+        with self.condition:
+            self.pending = None
+            while self.busy:
+                self.condition.wait()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def run(self):
+        """ Writer thread, writes queued snapshots until the game quits. """
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                captured, self.pending = self.pending, None
+                self.busy = True
+            try:
+                self.write(encode(captured))
+            except OSError as e:
+                print(str(e) + "\nCould not save the snapshot.")
+            with self.condition:
+                self.busy = False
+                self.written += 1
+                self.condition.notify_all()
+
+    def write(self, data):
+        """ Replace the snapshot file atomically.
+
+        Args:
+            data (bytes): Snapshot
+        """
+        temp = self.path + '.tmp'
+        with open(temp, 'wb') as snapshot_file:
+            snapshot_file.write(data)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp, self.path)
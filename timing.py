@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (timing.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Timing measurements for Classic Snake HD. """
+
+import bisect
+import csv
+import time
+from array import array
+from collections import deque
+
+# Upper bounds of the profiler histogram buckets in microseconds, the last
+# bucket has no bound
+HISTOGRAM_US = (
+    10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 16667, 20000,
+    33333, 50000, 100000
+)
+
+
+def percentile(values, pct):
+    """ Get a percentile with nearest-rank.
+
+    Args:
+        values (list): Sorted values
+        pct (float): Percentile, 0 to 100
+
+    Returns:
+        float: The value, None if there are no values
+    """
+    if not values:
+        return None
+    rank = int(round(pct / 100 * (len(values) - 1)))
+    return values[rank]
+
+
+class LatencyTracker:
+    """ Keeps the latest latency samples and reports percentiles """
+
+    def __init__(self, size=10000):
+        """ Create an empty tracker.
+
+        Args:
+            size (int): Number of samples kept, older ones are dropped
+        """
+        self.samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, seconds):
+        """ Add a sample.
+
+        Args:
+            seconds (float): Latency in seconds
+        """
+        self.samples.append(seconds)
+
+    def report(self, pcts=(50, 95, 99)):
+        """ Get percentiles in milliseconds.
+
+        Args:
+            pcts (tuple): Percentiles to report
+
+        Returns:
+            dict: Percentile to milliseconds, empty without samples
+        """
+        values = sorted(self.samples)
+        if not values:
+            return {}
+        return {pct: percentile(values, pct) * 1000 for pct in pcts}
+
+
+class FrameProfiler:
+    """ Time spent per frame in each phase of the game loop.
+
+    Phases are timed with perf_counter_ns and summed per frame, then kept
+    in fixed-size ring buffers for percentiles of the latest frames, and
+    counted in histograms over the whole session. The time between two
+    end_frame calls is kept as the 'frame' phase.
+
+    Disabled, now() and lap() return at once, so the calls can stay in the
+    game loop.
+    """
+
+    def __init__(self, phases, size=1024):
+        """ Create a disabled profiler.
+
+        Args:
+            phases (tuple): Names of the phases
+            size (int): Number of frames kept per phase
+        """
+        self.phases = ('frame',) + tuple(phases)
+        self.size = size
+        self.enabled = False
+        self.rings = {phase: array('q', [0]) * size for phase in self.phases}
+        self.histograms = {
+            phase: [0] * (len(HISTOGRAM_US) + 1) for phase in self.phases}
+        self.current = dict.fromkeys(phases, 0)
+        self.frames = 0
+        self.last_frame = None
+
+    def enable(self, enabled=True):
+        """ Switch timing on or off.
+
+        Args:
+            enabled (bool): True to time frames
+        """
+        self.enabled = enabled
+        self.last_frame = None
+        for phase in self.current:
+            self.current[phase] = 0
+
+    def now(self):
+        """ Get a start time for lap().
+
+        Returns:
+            int: perf_counter_ns, 0 while disabled
+        """
+        if not self.enabled:
+            return 0
+        return time.perf_counter_ns()
+
+    def lap(self, phase, start):
+        """ Add the time since start to a phase of this frame.
+
+        Args:
+            phase (str): Phase name
+            start (int): Return value of now() or lap()
+
+        Returns:
+            int: perf_counter_ns, the start of the next phase
+        """
+        if not self.enabled:
+            return 0
+        now = time.perf_counter_ns()
+        self.current[phase] += now - start
+        return now
+
+    def end_frame(self):
+        """ Store the phase times of this frame and start the next one. """
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.last_frame is not None:
+            pos = self.frames % self.size
+            self.frames += 1
+            self.record('frame', pos, now - self.last_frame)
+            for phase, elapsed in self.current.items():
+                self.record(phase, pos, elapsed)
+        for phase in self.current:
+            self.current[phase] = 0
+        self.last_frame = now
+
+    def record(self, phase, pos, elapsed):
+        """ Store the time of a phase in its ring buffer and histogram.
+
+        Args:
+            phase (str): Phase name
+            pos (int): Position in the ring buffer
+            elapsed (int): Nanoseconds
+        """
+        self.rings[phase][pos] = elapsed
+        self.histograms[phase][
+            bisect.bisect_left(HISTOGRAM_US, elapsed / 1000)] += 1
+
+    def report(self, pcts=(50, 95, 99)):
+        """ Get mean and percentiles of the latest frames.
+
+        Args:
+            pcts (tuple): Percentiles to report
+
+        Returns:
+            dict: Phase to a dict of 'mean' and percentiles in
+                milliseconds, empty without frames
+        """
+        count = min(self.frames, self.size)
+        if not count:
+            return {}
+        report = {}
+        for phase in self.phases:
+            values = sorted(self.rings[phase][:count])
+            times = {'mean': sum(values) / count / 1e6}
+            for pct in pcts:
+                times[pct] = percentile(values, pct) / 1e6
+            report[phase] = times
+        return report
+
+    def write_csv(self, path):
+        """ Write the histograms of every phase to a CSV file.
+
+        Rows are phase, upper bound of the bucket in microseconds (empty
+        for the last one) and number of frames.
+
+        Args:
+            path (str): File path
+        """
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(('phase', 'le_us', 'frames'))
+            for phase in self.phases:
+                bounds = HISTOGRAM_US + ('',)
+                for bound, frames in zip(bounds, self.histograms[phase]):
+                    writer.writerow((phase, bound, frames))
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (tournament.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Play bot policies against the headless engine on many processes.
+
+Games are split into batches and played on a ProcessPoolExecutor, each game
+with its own seed. Results stream back a batch at a time, printed with the
+running mean score of every policy as they arrive (unless --quiet), and are
+summarised per policy, along with games per second for every worker count:
+
+    python3 tournament.py --games 2000 --policies random,greedy --workers 1,2,4
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bots import POLICIES
+from engine import SnakeEngine
+
+# Mixed into the seed of a game for its policy, so the policy's random
+# choices do not follow the apples
+POLICY_SEED = 0x9E3779B9
+
+
+def play_game(policy, seed, cell_width, cell_height, speed, max_ticks):
+    """ Play a single game.
+
+    Args:
+        policy (str): Name in bots.POLICIES
+        seed (int): Seed for the apples, the policy gets one derived from it
+        cell_width (int): Number of cells horizontally
+        cell_height (int): Number of cells vertically
+        speed (int): Snake speed, used as the score multiplier
+        max_ticks (int): Stop the game after this many ticks
+
+    Returns:
+        dict: Result of the game
+    """
+    rng = random.Random(seed ^ POLICY_SEED)
+    engine = SnakeEngine(
+        cell_width, cell_height, speed=speed, rng=random.Random(seed))
+    choose = POLICIES[policy]
+    if isinstance(choose, type):
+        choose = choose()
+    while engine.ticks < max_ticks and engine.step(choose(engine, rng)):
+        pass
+    return {
+        'policy': policy,
+        'seed': seed,
+        'score': engine.score,
+        'apples': engine.apples,
+        'length': engine.length,
+        'ticks': engine.ticks,
+        'cause': engine.cause or 'timeout'
+    }
+
+
+def play_batch(policy, seeds, cell_width, cell_height, speed, max_ticks):
+    """ Play a batch of games in a worker.
+
+    Args:
+        policy (str): Name in bots.POLICIES
+        seeds (list): One seed per game
+        cell_width (int): Number of cells horizontally
+        cell_height (int): Number of cells vertically
+        speed (int): Snake speed, used as the score multiplier
+        max_ticks (int): Stop each game after this many ticks
+
+    Returns:
+        list: Results, one dict per game
+    """
+    return [play_game(policy, seed, cell_width, cell_height, speed,
+                      max_ticks) for seed in seeds]
+
+
+def run(policies, games, workers, batch_size=50, seed=0, cell_width=48,
+        cell_height=27, speed=15, max_ticks=20000, on_batch=None):
+    """ Play every policy a number of games.
+
+    Args:
+        policies (list): Names in bots.POLICIES
+        games (int): Games per policy
+        workers (int): Number of processes
+        batch_size (int): Games per task sent to a worker
+        seed (int): First seed, game i is played with seed + i
+        cell_width (int): Number of cells horizontally
+        cell_height (int): Number of cells vertically
+        speed (int): Snake speed, used as the score multiplier
+        max_ticks (int): Stop each game after this many ticks
+        on_batch (function): Called with each list of results as it arrives
+
+    Returns:
+        list: Results of all games
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for policy in policies:
+            for start in range(0, games, batch_size):
+                seeds = range(seed + start,
+                              seed + min(start + batch_size, games))
+                futures.append(pool.submit(
+                    play_batch, policy, list(seeds), cell_width,
+                    cell_height, speed, max_ticks))
+
+        # Stream results back as batches finish
+        for future in as_completed(futures):
+            batch = future.result()
+            results.extend(batch)
+            if on_batch is not None:
+                on_batch(batch)
+    return results
+
+
+def print_progress(total):
+    """ Make an on_batch callback for run() printing the games so far.
+
+    Args:
+        total (int): Number of games in the run
+
+    Returns:
+        function: Callback printing the games played and the running mean
+            score of every policy
+    """
+    played = {}
+
+    def on_batch(batch):
+        for result in batch:
+            games, score = played.get(result['policy'], (0, 0))
+            played[result['policy']] = (games + 1, score + result['score'])
+        print("{}/{} games, ".format(
+            sum(games for games, score in played.values()), total) +
+            ", ".join("{} mean {:.1f}".format(policy, score / games)
+                      for policy, (games, score) in sorted(played.items())),
+            flush=True)
+    return on_batch
+
+
+def summarise(results):
+    """ Summary statistics per policy.
+
+    Args:
+        results (list): Game results
+
+    Returns:
+        dict: Policy name to statistics
+    """
+    summary = {}
+    for policy in sorted({r['policy'] for r in results}):
+        games = [r for r in results if r['policy'] == policy]
+        scores = [r['score'] for r in games]
+        summary[policy] = {
+            'games': len(games),
+            'score_mean': statistics.mean(scores),
+            'score_median': statistics.median(scores),
+            'score_max': max(scores),
+            'apples_mean': statistics.mean(r['apples'] for r in games),
+            'length_mean': statistics.mean(r['length'] for r in games),
+            'ticks_mean': statistics.mean(r['ticks'] for r in games),
+            'causes': dict(Counter(r['cause'] for r in games))
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=int, default=1000,
+                        help="games per policy")
+    parser.add_argument('--policies', default='random,greedy',
+                        help="comma separated, one of: " +
+                        ", ".join(sorted(POLICIES)))
+    parser.add_argument('--workers', default='1',
+                        help="comma separated worker counts to run with")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid', default='48x27',
+                        help="grid size in cells, WIDTHxHEIGHT")
+    parser.add_argument('--speed', type=int, default=15)
+    parser.add_argument('--max-ticks', type=int, default=20000)
+    parser.add_argument('--quiet', action='store_true',
+                        help="only print the summary, not every batch")
+    args = parser.parse_args()
+
+    policies = args.policies.split(',')
+    for policy in policies:
+        if policy not in POLICIES:
+            parser.error("unknown policy: " + policy)
+    cell_width, cell_height = (int(v) for v in args.grid.split('x'))
+
+    # Play the same games with each worker count
+    rates = []
+    for workers in (int(w) for w in args.workers.split(',')):
+        on_batch = None
+        if not args.quiet:
+            print("{} workers".format(workers))
+            on_batch = print_progress(len(policies) * args.games)
+        start = time.perf_counter()
+        results = run(policies, args.games, workers, args.batch_size,
+                      args.seed, cell_width, cell_height, args.speed,
+                      args.max_ticks, on_batch)
+        elapsed = time.perf_counter() - start
+        rates.append((workers, len(results) / elapsed))
+
+    # Report, results are the same for every worker count
+    for policy, stats in summarise(results).items():
+        print("{}: {} games".format(policy, stats['games']))
+        print("  score   mean {:.1f}, median {:.1f}, max {}".format(
+            stats['score_mean'], stats['score_median'], stats['score_max']))
+        print("  apples  mean {:.1f}, length mean {:.1f}, "
+              "ticks mean {:.1f}".format(
+                  stats['apples_mean'], stats['length_mean'],
+                  stats['ticks_mean']))
+        print("  causes  " + ", ".join(
+            "{} {}".format(cause, count)
+            for cause, count in sorted(stats['causes'].items())))
+    print("{:>8}  {:>10}  {:>8}".format("workers", "games/sec", "speedup"))
+    for workers, rate in rates:
+        print("{:>8}  {:>10.1f}  {:>8.2f}".format(
+            workers, rate, rate / rates[0][1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#
+# Classic Snake HD (world.py)
+#
+# Copyright (c) 2016 Philip Andersen <philip.andersen@codeofmagi.net>
+# Copyright (c) 2016 Code of Magi (http://codeofmagi.net)
+#
+# This file is part of Snake One HD application
+# (https://github.com/renegadevi/Classic-Snake-HD).
+#
+
+""" Endless mode of Classic Snake HD, on a world far larger than the screen.
+
+SnakeEngine keeps a byte and a free list entry for every cell, which is fine
+for a board the size of the screen but not for a world of millions of cells.
+WorldEngine keeps the same rules on a sparse ChunkedGrid instead: only the
+chunks the snake is in are allocated, and apples are dropped near the head
+instead of anywhere in the world. Memory follows the length of the snake,
+not the size of the world. What does not depend on the grid is shared with
+SnakeEngine through engine.BaseEngine.
+
+SnakeGame draws it through a camera following the head, see
+SnakeGame.follow_camera, and only draws the cells inside the viewport.
+"""
+
+import random
+from collections import deque
+
+from engine import DIRECTIONS, BaseEngine
+
+# Chunks are CHUNK x CHUNK cells, a power of two
+CHUNK_BITS = 5
+CHUNK = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK - 1
+
+
+class ChunkedGrid:
+    """ Sparse occupancy grid of packed cells (y * width + x).
+
+    Indexed like the bytearray SnakeEngine.occupied, but only chunks with a
+    taken cell are allocated, and a chunk is dropped again when its last
+    cell is released.
+    """
+
+    def __init__(self, width, height):
+        """ Create an empty grid.
+
+        Args:
+            width (int): Number of cells horizontally
+            height (int): Number of cells vertically
+        """
+        self.width = width
+        self.height = height
+        self.chunks_wide = (width + CHUNK_MASK) >> CHUNK_BITS
+        self.chunks = {}
+        self.counts = {}
+
+    def __len__(self):
+        return self.width * self.height
+
+    def locate(self, cell):
+        """ Get the chunk of a cell and the offset in it.
+
+        Args:
+            cell (int): Cell index
+
+        Returns:
+            tuple: Chunk key and offset
+        """
+        y, x = divmod(cell, self.width)
+        return ((y >> CHUNK_BITS) * self.chunks_wide + (x >> CHUNK_BITS),
+                (y & CHUNK_MASK) << CHUNK_BITS | (x & CHUNK_MASK))
+
+    def __getitem__(self, cell):
+        key, offset = self.locate(cell)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return 0
+        return chunk[offset]
+
+    def __setitem__(self, cell, value):
+        key, offset = self.locate(cell)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if not value:
+                return
+            chunk = self.chunks[key] = bytearray(CHUNK * CHUNK)
+            self.counts[key] = 0
+        if bool(chunk[offset]) == bool(value):
+            return
+        chunk[offset] = 1 if value else 0
+        if value:
+            self.counts[key] += 1
+        elif self.counts[key] == 1:
+            del self.chunks[key]
+            del self.counts[key]
+        else:
+            self.counts[key] -= 1
+
+    def clear(self):
+        """ Release every cell. """
+        self.chunks.clear()
+        self.counts.clear()
+
+    def cells_in(self, x, y, width, height):
+        """ Get the taken cells inside a rectangle.
+
+        Only the allocated chunks overlapping the rectangle are looked at,
+        so the cost follows the size of the rectangle, not of the world.
+
+        Args:
+            x (int): Left column
+            y (int): Top row
+            width (int): Number of columns
+            height (int): Number of rows
+
+        Returns:
+            list: x/y coordinates of the taken cells
+        """
+        right = min(x + width, self.width)
+        bottom = min(y + height, self.height)
+        x, y = max(x, 0), max(y, 0)
+        cells = []
+        for chunk_y in range(y >> CHUNK_BITS,
+                             ((bottom - 1) >> CHUNK_BITS) + 1):
+            for chunk_x in range(x >> CHUNK_BITS,
+                                 ((right - 1) >> CHUNK_BITS) + 1):
+                chunk = self.chunks.get(chunk_y * self.chunks_wide + chunk_x)
+                if chunk is None:
+                    continue
+
+                # Taken cells of the chunk, kept if inside the rectangle
+                base_x = chunk_x << CHUNK_BITS
+                base_y = chunk_y << CHUNK_BITS
+                offset = chunk.find(1)
+                while offset != -1:
+                    cell_x = base_x + (offset & CHUNK_MASK)
+                    cell_y = base_y + (offset >> CHUNK_BITS)
+                    if x <= cell_x < right and y <= cell_y < bottom:
+                        cells.append((cell_x, cell_y))
+                    offset = chunk.find(1, offset + 1)
+        return cells
+
+
+class WorldEngine(BaseEngine):
+    """ The rules of an endless game on a sparse world """
+
+    endless = True
+
+    def __init__(self, cell_width, cell_height, speed=15, rng=None,
+                 seed=None, apple_range=16):
+        """ Create an engine and start a new game.
+
+        Args:
+            cell_width (int): Number of cells horizontally in the world
+            cell_height (int): Number of cells vertically in the world
+            speed (int): Snake speed, used as the score multiplier
+            rng (random.Random): Random source, as in SnakeEngine
+            seed (int): Seed for the default random source
+            apple_range (int): Maximum distance of a new apple from the
+                head, in cells along each axis
+        """
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.divided = True
+        self.speed = speed
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.apple_range = apple_range
+        self.occupied = ChunkedGrid(cell_width, cell_height)
+        self.reset()
+
+    def reset(self):
+        """ Reset the snake, apple and score for a new game. """
+
+        # Start in the middle of the world, three cells long, heading up
+        head_x = self.cell_width // 2
+        head_y = self.cell_height // 2
+        self.place_snake(
+            [(head_x, head_y), (head_x - 1, head_y), (head_x - 2, head_y)],
+            direction='up')
+
+        # Game state
+        self.apple = self.get_random_location()
+        self.ticks = 0
+        self.vacated = None
+        self.game_over = False
+        self.cause = None
+
+    def place_snake(self, coordinates, direction='up'):
+        """ Replace the snake with the given cells.
+
+        Args:
+            coordinates (list): x/y tuples, head first
+            direction (str): Current heading
+        """
+        self.occupied.clear()
+        self.body = deque()
+        for coordinate in coordinates:
+            cell = self.to_cell(coordinate)
+            self.body.append(cell)
+            self.occupied[cell] = 1
+        self.head_x, self.head_y = coordinates[0]
+        self.direction = direction
+
+    def cells_in(self, x, y, width, height):
+        """ Get the snake cells inside a rectangle, see ChunkedGrid.
+
+        Returns:
+            list: x/y coordinates of the snake cells
+        """
+        return self.occupied.cells_in(x, y, width, height)
+
+    def get_random_location(self, tries=32):
+        """ Get a random free location near the head.
+
+        Random cells within apple_range of the head are tried first, which
+        nearly always finds one in a sparse world. Only if those are all
+        taken, the free cells in range are listed to pick from, and if there
+        are none, the range is doubled until it covers the whole world.
+
+        Args:
+            tries (int): Random cells to try before listing the free ones
+
+        Returns:
+            tuple: x/y coordinates, None if the snake fills the world
+        """
+        randint = self.rng.randint
+        reach = self.apple_range
+        while True:
+            left = max(self.head_x - reach, 0)
+            right = min(self.head_x + reach, self.cell_width - 1)
+            top = max(self.head_y - reach, 0)
+            bottom = min(self.head_y + reach, self.cell_height - 1)
+            for _ in range(tries):
+                x, y = randint(left, right), randint(top, bottom)
+                if not self.occupied[y * self.cell_width + x]:
+                    return x, y
+
+            # Crowded, pick from the free cells in range
+            width, height = right - left + 1, bottom - top + 1
+            taken = set(self.cells_in(left, top, width, height))
+            if len(taken) < width * height:
+                free = [(x, y)
+                        for y in range(top, bottom + 1)
+                        for x in range(left, right + 1)
+                        if (x, y) not in taken]
+                return free[self.rng.randrange(len(free))]
+
+            # Every cell in range is taken, look further out
+            if (width, height) == (self.cell_width, self.cell_height):
+                return None
+            reach *= 2
+
+    def step(self, direction=None):
+        """ Advance the game a single tick.
+
+        The same rules as SnakeEngine.step, on the sparse grid. The game is
+        won when the snake fills the whole world.
+
+        Args:
+            direction (str): Optional new heading for this tick
+
+        Returns:
+            bool: True while the game is still running
+        """
+        if self.game_over:
+            return False
+        if direction is not None:
+            self.turn(direction)
+
+        # Move the head one cell
+        move_x, move_y = DIRECTIONS[self.direction]
+        head_x = self.head_x + move_x
+        head_y = self.head_y + move_y
+        self.ticks += 1
+
+        # Game over if the snake hit the edge of the world
+        if (head_x < 0 or head_x >= self.cell_width or
+           head_y < 0 or head_y >= self.cell_height):
+            self.game_over = True
+            self.cause = 'wall'
+            return False
+
+        # Release the tail cell before moving into it, unless growing
+        cell = head_y * self.cell_width + head_x
+        ate = cell == self.apple_cell
+        occupied = self.occupied
+        self.vacated = None
+        if not ate:
+            tail = self.body.pop()
+            occupied[tail] = 0
+
+        # Game over if the snake hit it self
+        if occupied[cell]:
+            if not ate:
+                self.body.append(tail)
+                occupied[tail] = 1
+            self.game_over = True
+            self.cause = 'self'
+            return False
+
+        # Move the snake by switching squares
+        if not ate:
+            self.vacated = tail
+        self.body.appendleft(cell)
+        occupied[cell] = 1
+        self.head_x, self.head_y = head_x, head_y
+
+        # New apple near the head, or a win if the world is full
+        if ate:
+            self.apple = self.get_random_location()
+            if self.apple is None:
+                self.game_over = True
+                self.cause = 'win'
+                return False
+        return True